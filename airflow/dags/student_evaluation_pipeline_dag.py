@@ -3,10 +3,20 @@ from airflow.operators.python import PythonOperator
 from airflow.utils.dates import days_ago
 from datetime import timedelta
 
-from src.pipeline.ingest import ingest_excel
-from src.pipeline.transform import transform_silver
-from src.pipeline.analytics import build_gold_layer
-from src.data_quality.ge_check import run_ge_checks   
+# Only light modules are imported while the scheduler parses this file;
+# stage modules are imported by the task that runs them
+from src.core.entrypoints import lazy_callable
+from src.pipeline.catalog import DIMENSIONS, DQ_DATASETS, DQ_FACT_DATASET
+
+# Tasks that open the DuckDB file; DuckDB allows one writer process at a
+# time. Create with: airflow pools set duckdb_writer 1 "DuckDB writers"
+DUCKDB_POOL = "duckdb_writer"
+
+# Checked right after Silver; the Gold fact is checked once it is built
+SILVER_DQ_DATASETS = [d for d in DQ_DATASETS if d != DQ_FACT_DATASET]
+
+# Dimensions whose surrogate keys the fact table looks up
+FACT_DIMENSIONS = ["dim_student", "dim_grading_group"]
 
 default_args = {
     "owner": "data-engineering",
@@ -27,28 +37,98 @@ with DAG(
 
     bronze_ingest = PythonOperator(
         task_id="bronze_ingest",
-        python_callable=ingest_excel,
+        python_callable=lazy_callable("ingest"),
         op_kwargs={"run_id": "{{ run_id }}"},
+        pool=DUCKDB_POOL,
     )
 
-    silver_transform = PythonOperator(
-        task_id="silver_transform",
-        python_callable=transform_silver,
+    # ------------------------------------------------------------------
+    # Silver: one mapped task per worksheet entity
+    # ------------------------------------------------------------------
+    silver_plan = PythonOperator(
+        task_id="silver_plan",
+        python_callable=lazy_callable("silver_plan"),
         op_kwargs={"run_id": "{{ run_id }}"},
+        pool=DUCKDB_POOL,
     )
-    
-    data_quality_ge = PythonOperator(
-    task_id="data_quality_ge",
-    python_callable=run_ge_checks,
-    op_kwargs={"run_id": "{{ run_id }}"},
-    # sla=timedelta(minutes=3),
+
+    silver_entities = PythonOperator.partial(
+        task_id="silver_transform",
+        python_callable=lazy_callable("silver_entity"),
+    ).expand(op_kwargs=silver_plan.output)
+
+    silver_commit = PythonOperator(
+        task_id="silver_commit",
+        python_callable=lazy_callable("silver_commit"),
+        op_kwargs={"run_id": "{{ run_id }}", "results": silver_entities.output},
+        pool=DUCKDB_POOL,
     )
 
-    gold_task = PythonOperator(
-        task_id="gold_materialization",
-        python_callable=build_gold_layer,
-        op_kwargs={"run_id": "{{ run_id }}"},
+    # ------------------------------------------------------------------
+    # Data quality: one mapped task per dataset (non-blocking for Gold)
+    # ------------------------------------------------------------------
+    dq_silver = PythonOperator.partial(
+        task_id="data_quality_ge",
+        python_callable=lazy_callable("dq_dataset"),
+    ).expand(
+        op_kwargs=[
+            {"run_id": "{{ run_id }}", "dataset": dataset}
+            for dataset in SILVER_DQ_DATASETS
+        ]
     )
 
-    bronze_ingest >> silver_transform >> data_quality_ge >> gold_task
+    dq_fact = PythonOperator(
+        task_id="data_quality_fact",
+        python_callable=lazy_callable("dq_dataset"),
+        op_kwargs={"run_id": "{{ run_id }}", "dataset": DQ_FACT_DATASET},
+    )
+
+    dq_commit = PythonOperator(
+        task_id="data_quality_commit",
+        python_callable=lazy_callable("dq_commit"),
+        op_kwargs={
+            "run_id": "{{ run_id }}",
+            "summaries": dq_silver.output,
+            "fact_summary": dq_fact.output,
+        },
+        pool=DUCKDB_POOL,
+    )
+
+    # ------------------------------------------------------------------
+    # Gold: dimensions side by side, the fact only after the dimensions
+    # it looks keys up in, marts last
+    # ------------------------------------------------------------------
+    gold_tables = {
+        table: PythonOperator(
+            task_id=f"gold_{table}",
+            python_callable=lazy_callable("gold_table"),
+            op_kwargs={"run_id": "{{ run_id }}", "table": table},
+            pool=DUCKDB_POOL,
+        )
+        for table in [*DIMENSIONS, "fact_tests"]
+    }
+
+    gold_marts = PythonOperator(
+        task_id="gold_marts",
+        python_callable=lazy_callable("gold_marts"),
+        op_kwargs={
+            "run_id": "{{ run_id }}",
+            "results": [task.output for task in gold_tables.values()],
+        },
+        pool=DUCKDB_POOL,
+    )
+
+    # Point-in-time student / school features over the fact table
+    gold_features = PythonOperator(
+        task_id="gold_features",
+        python_callable=lazy_callable("features"),
+        op_kwargs={"run_id": "{{ run_id }}"},
+        pool=DUCKDB_POOL,
+    )
 
+    bronze_ingest >> silver_plan >> silver_entities >> silver_commit
+    silver_commit >> dq_silver >> dq_commit
+    silver_commit >> [gold_tables[t] for t in DIMENSIONS]
+    [gold_tables[t] for t in FACT_DIMENSIONS] >> gold_tables["fact_tests"]
+    gold_tables["fact_tests"] >> dq_fact >> dq_commit
+    list(gold_tables.values()) >> gold_marts >> gold_features
@@ -0,0 +1,125 @@
+"""
+Import-time benchmark.
+
+Every target is imported in a fresh Python process (best of --repeat
+runs) and the wall time plus the heavy libraries it pulled in are
+reported. The Airflow DAG file is measured with airflow already imported,
+i.e. the cost the scheduler pays per parse; it is skipped when airflow is
+not installed.
+
+    python -m benchmarks.import_time --repeat 5
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+from datetime import datetime
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+
+DAG_FILE = PROJECT_ROOT / "airflow" / "dags" / "student_evaluation_pipeline_dag.py"
+DEFAULT_RESULTS = PROJECT_ROOT / "benchmarks" / "results" / "import_times.jsonl"
+
+MODULES = [
+    "src.core.config",
+    "src.core.entrypoints",
+    "src.pipeline.catalog",
+    "src.pipeline.ingest",
+    "src.pipeline.transform",
+    "src.data_quality.ge_check",
+    "src.pipeline.analytics",
+]
+
+HEAVY = ["pandas", "pyarrow", "numpy", "duckdb", "openpyxl", "great_expectations"]
+
+_CHILD = """
+import json, runpy, sys, time
+target, heavy = sys.argv[1], sys.argv[2].split(",")
+if target.endswith(".py"):
+    from airflow import DAG  # the scheduler already has airflow loaded
+    started = time.perf_counter()
+    runpy.run_path(target)
+else:
+    started = time.perf_counter()
+    __import__(target)
+seconds = time.perf_counter() - started
+print(json.dumps({"ms": round(seconds * 1000, 1),
+                  "heavy": [m for m in heavy if m in sys.modules]}))
+"""
+
+
+def _airflow_installed() -> bool:
+    # The repo's airflow/ directory is importable as a namespace package
+    # from PROJECT_ROOT, so check for the real thing
+    completed = subprocess.run(
+        [sys.executable, "-c", "from airflow import DAG"],
+        cwd=PROJECT_ROOT, capture_output=True,
+    )
+    return completed.returncode == 0
+
+
+def measure(target: str, repeat: int) -> dict:
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(
+        filter(None, [str(PROJECT_ROOT), env.get("PYTHONPATH")])
+    )
+
+    runs = []
+    for _ in range(repeat):
+        completed = subprocess.run(
+            [sys.executable, "-c", _CHILD, target, ",".join(HEAVY)],
+            cwd=PROJECT_ROOT, env=env, capture_output=True, text=True,
+        )
+        if completed.returncode != 0:
+            raise RuntimeError(f"Importing {target} failed:\n{completed.stderr}")
+        runs.append(json.loads(completed.stdout.strip().splitlines()[-1]))
+
+    best = min(runs, key=lambda r: r["ms"])
+    return {"target": target, "ms": best["ms"], "heavy_imports": best["heavy"]}
+
+
+def run_import_benchmark(repeat: int = 5, results_path: Path = DEFAULT_RESULTS) -> list:
+    targets = list(MODULES)
+    if _airflow_installed():
+        targets.insert(0, str(DAG_FILE))
+    else:
+        print("airflow not installed: skipping DAG parse timing")
+
+    context = {
+        "python": platform.python_version(),
+        "started_at": datetime.utcnow().isoformat(),
+    }
+
+    results_path = Path(results_path)
+    results_path.parent.mkdir(parents=True, exist_ok=True)
+
+    records = []
+    for target in targets:
+        record = {**context, **measure(target, repeat)}
+        records.append(record)
+        with results_path.open("a") as f:
+            f.write(json.dumps(record) + "\n")
+
+        name = Path(target).name if target.endswith(".py") else target
+        print(
+            f"{name:<42} {record['ms']:>8.1f} ms  "
+            f"{', '.join(record['heavy_imports']) or '-'}"
+        )
+
+    return records
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--results", type=Path, default=DEFAULT_RESULTS)
+    args = parser.parse_args(argv)
+
+    run_import_benchmark(args.repeat, args.results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,249 @@
+"""
+Pipeline benchmark harness.
+
+For every scale a synthetic workbook is generated into its own data
+directory (PIPELINE_DATA_DIR) and each stage runs in a fresh Python
+process, so wall time and peak RSS are measured per stage. One JSON line
+per stage is appended to the results file.
+
+    python -m benchmarks.run_benchmarks --scales 10000 100000 1000000
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+
+STAGES = ["generate", "ingest", "transform", "data_quality", "gold", "features"]
+DEFAULT_SCALES = [10_000, 100_000, 1_000_000]
+DEFAULT_RESULTS = PROJECT_ROOT / "benchmarks" / "results" / "results.jsonl"
+
+# Audit stage name per benchmark stage: the row_count of its SUCCESS
+# record is the number of rows the stage processed
+AUDIT_STAGES = {
+    "ingest": "bronze_ingestion",
+    "transform": "silver_transform",
+    "data_quality": "data_quality",
+    "gold": "gold_materialization",
+    "features": "feature_materialization",
+}
+
+
+# ----------------------------------------------------------------------
+# Child process: run one stage
+# ----------------------------------------------------------------------
+def _run_stage(stage: str, run_id: str, test_rows: int, seed: int):
+    # Imported here so PIPELINE_DATA_DIR is set before src.core.config loads
+    from src.core.config import BRONZE_DIR
+
+    if stage == "generate":
+        from benchmarks.synthetic_workbook import generate_workbook
+
+        return generate_workbook(
+            BRONZE_DIR / "student_evaluation_raw.xlsx", test_rows, seed=seed
+        )
+    if stage == "ingest":
+        from src.pipeline.ingest import ingest_excel
+
+        return ingest_excel(run_id)
+    if stage == "transform":
+        from src.pipeline.transform import transform_silver
+
+        return transform_silver(run_id)
+    if stage == "data_quality":
+        from src.data_quality.ge_check import run_ge_checks
+
+        return run_ge_checks(run_id)
+    if stage == "gold":
+        from src.pipeline.analytics import build_gold_layer
+
+        return build_gold_layer(run_id)
+    if stage == "features":
+        from src.pipeline.features import build_features
+
+        return build_features(run_id)
+    raise ValueError(f"Unknown stage: {stage!r}. Expected one of {STAGES}")
+
+
+def _processed_rows(stage: str, run_id: str, output) -> int | None:
+    if stage == "generate":
+        return sum(output.values()) if isinstance(output, dict) else None
+
+    from src.core.duckdb_conn import duckdb_connection
+
+    with duckdb_connection() as con:
+        row = con.execute(
+            """
+            SELECT SUM(row_count) FROM audit_pipeline_runs
+            WHERE run_id = ? AND stage = ? AND status = 'SUCCESS'
+            """,
+            (run_id, AUDIT_STAGES[stage]),
+        ).fetchone()
+    return int(row[0]) if row[0] is not None else None
+
+
+def _peak_rss_mb(who: int) -> float:
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    peak = resource.getrusage(who).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _child(args):
+    started = time.perf_counter()
+    output = _run_stage(args.stage, args.run_id, args.rows, args.seed)
+    seconds = time.perf_counter() - started
+    rows = _processed_rows(args.stage, args.run_id, output)
+
+    # Stages fan work out to process-pool workers: RUSAGE_CHILDREN is the
+    # peak of the largest (already reaped) worker, not a sum over workers
+    peak_self = _peak_rss_mb(resource.RUSAGE_SELF)
+    peak_children = _peak_rss_mb(resource.RUSAGE_CHILDREN)
+
+    print(json.dumps({
+        "seconds": round(seconds, 3),
+        "peak_rss_mb": round(max(peak_self, peak_children), 1),
+        "peak_rss_children_mb": round(peak_children, 1),
+        "rows": rows,
+        "output": output if isinstance(output, dict) else None,
+    }))
+
+
+# ----------------------------------------------------------------------
+# Parent: drive scales and stages
+# ----------------------------------------------------------------------
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=PROJECT_ROOT, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _spawn(stage: str, run_id: str, test_rows: int, seed: int, data_dir: Path) -> dict:
+    env = dict(os.environ, PIPELINE_DATA_DIR=str(data_dir))
+    env["PYTHONPATH"] = os.pathsep.join(
+        filter(None, [str(PROJECT_ROOT), env.get("PYTHONPATH")])
+    )
+    completed = subprocess.run(
+        [
+            sys.executable, "-m", "benchmarks.run_benchmarks",
+            "--stage", stage, "--run-id", run_id,
+            "--rows", str(test_rows), "--seed", str(seed),
+        ],
+        cwd=PROJECT_ROOT, env=env, capture_output=True, text=True,
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(
+            f"Benchmark stage {stage} failed at {test_rows} rows:\n{completed.stderr}"
+        )
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def run_benchmarks(
+    scales: list,
+    stages: list = STAGES,
+    results_path: Path = DEFAULT_RESULTS,
+    work_dir: Path | None = None,
+    seed: int = 0,
+    keep: bool = False,
+) -> list:
+    """
+    Benchmark every stage at every scale (Tests rows). Returns the
+    result records, which are also appended to `results_path`.
+    """
+    results_path = Path(results_path)
+    results_path.parent.mkdir(parents=True, exist_ok=True)
+    work_dir = Path(work_dir or tempfile.mkdtemp(prefix="pipeline_bench_"))
+
+    context = {
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "started_at": datetime.utcnow().isoformat(),
+    }
+
+    records = []
+    for test_rows in scales:
+        data_dir = work_dir / f"scale_{test_rows}"
+        run_id = f"bench_{test_rows}_{int(time.time())}"
+
+        try:
+            for stage in stages:
+                measured = _spawn(stage, run_id, test_rows, seed, data_dir)
+                record = {
+                    **context,
+                    "scale": test_rows,
+                    "stage": stage,
+                    "seconds": measured["seconds"],
+                    "peak_rss_mb": measured["peak_rss_mb"],
+                    "peak_rss_children_mb": measured["peak_rss_children_mb"],
+                    # Rows the stage itself processed (null when unknown)
+                    "rows": measured["rows"],
+                    "rows_per_sec": round(measured["rows"] / measured["seconds"], 1)
+                    if measured["rows"] is not None and measured["seconds"] else None,
+                }
+                if measured["output"]:
+                    record["sheet_rows"] = measured["output"]
+                records.append(record)
+
+                with results_path.open("a") as f:
+                    f.write(json.dumps(record) + "\n")
+
+                rate = record["rows_per_sec"]
+                print(
+                    f"{test_rows:>11,} rows  {stage:<13} "
+                    f"{record['seconds']:>9.2f}s  {record['peak_rss_mb']:>8.1f} MB  "
+                    f"{'n/a' if rate is None else f'{rate:,.0f}':>12} rows/s"
+                )
+        finally:
+            if not keep:
+                shutil.rmtree(data_dir, ignore_errors=True)
+
+    return records
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--scales", type=int, nargs="+", default=DEFAULT_SCALES,
+                        help="Tests rows per benchmark (e.g. 10000 ... 50000000)")
+    parser.add_argument("--stages", nargs="+", default=STAGES, choices=STAGES)
+    parser.add_argument("--results", type=Path, default=DEFAULT_RESULTS)
+    parser.add_argument("--work-dir", type=Path, default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--keep", action="store_true",
+                        help="Keep the generated data directories")
+
+    # Internal: run a single stage in this process
+    parser.add_argument("--stage", choices=STAGES, help=argparse.SUPPRESS)
+    parser.add_argument("--run-id", help=argparse.SUPPRESS)
+    parser.add_argument("--rows", type=int, help=argparse.SUPPRESS)
+
+    args = parser.parse_args(argv)
+    if args.stage:
+        _child(args)
+        return
+
+    run_benchmarks(
+        args.scales,
+        stages=args.stages,
+        results_path=args.results,
+        work_dir=args.work_dir,
+        seed=args.seed,
+        keep=args.keep,
+    )
+
+
+if __name__ == "__main__":
+    main()
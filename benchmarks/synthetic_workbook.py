@@ -0,0 +1,239 @@
+import json
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from openpyxl import Workbook
+
+from src.core.config import WORKBOOK_CACHE_DIR
+from src.core.idempotency import content_hash
+from src.core.parquet_io import ParquetBatchWriter
+from src.pipeline.workbook import MANIFEST_NAME, _sheet_filename
+
+# Excel's hard limit, header row included
+EXCEL_MAX_ROWS = 1_048_576
+
+# Sheets and headers of data/bronze/student_evaluation_raw.xlsx, in order
+SHEETS = {
+    "School": ["School ID", "School Name", "Municipality"],
+    "Test Details": [
+        "Assessment Group", "Assessment Type", "Description", "Assesment Cost",
+    ],
+    "Grading Groups": [
+        "Assessement Level ID", "Assessement Level", "Level Grouping", "Score Range",
+    ],
+    "Teachers": ["Course Name", "Course No", "School ID", "School Year", "Teacher ID"],
+    "Students": ["Student ID", "Date of Birth", "Gender", "Student Name", "School ID"],
+    "Tests": [
+        "Standard Score", "Assessement Level ID", "Student Assessment ID",
+        "Student ID", "Assessment Type", "Assessment Date",
+        "School Year / Grade / Class", "Semester", "School Year2",
+        "TOSWRF Assessment ID", "TOWRE Assessment ID", "Grade at Assessment",
+    ],
+}
+
+TEST_DETAILS = [
+    ("Comprehension ", "TOSREC", "The ability to understand what is being read.", 1.0),
+    ("Decoding ", "TOWRE", "The ability to sound out words.", 1.2),
+    ("Fluency ", "TOSWRF", "The ability to read smoothly and accurately.", 1.5),
+]
+
+# (level, grouping, score range, highest score in range)
+GRADING_GROUPS = [
+    ("Very Poor", "Below Average", "< 70", 69),
+    ("Poor", "Below Average", "70 - 79", 79),
+    ("Below Average", "Below Average", "80 - 89", 89),
+    ("Average", "Average and Above", "90 - 110", 110),
+    ("Above Average", "Average and Above", "111 - 119", 119),
+    ("Good", "Average and Above", "120 - 129", 129),
+    ("Very Good", "Average and Above", "129 +", 160),
+]
+
+SCHOOL_YEARS = ["2020 / 2021", "2021 / 2022", "2022 / 2023", "2023 / 2024"]
+SEMESTERS = ["Fall", "Winter", "Spring"]
+
+# Ratios of the sample workbook (per test row)
+STUDENTS_PER_TEST = 0.15
+TEACHERS_PER_TEST = 0.27
+
+
+def _ids(kind: int, start: int, count: int, seed: int) -> np.ndarray:
+    # GUID-shaped, unique per (kind, index, seed)
+    index = np.arange(start, start + count)
+    return np.array(
+        [f"{i:08X}-{kind:04X}-4000-8000-{seed:012X}" for i in index.tolist()],
+        dtype=object,
+    )
+
+
+def _scale(test_rows: int) -> dict:
+    return {
+        "schools": max(5, min(2000, test_rows // 2000)),
+        "students": max(10, int(test_rows * STUDENTS_PER_TEST)),
+        "teachers": max(10, int(test_rows * TEACHERS_PER_TEST)),
+        "tests": test_rows,
+    }
+
+
+def _static_sheets(counts: dict, seed: int) -> dict:
+    rng = np.random.default_rng(seed)
+    schools = _ids(1, 0, counts["schools"], seed)
+    grading_ids = _ids(2, 0, len(GRADING_GROUPS), seed)
+
+    students = counts["students"]
+    teachers = counts["teachers"]
+
+    return {
+        "School": pd.DataFrame({
+            "School ID": schools,
+            "School Name": [f"School {i}" for i in range(len(schools))],
+            "Municipality": rng.choice(["La Crete", "Rural", "High Level", "Fort Vermilion"], len(schools)),
+        }),
+        "Test Details": pd.DataFrame(TEST_DETAILS, columns=SHEETS["Test Details"]),
+        "Grading Groups": pd.DataFrame({
+            "Assessement Level ID": grading_ids,
+            "Assessement Level": [g[0] for g in GRADING_GROUPS],
+            "Level Grouping": [g[1] for g in GRADING_GROUPS],
+            "Score Range": [g[2] for g in GRADING_GROUPS],
+        }),
+        "Teachers": pd.DataFrame({
+            "Course Name": [f"Course {i % 800}" for i in range(teachers)],
+            "Course No": [f"C{i % 800:04d}" for i in range(teachers)],
+            "School ID": rng.choice(schools, teachers),
+            "School Year": rng.choice(SCHOOL_YEARS, teachers),
+            "Teacher ID": _ids(3, 0, teachers, seed)[rng.integers(0, max(1, teachers // 38), teachers)],
+        }),
+        "Students": pd.DataFrame({
+            "Student ID": _ids(4, 0, students, seed),
+            "Date of Birth": pd.Timestamp("2003-01-01")
+            + pd.to_timedelta(rng.integers(0, 365 * 10, students), unit="D"),
+            "Gender": rng.choice(["Male", "Female", "Other"], students, p=[0.49, 0.49, 0.02]),
+            "Student Name": [f"Student {i}" for i in range(students)],
+            "School ID": rng.choice(schools, students),
+        }),
+    }
+
+
+def _test_chunks(counts: dict, seed: int, chunk_rows: int):
+    """
+    The Tests sheet in chunks, so 50M-row scales never sit in memory.
+    """
+    grading_ids = _ids(2, 0, len(GRADING_GROUPS), seed)
+    student_ids = _ids(4, 0, counts["students"], seed)
+    highs = np.array([g[3] for g in GRADING_GROUPS])
+
+    for start in range(0, counts["tests"], chunk_rows):
+        rows = min(chunk_rows, counts["tests"] - start)
+        rng = np.random.default_rng([seed, start])
+
+        score = np.clip(rng.normal(95, 18, rows).round().astype(int), 1, 159)
+        level = np.searchsorted(highs, score).clip(0, len(GRADING_GROUPS) - 1)
+        # ~0.1% of scores outside their band, for the DQ range rule
+        level[rng.random(rows) < 0.001] = 0
+
+        test_type = rng.integers(0, len(TEST_DETAILS), rows)
+        year = rng.integers(0, 3, rows)
+        grade = rng.integers(1, 13, rows)
+        date = (
+            pd.Timestamp("2020-09-01")
+            + pd.to_timedelta(year * 365 + rng.integers(0, 300, rows), unit="D")
+        )
+        assessment_ids = _ids(6, start, rows, seed)
+
+        yield pd.DataFrame({
+            "Standard Score": score,
+            "Assessement Level ID": grading_ids[level],
+            "Student Assessment ID": _ids(5, start, rows, seed),
+            "Student ID": student_ids[rng.integers(0, counts["students"], rows)],
+            "Assessment Type": np.array([t[1] for t in TEST_DETAILS])[test_type],
+            "Assessment Date": date,
+            "School Year / Grade / Class": grade,
+            "Semester": np.array(SEMESTERS)[rng.integers(0, 3, rows)],
+            "School Year2": np.array(SCHOOL_YEARS)[year],
+            "TOSWRF Assessment ID": np.where(test_type == 2, assessment_ids, None),
+            "TOWRE Assessment ID": np.where(test_type == 1, assessment_ids, None),
+            "Grade at Assessment": [f"Grade: {g}" for g in grade.tolist()],
+        })
+
+
+def _write_xlsx(path: Path, static: dict, tests) -> dict:
+    workbook = Workbook(write_only=True)
+    rows = {}
+
+    for sheet, columns in SHEETS.items():
+        worksheet = workbook.create_sheet(sheet)
+        worksheet.append(columns)
+        frames = tests if sheet == "Tests" else [static[sheet]]
+
+        rows[sheet] = 0
+        for frame in frames:
+            for row in frame.itertuples(index=False, name=None):
+                worksheet.append([
+                    None if isinstance(v, float) and np.isnan(v)
+                    else v.to_pydatetime() if isinstance(v, pd.Timestamp)
+                    else v
+                    for v in row
+                ])
+            rows[sheet] += len(frame)
+
+    workbook.save(path)
+    return rows
+
+
+def _write_cached_sheets(path: Path, static: dict, tests) -> dict:
+    """
+    Write a header-only workbook plus its workbook-cache entry
+    (src/pipeline/workbook.py) holding the real sheets as Parquet. The
+    pipeline then reads the sheets from the cache exactly as it does after
+    parsing a real workbook once.
+    """
+    workbook = Workbook(write_only=True)
+    workbook.properties.title = f"synthetic {path.stem}"
+    for sheet, columns in SHEETS.items():
+        workbook.create_sheet(sheet).append(columns)
+    workbook.save(path)
+
+    cache_dir = WORKBOOK_CACHE_DIR / content_hash(path)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+
+    rows, entries = {}, []
+    for index, sheet in enumerate(SHEETS):
+        filename = _sheet_filename(index, sheet)
+        frames = tests if sheet == "Tests" else [static[sheet]]
+
+        with ParquetBatchWriter(cache_dir / filename) as writer:
+            for frame in frames:
+                writer.write(frame)
+
+        rows[sheet] = writer.rows
+        entries.append({"sheet": sheet, "file": filename, "rows": writer.rows})
+
+    (cache_dir / MANIFEST_NAME).write_text(
+        json.dumps({"source": path.name, "sheets": entries}, indent=2)
+    )
+    return rows
+
+
+def generate_workbook(
+    path: Path,
+    test_rows: int,
+    seed: int = 0,
+    chunk_rows: int = 500_000,
+) -> dict:
+    """
+    Write a synthetic workbook with the sheets and columns of the Bronze
+    source, scaled to `test_rows` rows in Tests. Returns {sheet: rows}.
+
+    Scales that do not fit in an Excel sheet (EXCEL_MAX_ROWS) are written
+    as a header-only workbook whose sheets are pre-seeded in the workbook
+    cache, so every stage after XLSX parsing can still be measured.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    counts = _scale(test_rows)
+    static = _static_sheets(counts, seed)
+    tests = _test_chunks(counts, seed, chunk_rows)
+
+    if max(counts.values()) < EXCEL_MAX_ROWS:
+        return _write_xlsx(path, static, tests)
+    return _write_cached_sheets(path, static, tests)
@@ -0,0 +1,76 @@
+-- Analytics queries served from the pre-aggregated Gold marts
+-- (src/pipeline/marts.py). Each mart row stores score_count, score_sum,
+-- score_sumsq and pass_count, so averages, pass rates and standard
+-- deviations are merged from a few hundred rows instead of the fact table.
+-- There is no teacher query: gold.fact_tests carries no teacher or class
+-- key to attribute tests to teachers.
+
+-- 1. Average Score by School
+
+SELECT
+    s.school_name,
+    ROUND(SUM(m.score_sum) / SUM(m.score_count), 2) AS avg_score
+FROM gold.mart_school_month m
+JOIN gold.dim_school s
+  ON m.school_id = s.school_id
+GROUP BY s.school_name
+ORDER BY avg_score DESC;
+
+-- 2. Student Performance Distribution
+
+SELECT
+    g.assessement_level AS grading_group,
+    SUM(m.score_count) AS student_count
+FROM gold.mart_grading_group m
+JOIN gold.dim_grading_group g
+  ON m.grading_group_key = g.grading_group_key
+GROUP BY g.assessement_level
+ORDER BY grading_group;
+
+-- 3. Top 10 Performing Students
+
+SELECT
+    st.student_id,
+    st.student_name,
+    ROUND(m.score_sum / m.score_count, 2) AS avg_score
+FROM gold.mart_student m
+JOIN gold.dim_student st
+  ON m.student_id = st.student_id
+ORDER BY avg_score DESC
+LIMIT 10;
+
+--  4. School Pass Rate (Score ≥ 55)
+
+SELECT
+    s.school_name,
+    ROUND(100.0 * SUM(m.pass_count) / SUM(m.score_count), 2) AS pass_rate_percent
+FROM gold.mart_school_month m
+JOIN gold.dim_school s
+  ON m.school_id = s.school_id
+GROUP BY s.school_name
+ORDER BY pass_rate_percent DESC;
+
+-- 5. Test Difficulty Analysis
+
+SELECT
+    m.assessment_type AS test_name,
+    ROUND(SUM(m.score_sum) / SUM(m.score_count), 2) AS avg_score,
+    ROUND(
+        SQRT(
+            (SUM(m.score_sumsq) - SUM(m.score_sum) * SUM(m.score_sum) / SUM(m.score_count))
+            / NULLIF(SUM(m.score_count) - 1, 0)
+        ),
+        2
+    ) AS score_stddev
+FROM gold.mart_test_month m
+GROUP BY m.assessment_type
+ORDER BY avg_score ASC;
+
+-- 6. Trend Analysis (Scores Over Time)
+
+SELECT
+    m.exam_month,
+    ROUND(SUM(m.score_sum) / SUM(m.score_count), 2) AS avg_score
+FROM gold.mart_school_month m
+GROUP BY m.exam_month
+ORDER BY m.exam_month;
@@ -32,3 +32,17 @@ CREATE TABLE IF NOT EXISTS audit_dq_violations (
 );
 
 
+CREATE TABLE IF NOT EXISTS pipeline_metrics (
+    run_id            VARCHAR,
+    stage             VARCHAR,
+    step              VARCHAR,
+    entity            VARCHAR,
+    rows_in           BIGINT,
+    rows_out          BIGINT,
+    duration_ms       DOUBLE,
+    cpu_ms            DOUBLE,
+    peak_rss_mb       DOUBLE,
+    traced_peak_mb    DOUBLE,
+    status            VARCHAR,
+    created_at        TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
@@ -1,3 +1,18 @@
 # src/core/__init__.py
-from .duckdb_conn import get_duckdb_connection
+import importlib
+
+# Re-exports resolved on first access, so that importing any src.core
+# module (e.g. config from a DAG file) does not load duckdb
+_LAZY_EXPORTS = {
+    "get_duckdb_connection": "src.core.duckdb_conn",
+    "duckdb_connection": "src.core.duckdb_conn",
+}
+
+__all__ = list(_LAZY_EXPORTS)
+
+
+def __getattr__(name):
+    if name not in _LAZY_EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return getattr(importlib.import_module(_LAZY_EXPORTS[name]), name)
 
@@ -1,42 +1,276 @@
+import atexit
+import os
+import threading
+import time
+from contextlib import contextmanager
 from datetime import datetime
-from src.core.duckdb_conn import get_duckdb_connection
+
+from src.core.config import AUDIT_DDL_PATH, AUDIT_FLUSH_SIZE, AUDIT_FLUSH_INTERVAL
+from src.core.duckdb_conn import duckdb_connection
+
+# Column order used for inserts (see sql/ddl/create_audit_tables.sql)
+AUDIT_COLUMNS = {
+    "audit_pipeline_runs": [
+        "run_id", "stage", "status", "record_count", "row_count",
+        "valid_count", "invalid_count", "error_message", "created_at",
+    ],
+    "audit_data_quality": [
+        "run_id", "dataset", "check_type", "status", "failed_records",
+        "created_at",
+    ],
+    "audit_dq_violations": [
+        "run_id", "stage", "entity", "rule_type", "column_name",
+        "violation_count", "created_at",
+    ],
+    "pipeline_metrics": [
+        "run_id", "stage", "step", "entity", "rows_in", "rows_out",
+        "duration_ms", "cpu_ms", "peak_rss_mb", "traced_peak_mb", "status",
+        "created_at",
+    ],
+}
+
+# Columns missing from audit_pipeline_runs tables created before the DDL
+# file was applied
+_LEGACY_COLUMNS = {
+    "record_count": "BIGINT",
+    "valid_count": "BIGINT",
+    "invalid_count": "BIGINT",
+}
+
+_lock = threading.RLock()
+_buffers = {table: [] for table in AUDIT_COLUMNS}
+_last_flush = time.monotonic()
+_buffer_pid = os.getpid()
+_initialized_pid = None
+_deferred = False
+
+
+def _own_buffers():
+    # Rows buffered by a parent before fork belong to the parent.
+    global _buffer_pid
+
+    if _buffer_pid != os.getpid():
+        for rows in _buffers.values():
+            rows.clear()
+        _buffer_pid = os.getpid()
+
+
+def defer_audit_flush():
+    """
+    Never write from this process: rows stay buffered until the parent
+    collects them with drain_audit_records(). Set in worker processes,
+    which must not open the DuckDB file the parent holds.
+    """
+    global _deferred
+    _deferred = True
+
+
+@contextmanager
+def deferred_audit():
+    """
+    defer_audit_flush() for the duration of the block, e.g. in a task
+    that hands its rows to another process via drain_audit_records().
+    """
+    global _deferred
+
+    previous, _deferred = _deferred, True
+    try:
+        yield
+    finally:
+        _deferred = previous
+
+
+def drain_audit_records() -> dict:
+    """
+    Remove and return this process's buffered rows as {table: rows}.
+    """
+    with _lock:
+        _own_buffers()
+        drained = {table: list(rows) for table, rows in _buffers.items() if rows}
+        for rows in _buffers.values():
+            rows.clear()
+        return drained
+
+
+def replay_audit_records(records: dict):
+    """
+    Buffer rows drained from another process.
+    """
+    with _lock:
+        _own_buffers()
+        for table, rows in records.items():
+            _buffers[table].extend(rows)
+
 
 def init_audit_tables():
-    con = get_duckdb_connection()
-    con.execute("""
-        CREATE TABLE IF NOT EXISTS audit_pipeline_runs (
-            run_id STRING,
-            stage STRING,
-            status STRING,
-            row_count BIGINT,
-            error_message STRING,
-            created_at TIMESTAMP
-        )
-    """)
-    con.close()
+    """
+    Create the audit tables once per process from
+    sql/ddl/create_audit_tables.sql and add any columns missing from an
+    older audit_pipeline_runs table.
+    """
+    global _initialized_pid
+
+    with _lock:
+        if _initialized_pid == os.getpid():
+            return
+
+        with duckdb_connection() as con:
+            con.execute(AUDIT_DDL_PATH.read_text())
+            for col, col_type in _LEGACY_COLUMNS.items():
+                con.execute(
+                    f"ALTER TABLE audit_pipeline_runs "
+                    f"ADD COLUMN IF NOT EXISTS {col} {col_type}"
+                )
+        _initialized_pid = os.getpid()
+
+
+def _buffer(table: str, row: tuple, force_flush: bool = False):
+    with _lock:
+        _own_buffers()
+        _buffers[table].append(row)
+        if _deferred:
+            return
+
+        pending = sum(len(rows) for rows in _buffers.values())
+        if (
+            force_flush
+            or pending >= AUDIT_FLUSH_SIZE
+            or time.monotonic() - _last_flush >= AUDIT_FLUSH_INTERVAL
+        ):
+            flush_audit_records()
+
+
+def flush_audit_records():
+    """
+    Write all buffered audit rows in one executemany per table over a
+    cursor on the process-wide DuckDB connection. Stages call this when
+    they finish; it also runs at interpreter exit.
+    """
+    global _last_flush
+
+    with _lock:
+        _own_buffers()
+        if _deferred:
+            return
+        if not any(_buffers.values()):
+            _last_flush = time.monotonic()
+            return
+
+        init_audit_tables()
+
+        with duckdb_connection() as con:
+            for table, rows in _buffers.items():
+                if not rows:
+                    continue
+
+                columns = AUDIT_COLUMNS[table]
+                placeholders = ", ".join("?" for _ in columns)
+                con.executemany(
+                    f"INSERT INTO {table} ({', '.join(columns)}) "
+                    f"VALUES ({placeholders})",
+                    rows,
+                )
+                rows.clear()
+
+        _last_flush = time.monotonic()
+
 
 def write_audit_record(
     run_id: str,
     stage: str,
     status: str,
     row_count: int = 0,
-    error_message: str | None = None
+    error_message: str | None = None,
+    valid_count: int | None = None,
+    invalid_count: int | None = None,
+    record_count: int | None = None,
 ):
-    init_audit_tables()
-
-    con = get_duckdb_connection()
-    con.execute(
-        """
-        INSERT INTO audit_pipeline_runs
-        VALUES (?, ?, ?, ?, ?, ?)
-        """,
+    """
+    Buffer one audit_pipeline_runs row. Failures are flushed right away
+    so they survive a crashing task.
+    """
+    _buffer(
+        "audit_pipeline_runs",
         (
             run_id,
             stage,
             status,
+            record_count,
             row_count,
+            valid_count,
+            invalid_count,
             error_message,
             datetime.utcnow(),
         ),
+        force_flush=(status == "FAILED"),
     )
-    con.close()
+
+
+def write_dq_result(
+    run_id: str,
+    dataset: str,
+    check_type: str,
+    status: str,
+    failed_records: int = 0,
+):
+    _buffer(
+        "audit_data_quality",
+        (run_id, dataset, check_type, status, failed_records, datetime.utcnow()),
+    )
+
+
+def write_dq_violation(
+    run_id: str,
+    stage: str,
+    entity: str,
+    rule_type: str,
+    column_name: str | None,
+    violation_count: int,
+):
+    _buffer(
+        "audit_dq_violations",
+        (
+            run_id,
+            stage,
+            entity,
+            rule_type,
+            column_name,
+            violation_count,
+            datetime.utcnow(),
+        ),
+    )
+
+
+def write_metric_record(
+    run_id: str,
+    stage: str,
+    step: str,
+    entity: str | None = None,
+    rows_in: int | None = None,
+    rows_out: int | None = None,
+    duration_ms: float | None = None,
+    cpu_ms: float | None = None,
+    peak_rss_mb: float | None = None,
+    traced_peak_mb: float | None = None,
+    status: str = "SUCCESS",
+):
+    _buffer(
+        "pipeline_metrics",
+        (
+            run_id,
+            stage,
+            step,
+            entity,
+            rows_in,
+            rows_out,
+            duration_ms,
+            cpu_ms,
+            peak_rss_mb,
+            traced_peak_mb,
+            status,
+            datetime.utcnow(),
+        ),
+    )
+
+
+atexit.register(flush_audit_records)
@@ -1,3 +1,4 @@
+import os
 from pathlib import Path
 
 # Resolve project root
@@ -5,27 +6,172 @@ PROJECT_ROOT = Path(__file__).resolve().parents[2]
 
 BASE_DIR = Path("/opt/airflow")
 
-# Data directories
-DATA_DIR = PROJECT_ROOT / "data"
+# Data directories (PIPELINE_DATA_DIR relocates all of them, e.g. for
+# benchmarks)
+DATA_DIR = Path(os.getenv("PIPELINE_DATA_DIR", PROJECT_ROOT / "data"))
 BRONZE_DIR = DATA_DIR / "bronze"
 SILVER_DIR = DATA_DIR / "silver"
 GOLD_DIR = DATA_DIR / "gold"
 QUARANTINE_DIR = DATA_DIR / "quarantine"
+# Consolidated quarantine store (see src/core/quarantine.py)
+QUARANTINE_STORE_DIR = QUARANTINE_DIR / "store"
+QUARANTINE_FLUSH_ROWS = int(os.getenv("QUARANTINE_FLUSH_ROWS", "50000"))
+
+# Bronze ingestion: every workbook in BRONZE_DIR matching BRONZE_GLOB is
+# parsed on a process pool (0 workers = one per CPU), at most
+# INGEST_CONCURRENCY at a time, into BRONZE_DATASET_DIR/<entity>/
+BRONZE_GLOB = os.getenv("BRONZE_GLOB", "*.xlsx")
+BRONZE_DATASET_DIR = BRONZE_DIR / "dataset"
+INGEST_MAX_WORKERS = int(os.getenv("INGEST_MAX_WORKERS", "0")) or None
+INGEST_CONCURRENCY = int(os.getenv("INGEST_CONCURRENCY", "8"))
+
+# Parsed workbook cache (one directory per workbook content hash)
+WORKBOOK_CACHE_DIR = DATA_DIR / "cache" / "workbooks"
+WORKBOOK_BATCH_ROWS = int(os.getenv("WORKBOOK_BATCH_ROWS", "100000"))
 
 # DuckDB
 DUCKDB_DIR = DATA_DIR / "db" / "duckdb"
 DUCKDB_PATH = DUCKDB_DIR / "analytics.duckdb"
+DUCKDB_THREADS = int(os.getenv("DUCKDB_THREADS", "0")) or None
+DUCKDB_MEMORY_LIMIT = os.getenv("DUCKDB_MEMORY_LIMIT") or None
+DUCKDB_TEMP_DIRECTORY = os.getenv("DUCKDB_TEMP_DIRECTORY") or None
+
+# Audit: DDL applied once per process; buffered rows are flushed in bulk.
+# The interval (seconds) is only checked when a new record is buffered:
+# there is no timer, so an idle buffer waits for the stage-end flush.
+AUDIT_DDL_PATH = PROJECT_ROOT / "sql" / "ddl" / "create_audit_tables.sql"
+AUDIT_FLUSH_SIZE = int(os.getenv("AUDIT_FLUSH_SIZE", "500"))
+AUDIT_FLUSH_INTERVAL = float(os.getenv("AUDIT_FLUSH_INTERVAL", "30"))
+
+# Silver executor: serial | thread | process (0 workers = one per CPU)
+SILVER_EXECUTOR = os.getenv("SILVER_EXECUTOR", "serial")
+SILVER_MAX_WORKERS = int(os.getenv("SILVER_MAX_WORKERS", "0")) or None
+
+# Silver streaming mode: bounded batches / Parquet row groups of this size
+SILVER_STREAMING = os.getenv("SILVER_STREAMING", "false").lower() == "true"
+SILVER_BATCH_ROWS = int(os.getenv("SILVER_BATCH_ROWS", "100000"))
+
+# Fused in-process runs (src/run_pipeline.py): stages share Arrow tables in
+# memory; Parquet outputs are written by this many background threads
+PIPELINE_FUSED = os.getenv("PIPELINE_FUSED", "false").lower() == "true"
+FUSED_PERSIST_WORKERS = int(os.getenv("FUSED_PERSIST_WORKERS", "2"))
+
+# Gold load mode: full (rebuild) | incremental (upsert changed rows)
+GOLD_LOAD_MODE = os.getenv("GOLD_LOAD_MODE", "full")
+# Dimension history in incremental mode: 1 (overwrite) | 2 (versioned rows)
+GOLD_SCD_TYPE = int(os.getenv("GOLD_SCD_TYPE", "1"))
+
+# Pass threshold used by the analytics marts (pass_count)
+ANALYTICS_PASS_SCORE = float(os.getenv("ANALYTICS_PASS_SCORE", "55"))
+
+# Feature store (src/pipeline/features.py): rolling windows (days) of the
+# per-student / per-school score features
+FEATURE_WINDOWS_DAYS = [
+    int(d) for d in os.getenv("FEATURE_WINDOWS_DAYS", "90,365").split(",") if d.strip()
+]
+FEATURE_ROW_GROUP_SIZE = int(os.getenv("FEATURE_ROW_GROUP_SIZE", "16384"))
+
+# Analytics query service: cached results (LRU entries) and how often the
+# Gold data version is re-read from the audit table (seconds)
+QUERY_CACHE_SIZE = int(os.getenv("QUERY_CACHE_SIZE", "128"))
+QUERY_VERSION_TTL = float(os.getenv("QUERY_VERSION_TTL", "5"))
+
+# Gold Parquet layout
+GOLD_FACT_PARTITION_BY = [
+    c.strip()
+    for c in os.getenv("GOLD_FACT_PARTITION_BY", "school_year,school_id").split(",")
+    if c.strip()
+]
+GOLD_PARQUET_COMPRESSION = os.getenv("GOLD_PARQUET_COMPRESSION", "zstd")
+GOLD_ROW_GROUP_SIZE = int(os.getenv("GOLD_ROW_GROUP_SIZE", "122880"))
+
+# Gold versions (src/pipeline/gold_versions.py): published versions kept
+# for time travel, and how long unreferenced file sets and unpublished
+# staging directories survive garbage collection (hours)
+GOLD_VERSIONS_KEEP = int(os.getenv("GOLD_VERSIONS_KEEP", "10"))
+GOLD_VERSIONS_GRACE_HOURS = float(os.getenv("GOLD_VERSIONS_GRACE_HOURS", "24"))
+
+# DQ scan of the Gold fact: "col=v1,v2;col2=v3" restricts it to partitions
+DQ_FACT_PARTITIONS = {
+    col.strip(): [v.strip() for v in values.split(",")]
+    for col, _, values in (
+        item.partition("=")
+        for item in os.getenv("DQ_FACT_PARTITIONS", "").split(";")
+        if item.strip()
+    )
+}
+
+# DQ executor: serial | thread | process (0 workers = one per dataset/CPU)
+DQ_EXECUTOR = os.getenv("DQ_EXECUTOR", "thread")
+DQ_MAX_WORKERS = int(os.getenv("DQ_MAX_WORKERS", "0")) or None
+
+# Great Expectations reporting on a row sample (DQ rules never depend on it)
+DQ_GE_ENABLED = os.getenv("DQ_GE_ENABLED", "false").lower() == "true"
+DQ_GE_SAMPLE_ROWS = int(os.getenv("DQ_GE_SAMPLE_ROWS", "10000"))
+
+# DQ profiling mode: off (exact checks on whole tables) | sketch (one
+# streaming pass into HyperLogLog / t-digest sketches per column and per
+# hash partition of each uniqueness key; exact duplicate extraction only
+# on partitions the sketches flag; see src/data_quality/profiling.py)
+DQ_PROFILE_MODE = os.getenv("DQ_PROFILE_MODE", "off")
+DQ_PROFILE_DIR = DATA_DIR / "profiles"
+DQ_PROFILE_KEEP = int(os.getenv("DQ_PROFILE_KEEP", "30"))
+DQ_SKETCH_BATCH_ROWS = int(os.getenv("DQ_SKETCH_BATCH_ROWS", "100000"))
+DQ_SKETCH_PARTITIONS = int(os.getenv("DQ_SKETCH_PARTITIONS", "16"))
+# Distinct hashes a sketch keeps exactly before switching to HyperLogLog
+# registers: uniqueness checks stay exact up to about
+# DQ_SKETCH_PARTITIONS × DQ_SKETCH_SPARSE_LIMIT rows
+DQ_SKETCH_SPARSE_LIMIT = int(os.getenv("DQ_SKETCH_SPARSE_LIMIT", "65536"))
+# Past that, a key partition is flagged when its distinct estimate is
+# below rows × (1 − tolerance) (~2.5 standard errors by default); an
+# unflagged estimated partition makes the uniqueness result WARN, not PASSED
+DQ_SKETCH_DUP_TOLERANCE = float(os.getenv("DQ_SKETCH_DUP_TOLERANCE", "0.01"))
+# Drift alerts against the previous run's profile of the same dataset
+DQ_DRIFT_NULL_RATE = float(os.getenv("DQ_DRIFT_NULL_RATE", "0.05"))
+DQ_DRIFT_DISTINCT_RATIO = float(os.getenv("DQ_DRIFT_DISTINCT_RATIO", "0.1"))
+DQ_DRIFT_QUANTILE_SHIFT = float(os.getenv("DQ_DRIFT_QUANTILE_SHIFT", "0.25"))
+
+# Opt-in cProfile/tracemalloc per stage: comma-separated stage names or "all"
+METRICS_PROFILE = {
+    s.strip() for s in os.getenv("METRICS_PROFILE", "").split(",") if s.strip()
+}
+METRICS_PROFILE_TOP = int(os.getenv("METRICS_PROFILE_TOP", "25"))
 
 # Logs
 LOG_DIR = PROJECT_ROOT / "logs"
 LOG_FILE = LOG_DIR / "pipeline.log"
+# json (one document per line, with run_id / stage / entity) | text
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json")
+# external (reopen LOG_FILE after logrotate moved it; safe with several
+# writer processes) | size (rotate in-process at LOG_MAX_BYTES, keeping
+# LOG_BACKUP_COUNT old files; only for a single writer process)
+LOG_ROTATION = os.getenv("LOG_ROTATION", "external")
+LOG_MAX_BYTES = int(os.getenv("LOG_MAX_BYTES", str(50 * 1024 * 1024)))
+LOG_BACKUP_COUNT = int(os.getenv("LOG_BACKUP_COUNT", "5"))
 
-# Ensure required directories exist
-for path in [
+# Directories the stages write to. Created by init_directories(), not on
+# import: DAG parsing and config lookups must stay free of side effects.
+REQUIRED_DIRS = [
     SILVER_DIR,
     GOLD_DIR,
     QUARANTINE_DIR,
+    WORKBOOK_CACHE_DIR,
     DUCKDB_DIR,
     LOG_DIR,
-]:
-    path.mkdir(parents=True, exist_ok=True)
+]
+
+_directories_ready = False
+
+
+def init_directories():
+    """
+    Create REQUIRED_DIRS once per process. Called by every stage entry
+    point (instrument_stage) and before the DuckDB file is opened.
+    """
+    global _directories_ready
+
+    if _directories_ready:
+        return
+    for path in REQUIRED_DIRS:
+        path.mkdir(parents=True, exist_ok=True)
+    _directories_ready = True
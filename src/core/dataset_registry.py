@@ -0,0 +1,129 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from pathlib import Path
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from src.core.config import FUSED_PERSIST_WORKERS
+from src.core.idempotency import file_fingerprint
+from src.core.logging import get_logger
+
+logger = get_logger("DATASET_REGISTRY")
+
+# ----------------------------------------------------------------------
+# Fused execution: stages hand Arrow tables to each other in memory while
+# their Parquet files are written in the background. Outside
+# fused_execution() nothing is registered and every reader falls back to
+# the files on disk.
+# ----------------------------------------------------------------------
+_datasets = {}
+_pending = {}
+_pool = None
+_lock = threading.Lock()
+
+
+def fused_active() -> bool:
+    return _pool is not None
+
+
+@contextmanager
+def fused_execution(max_workers: int = FUSED_PERSIST_WORKERS):
+    """
+    Enable the in-memory registry for the duration of the block. On exit
+    every background write is awaited (errors are re-raised) and the
+    registered tables are released.
+    """
+    global _pool
+
+    if _pool is not None:
+        # Nested: the outer block owns the registry
+        yield
+        return
+
+    _pool = ThreadPoolExecutor(
+        max_workers=max_workers, thread_name_prefix="persist"
+    )
+    try:
+        yield
+        wait_persisted()
+    finally:
+        pool, _pool = _pool, None
+        pool.shutdown(wait=True)
+        with _lock:
+            _datasets.clear()
+            _pending.clear()
+
+
+def _persist(table: pa.Table, path: Path, compression: str, on_persisted):
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    try:
+        pq.write_table(table, tmp_path, compression=compression)
+        os.replace(tmp_path, path)
+    finally:
+        if tmp_path.exists():
+            tmp_path.unlink()
+
+    fingerprint = file_fingerprint(path)
+    if on_persisted is not None:
+        on_persisted(fingerprint)
+    logger.info(f"Persisted: {path.name} ({table.num_rows} rows)")
+    return fingerprint
+
+
+def publish(
+    name: str,
+    table: pa.Table,
+    path: Path,
+    compression: str = "snappy",
+    on_persisted=None,
+):
+    """
+    Register `table` under `name` and write it to `path` in the
+    background (atomically, via a temporary file).
+
+    on_persisted(fingerprint) runs on the writer thread once the file is
+    in place, e.g. to record the manifest entry. Returns the Future.
+    """
+    if _pool is None:
+        raise RuntimeError("publish() requires an active fused_execution()")
+
+    path = Path(path)
+    with _lock:
+        previous = _pending.get(path)
+        _datasets[name] = table
+
+    if previous is not None:
+        # Never let two writes of the same file race
+        previous.result()
+
+    future = _pool.submit(_persist, table, path, compression, on_persisted)
+    with _lock:
+        _pending[path] = future
+    return future
+
+
+def get_table(name: str) -> pa.Table | None:
+    """
+    The registered table for `name`, or None (caller reads the file).
+    """
+    with _lock:
+        return _datasets.get(name)
+
+
+def wait_persisted(paths: list | None = None):
+    """
+    Block until the background writes of `paths` (default: all) are
+    done. Paths with no pending write return immediately.
+    """
+    with _lock:
+        if paths is None:
+            futures = list(_pending.values())
+        else:
+            futures = [_pending[Path(p)] for p in paths if Path(p) in _pending]
+
+    wait(futures)
+    for future in futures:
+        future.result()
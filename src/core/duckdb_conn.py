@@ -1,5 +1,83 @@
-import duckdb
-from src.core.config import DUCKDB_PATH
+import atexit
+import os
+import threading
+from contextlib import contextmanager
+
+from src.core.config import (
+    DUCKDB_PATH,
+    DUCKDB_THREADS,
+    DUCKDB_MEMORY_LIMIT,
+    DUCKDB_TEMP_DIRECTORY,
+    init_directories,
+)
+
+_lock = threading.Lock()
+_writer = None
+_writer_pid = None
+
+
+def duckdb_config() -> dict:
+    """
+    Connection settings from src/core/config.py (unset values are left
+    to DuckDB's defaults).
+    """
+    config = {}
+    if DUCKDB_THREADS:
+        config["threads"] = DUCKDB_THREADS
+    if DUCKDB_MEMORY_LIMIT:
+        config["memory_limit"] = DUCKDB_MEMORY_LIMIT
+    if DUCKDB_TEMP_DIRECTORY:
+        config["temp_directory"] = str(DUCKDB_TEMP_DIRECTORY)
+    return config
+
 
 def get_duckdb_connection():
-    return duckdb.connect(str(DUCKDB_PATH))
+    """
+    The process-wide read/write connection to analytics.duckdb, opened
+    on first use and reused afterwards. It is closed at interpreter exit;
+    callers must not close it themselves (use duckdb_connection() for a
+    scoped cursor instead).
+
+    DuckDB locks the file for the connection's lifetime: no other
+    process can open it, read_only included, while a stage runs. Readers
+    outside the pipeline use the published Gold Parquet instead
+    (src/pipeline/gold_reader.py, src/pipeline/query_service.py).
+    """
+    global _writer, _writer_pid
+
+    import duckdb
+
+    with _lock:
+        # A forked child must not share its parent's connection.
+        if _writer is None or _writer_pid != os.getpid():
+            init_directories()
+            _writer = duckdb.connect(str(DUCKDB_PATH), config=duckdb_config())
+            _writer_pid = os.getpid()
+        return _writer
+
+
+@contextmanager
+def duckdb_connection():
+    """
+    Cursor on the shared writer connection; closed on exit. Cursors are
+    independent connections to the same database, so each thread or
+    stage gets its own transaction and temp-table scope.
+    """
+    cursor = get_duckdb_connection().cursor()
+    try:
+        yield cursor
+    finally:
+        cursor.close()
+
+
+def close_duckdb_connection():
+    global _writer, _writer_pid
+
+    with _lock:
+        if _writer is not None and _writer_pid == os.getpid():
+            _writer.close()
+        _writer = None
+        _writer_pid = None
+
+
+atexit.register(close_duckdb_connection)
@@ -0,0 +1,70 @@
+import functools
+import importlib
+import inspect
+
+from src.core.config import init_directories
+
+# ----------------------------------------------------------------------
+# Stage callables by import path ("module:function"). Modules are only
+# imported when a task runs, so the DAG file can be parsed without
+# loading pandas, pyarrow, duckdb or great_expectations.
+# ----------------------------------------------------------------------
+ENTRY_POINTS = {
+    "ingest": "src.pipeline.ingest:ingest_excel",
+    "silver": "src.pipeline.transform:transform_silver",
+    "silver_plan": "src.pipeline.transform:plan_silver_entities",
+    "silver_entity": "src.pipeline.transform:transform_entity",
+    "silver_commit": "src.pipeline.transform:commit_silver",
+    "data_quality": "src.data_quality.ge_check:run_ge_checks",
+    "dq_dataset": "src.data_quality.ge_check:check_dataset",
+    "dq_commit": "src.data_quality.ge_check:commit_ge_checks",
+    "gold": "src.pipeline.analytics:build_gold_layer",
+    "gold_table": "src.pipeline.analytics:build_gold_table",
+    "gold_marts": "src.pipeline.analytics:build_gold_marts",
+    "features": "src.pipeline.features:build_features",
+    "pipeline": "src.run_pipeline:run",
+}
+
+
+@functools.lru_cache(maxsize=None)
+def resolve(target: str):
+    """
+    The callable for an ENTRY_POINTS name or a "module:function" path.
+    """
+    path = ENTRY_POINTS.get(target, target)
+    module_name, sep, attr = path.partition(":")
+    if not sep or not attr:
+        raise ValueError(
+            f"Unknown entry point {target!r}: expected one of "
+            f"{sorted(ENTRY_POINTS)} or 'module:function'"
+        )
+    return getattr(importlib.import_module(module_name), attr)
+
+
+def _accepted_kwargs(fn, kwargs: dict) -> dict:
+    # Airflow passes the whole task context to a callable taking
+    # **kwargs; hand the stage only the parameters it declares.
+    parameters = inspect.signature(fn).parameters.values()
+    if any(p.kind is inspect.Parameter.VAR_KEYWORD for p in parameters):
+        return kwargs
+    names = {p.name for p in parameters}
+    return {k: v for k, v in kwargs.items() if k in names}
+
+
+def run_entry_point(target: str, *args, **kwargs):
+    init_directories()
+    fn = resolve(target)
+    return fn(*args, **_accepted_kwargs(fn, kwargs))
+
+
+def lazy_callable(target: str):
+    """
+    A callable standing in for `target` (e.g. as an Airflow
+    python_callable) that imports it only when called.
+    """
+    def call(*args, **kwargs):
+        return run_entry_point(target, *args, **kwargs)
+
+    name = ENTRY_POINTS.get(target, target).partition(":")[2] or target
+    call.__name__ = call.__qualname__ = name
+    return call
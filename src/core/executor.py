@@ -0,0 +1,74 @@
+import contextvars
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from src.core.audit import defer_audit_flush, drain_audit_records, replay_audit_records
+from src.core.logging import (
+    current_log_context,
+    init_worker_logging,
+    log_context,
+    worker_log_queue,
+)
+
+EXECUTOR_MODES = ("serial", "thread", "process")
+
+
+def init_worker(log_queue):
+    """
+    ProcessPoolExecutor initializer (initargs=(worker_log_queue(),)):
+    audit rows stay buffered for the parent and log records go to the
+    parent's log listener.
+    """
+    defer_audit_flush()
+    init_worker_logging(log_queue)
+
+
+def _run_in_worker(fn, args, context):
+    # Audit/metric rows buffered by the task travel back with its result;
+    # worker processes never write to DuckDB themselves.
+    with log_context(**context):
+        result = fn(*args)
+    return result, drain_audit_records()
+
+
+def run_tasks(fn, tasks: list, mode: str = "serial", max_workers: int | None = None) -> list:
+    """
+    Run fn(*args) for every args tuple in `tasks`.
+
+    mode:
+      - serial:  in the calling thread, one after another
+      - thread:  on a ThreadPoolExecutor
+      - process: on a ProcessPoolExecutor (fn and args must be picklable);
+                 audit rows buffered by the workers are replayed here
+
+    Results are returned in task order; the first exception is re-raised.
+    """
+    if mode not in EXECUTOR_MODES:
+        raise ValueError(
+            f"Unknown executor mode: {mode!r}. Expected one of {EXECUTOR_MODES}"
+        )
+
+    if mode == "serial" or len(tasks) <= 1:
+        return [fn(*args) for args in tasks]
+
+    workers = min(max_workers or os.cpu_count() or 1, len(tasks))
+
+    if mode == "thread":
+        # Each task runs in a copy of the caller's context (log context)
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = [
+                pool.submit(contextvars.copy_context().run, fn, *args) for args in tasks
+            ]
+            return [future.result() for future in futures]
+
+    context = current_log_context()
+    with ProcessPoolExecutor(
+        max_workers=workers, initializer=init_worker, initargs=(worker_log_queue(),)
+    ) as pool:
+        futures = [pool.submit(_run_in_worker, fn, args, context) for args in tasks]
+        results = []
+        for future in futures:
+            result, records = future.result()
+            replay_audit_records(records)
+            results.append(result)
+        return results
@@ -1,3 +1,4 @@
+import hashlib
 from pathlib import Path
 
 def already_exists(path: Path) -> bool:
@@ -5,3 +6,95 @@ def already_exists(path: Path) -> bool:
     Prevents unnecessary recomputation.
     """
     return path.exists() and path.stat().st_size > 0
+
+def content_hash(path: Path, chunk_size: int = 1 << 20) -> str:
+    """
+    SHA-256 of a file's contents, read in fixed-size chunks.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for chunk in iter(lambda: fh.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def parquet_schema(path: Path) -> str:
+    """
+    Arrow schema of a Parquet file (footer only, no data read).
+    """
+    import pyarrow.parquet as pq
+
+    schema = pq.read_schema(path).remove_metadata()
+    return ", ".join(f"{field.name}:{field.type}" for field in schema)
+
+def _dataset_files(path: Path) -> list:
+    return sorted(
+        p for p in path.rglob("*") if p.is_file() and not p.name.startswith(".")
+    )
+
+def _path_stat(path: Path) -> tuple:
+    """
+    (size, mtime) of a file, or total size and newest mtime of the files
+    in a dataset directory.
+    """
+    if not path.is_dir():
+        stat = path.stat()
+        return stat.st_size, stat.st_mtime
+
+    stats = [p.stat() for p in _dataset_files(path)]
+    return (
+        sum(s.st_size for s in stats),
+        max((s.st_mtime for s in stats), default=0.0),
+    )
+
+def _dataset_hash(path: Path) -> str:
+    digest = hashlib.sha256()
+    for file in _dataset_files(path):
+        digest.update(str(file.relative_to(path)).encode())
+        digest.update(content_hash(file).encode())
+    return digest.hexdigest()
+
+def file_fingerprint(path: Path, previous: dict | None = None) -> dict:
+    """
+    Content hash, mtime, size and (for Parquet) schema of a file or of a
+    partitioned Parquet dataset directory.
+
+    When `previous` describes the same path with an identical mtime and
+    size, its content hash is reused instead of re-reading the file.
+    """
+    size, mtime = _path_stat(path)
+
+    if (
+        previous
+        and previous.get("path") == str(path)
+        and previous.get("mtime") == mtime
+        and previous.get("size") == size
+    ):
+        digest = previous["content_hash"]
+        schema = previous.get("schema")
+    elif path.is_dir():
+        digest = _dataset_hash(path)
+        files = [p for p in _dataset_files(path) if p.suffix == ".parquet"]
+        schema = parquet_schema(files[0]) if files else None
+    else:
+        digest = content_hash(path)
+        schema = parquet_schema(path) if path.suffix == ".parquet" else None
+
+    return {
+        "path": str(path),
+        "content_hash": digest,
+        "mtime": mtime,
+        "size": size,
+        "schema": schema,
+    }
+
+def outputs_intact(outputs: dict) -> bool:
+    """
+    True when every recorded output file still exists unmodified.
+    """
+    for fp in outputs.values():
+        path = Path(fp["path"])
+        if not path.exists():
+            return False
+        if _path_stat(path) != (fp["size"], fp["mtime"]):
+            return False
+    return True
@@ -1,5 +1,256 @@
+import atexit
+import contextvars
+import json
 import logging
-from src.core.config import LOG_FILE
+import logging.handlers
+import os
+import queue
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+
+from src.core.config import (
+    LOG_FILE,
+    LOG_FORMAT,
+    LOG_ROTATION,
+    LOG_MAX_BYTES,
+    LOG_BACKUP_COUNT,
+)
+
+# ----------------------------------------------------------------------
+# Non-blocking logging
+#
+# Every logger created by get_logger() shares one QueueHandler: emitting
+# a record only snapshots it (message, exception text, log context) and
+# puts it on an in-memory queue. A QueueListener thread, started on the
+# first record, formats and appends it to LOG_FILE. The listeners are
+# drained and stopped at exit and when logging.shutdown() closes the
+# handler (Airflow task processes call it right before os._exit()).
+#
+# Worker processes of the pools (src/core/executor.py) put their records
+# on a multiprocessing queue (init_worker_logging, installed by the pool
+# initializer) that a second listener in the parent drains. Independent
+# processes (Airflow tasks, benchmark stages) still append to the same
+# file, so by default it is not rotated in-process: LOG_ROTATION=external
+# reopens LOG_FILE when logrotate (or anything else) has moved it away;
+# LOG_ROTATION=size rotates at LOG_MAX_BYTES and is only safe when a
+# single process writes LOG_FILE.
+# ----------------------------------------------------------------------
+_context = contextvars.ContextVar("log_context", default={})
+
+
+@contextmanager
+def log_context(**fields):
+    """
+    Add fields (run_id, stage, entity, ...) to every record logged in
+    the block by this thread or task. Nested blocks add to the outer
+    fields; None values are ignored.
+    """
+    token = _context.set(
+        {**_context.get(), **{k: v for k, v in fields.items() if v is not None}}
+    )
+    try:
+        yield
+    finally:
+        _context.reset(token)
+
+
+def current_log_context() -> dict:
+    return dict(_context.get())
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    One JSON document per record: time, level, logger, message, the log
+    context and any extra={"fields": {...}} of the call.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        document = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(
+                timespec="milliseconds"
+            ),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            **getattr(record, "context", {}),
+            **getattr(record, "fields", {}),
+        }
+        if record.exc_text:
+            document["exception"] = record.exc_text
+        return json.dumps(document, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    # The pre-JSON line format, with the context and fields appended
+    def __init__(self):
+        super().__init__("%(asctime)s | %(levelname)s | %(name)s | %(message)s")
+
+    def formatMessage(self, record: logging.LogRecord) -> str:
+        line = super().formatMessage(record)
+        extra = {**getattr(record, "context", {}), **getattr(record, "fields", {})}
+        return f"{line} | {json.dumps(extra, default=str)}" if extra else line
+
+
+class _LazyOpen:
+    # Opened (and its directory created) on the first record, not when
+    # the listener starts
+    def _open(self):
+        Path(self.baseFilename).parent.mkdir(parents=True, exist_ok=True)
+        return super()._open()
+
+
+class _WatchedFileHandler(_LazyOpen, logging.handlers.WatchedFileHandler):
+    def __init__(self, filename):
+        super().__init__(filename, delay=True)
+
+
+class _RotatingFileHandler(_LazyOpen, logging.handlers.RotatingFileHandler):
+    def __init__(self, filename):
+        super().__init__(
+            filename, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT, delay=True
+        )
+
+
+class _ContextQueueHandler(logging.handlers.QueueHandler):
+    """
+    Snapshot a record in the emitting thread (so the log context is the
+    caller's) and hand it to the listener; starts the listener on first
+    use unless records go to a parent process.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Modified in place: get_logger() loggers have no other handler
+        # and do not propagate
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.exc_info = None
+        record.context = {**_context.get(), **getattr(record, "context", {})}
+        return record
+
+    def emit(self, record: logging.LogRecord):
+        if not _state["worker"]:
+            _start_listener()
+        super().emit(record)
+
+    def close(self):
+        # Called by logging.shutdown(), also when atexit hooks are
+        # skipped (os._exit): write out the queued records first
+        shutdown_logging()
+        super().close()
+
+
+_lock = threading.Lock()
+_state = {
+    "worker": False,
+    "file_handler": None,
+    "listener": None,
+    "process_queue": None,
+    "process_listener": None,
+}
+_handler = _ContextQueueHandler(queue.SimpleQueue())
+
+
+def _formatter() -> logging.Formatter:
+    return TextFormatter() if LOG_FORMAT == "text" else JsonFormatter()
+
+
+def _file_handler() -> logging.Handler:
+    if LOG_ROTATION == "size":
+        return _RotatingFileHandler(LOG_FILE)
+    return _WatchedFileHandler(LOG_FILE)
+
+
+def _listen(log_queue) -> logging.handlers.QueueListener:
+    # Caller holds _lock. Both listeners share one file handler, whose
+    # own lock serializes their writes.
+    if _state["file_handler"] is None:
+        _state["file_handler"] = _file_handler()
+        _state["file_handler"].setFormatter(_formatter())
+    listener = logging.handlers.QueueListener(log_queue, _state["file_handler"])
+    listener.start()
+    return listener
+
+
+def _start_listener():
+    if _state["listener"] is not None:
+        return
+    with _lock:
+        if _state["listener"] is None:
+            _state["listener"] = _listen(_handler.queue)
+
+
+def worker_log_queue():
+    """
+    Queue for the records of worker processes (pass it to
+    init_worker_logging() in the pool initializer). Created, with the
+    listener draining it, on first use; a worker passes on its own.
+    """
+    if _state["worker"]:
+        return _handler.queue
+    with _lock:
+        if _state["process_queue"] is None:
+            import multiprocessing
+
+            _state["process_queue"] = multiprocessing.Queue()
+            _state["process_listener"] = _listen(_state["process_queue"])
+            # Registered after multiprocessing's own exit hook, so the
+            # queue is drained before multiprocessing shuts it down
+            atexit.register(shutdown_logging)
+        return _state["process_queue"]
+
+
+def init_worker_logging(log_queue):
+    """
+    Pool initializer: send this process's records to the parent's
+    listener instead of writing LOG_FILE.
+    """
+    _state.update(
+        worker=True,
+        file_handler=None,
+        listener=None,
+        process_queue=None,
+        process_listener=None,
+    )
+    _handler.queue = log_queue
+
+
+def shutdown_logging():
+    """
+    Write out every queued record and stop the listeners (at exit).
+    """
+    with _lock:
+        for name in ("process_listener", "listener"):
+            if _state[name] is not None:
+                _state[name].stop()
+                _state[name] = None
+        _state["process_queue"] = None
+        if _state["file_handler"] is not None:
+            _state["file_handler"].close()
+
+
+def _reset_after_fork():
+    # A forked child inherits the queue but not the listener thread:
+    # give it its own unless a pool initializer redirects it
+    global _lock
+
+    _lock = threading.Lock()
+    if not _state["worker"]:
+        _state.update(
+            file_handler=None,
+            listener=None,
+            process_queue=None,
+            process_listener=None,
+        )
+        _handler.queue = queue.SimpleQueue()
+
+
+atexit.register(shutdown_logging)
+os.register_at_fork(after_in_child=_reset_after_fork)
+
 
 def get_logger(name: str) -> logging.Logger:
     logger = logging.getLogger(name)
@@ -8,14 +259,7 @@ def get_logger(name: str) -> logging.Logger:
         return logger
 
     logger.setLevel(logging.INFO)
-
-    handler = logging.FileHandler(LOG_FILE)
-    formatter = logging.Formatter(
-        "%(asctime)s | %(levelname)s | %(name)s | %(message)s"
-    )
-    handler.setFormatter(formatter)
-
-    logger.addHandler(handler)
+    logger.addHandler(_handler)
     logger.propagate = False
 
     return logger
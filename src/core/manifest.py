@@ -0,0 +1,135 @@
+import hashlib
+import json
+from datetime import datetime
+
+from src.core.duckdb_conn import duckdb_connection
+from src.core.idempotency import outputs_intact
+
+# Lives in the same DuckDB database as audit_pipeline_runs
+MANIFEST_TABLE = "pipeline_run_manifest"
+
+_initialized = False
+
+def init_manifest_table():
+    global _initialized
+
+    if _initialized:
+        return
+
+    with duckdb_connection() as con:
+        con.execute(f"""
+            CREATE TABLE IF NOT EXISTS {MANIFEST_TABLE} (
+                run_id STRING,
+                stage STRING,
+                entity STRING,
+                input_digest STRING,
+                input_fingerprints STRING,
+                output_fingerprints STRING,
+                created_at TIMESTAMP
+            )
+        """)
+    _initialized = True
+
+def input_digest(inputs: dict) -> str:
+    """
+    Order-independent digest over the content hashes and schemas of a
+    stage entity's inputs.
+    """
+    payload = sorted(
+        (name, fp["content_hash"], fp.get("schema") or "")
+        for name, fp in inputs.items()
+    )
+    return hashlib.sha256(json.dumps(payload).encode()).hexdigest()
+
+def get_last_entry(stage: str, entity: str) -> dict | None:
+    init_manifest_table()
+
+    with duckdb_connection() as con:
+        row = con.execute(
+            f"""
+            SELECT run_id, input_digest, input_fingerprints, output_fingerprints
+            FROM {MANIFEST_TABLE}
+            WHERE stage = ? AND entity = ?
+            ORDER BY created_at DESC
+            LIMIT 1
+            """,
+            (stage, entity),
+        ).fetchone()
+
+    if row is None:
+        return None
+
+    return {
+        "run_id": row[0],
+        "input_digest": row[1],
+        "inputs": json.loads(row[2]),
+        "outputs": json.loads(row[3]),
+    }
+
+def get_last_entries(stage: str, prefix: str = "") -> dict:
+    """
+    Latest entry of every entity of `stage` whose name starts with
+    `prefix`, as {entity: entry}, in one query.
+    """
+    init_manifest_table()
+
+    with duckdb_connection() as con:
+        rows = con.execute(
+            f"""
+            SELECT entity, run_id, input_digest, input_fingerprints,
+                   output_fingerprints
+            FROM {MANIFEST_TABLE}
+            WHERE stage = ? AND starts_with(entity, ?)
+            QUALIFY row_number() OVER (
+                PARTITION BY entity ORDER BY created_at DESC
+            ) = 1
+            """,
+            (stage, prefix),
+        ).fetchall()
+
+    return {
+        row[0]: {
+            "run_id": row[1],
+            "input_digest": row[2],
+            "inputs": json.loads(row[3]),
+            "outputs": json.loads(row[4]),
+        }
+        for row in rows
+    }
+
+def is_up_to_date(last_entry: dict | None, inputs: dict) -> bool:
+    """
+    An entity can be skipped when its inputs hash to the same digest as
+    the last successful run and the outputs that run wrote are untouched.
+    """
+    if last_entry is None:
+        return False
+    if last_entry["input_digest"] != input_digest(inputs):
+        return False
+    return outputs_intact(last_entry["outputs"])
+
+def record_entry(
+    run_id: str,
+    stage: str,
+    entity: str,
+    inputs: dict,
+    outputs: dict,
+):
+    init_manifest_table()
+
+    with duckdb_connection() as con:
+        con.execute(
+            f"""
+            INSERT INTO {MANIFEST_TABLE}
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            """,
+            (
+                run_id,
+                stage,
+                entity,
+                input_digest(inputs),
+                json.dumps(inputs),
+                json.dumps(outputs),
+                datetime.utcnow(),
+            ),
+        )
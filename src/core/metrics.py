@@ -0,0 +1,174 @@
+import cProfile
+import functools
+import io
+import pstats
+import resource
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+from src.core.audit import flush_audit_records, write_metric_record
+from src.core.config import (
+    LOG_DIR,
+    METRICS_PROFILE,
+    METRICS_PROFILE_TOP,
+    init_directories,
+)
+from src.core.logging import get_logger, log_context
+
+logger = get_logger("METRICS")
+
+PROFILE_DIR = LOG_DIR / "profiles"
+
+
+def _peak_rss_mb() -> float:
+    # Process high-water mark; ru_maxrss is KiB on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _emit(metric: dict):
+    # One structured record in the pipeline log, one row in
+    # pipeline_metrics (flushed with the stage's audit records)
+    logger.info("metric", extra={"fields": metric})
+    write_metric_record(**metric)
+
+
+# ----------------------------------------------------------------------
+# Step timers
+# ----------------------------------------------------------------------
+@contextmanager
+def track(
+    run_id: str,
+    stage: str,
+    step: str,
+    entity: str | None = None,
+    rows_in: int | None = None,
+):
+    """
+    Time one step of a stage.
+
+    Yields a dict; set "rows_in" / "rows_out" on it inside the block when
+    they are only known there. Records wall time, CPU time of the calling
+    thread, the process's peak RSS and the outcome. Records logged inside
+    the block carry run_id, stage and entity (log_context).
+    """
+    counts = {"rows_in": rows_in, "rows_out": None}
+    started = time.perf_counter()
+    cpu_started = time.thread_time()
+    status = "SUCCESS"
+
+    try:
+        with log_context(run_id=run_id, stage=stage, entity=entity):
+            yield counts
+    except BaseException:
+        status = "FAILED"
+        raise
+    finally:
+        _emit({
+            "run_id": run_id,
+            "stage": stage,
+            "step": step,
+            "entity": entity,
+            "rows_in": counts["rows_in"],
+            "rows_out": counts["rows_out"],
+            "duration_ms": round((time.perf_counter() - started) * 1000, 3),
+            "cpu_ms": round((time.thread_time() - cpu_started) * 1000, 3),
+            "peak_rss_mb": round(_peak_rss_mb(), 1),
+            "traced_peak_mb": None,
+            "status": status,
+        })
+
+
+# ----------------------------------------------------------------------
+# Opt-in profiling
+# ----------------------------------------------------------------------
+def profiling_enabled(stage: str) -> bool:
+    return "all" in METRICS_PROFILE or stage in METRICS_PROFILE
+
+
+@contextmanager
+def profile_stage(run_id: str, stage: str):
+    """
+    When `stage` is listed in METRICS_PROFILE, run the block under
+    cProfile and tracemalloc: the stats are saved to
+    logs/profiles/<run_id>_<stage>.prof, the hottest functions and
+    allocation sites are logged, and the traced peak is recorded as a
+    "profile" metric. Otherwise a no-op.
+    """
+    if not profiling_enabled(stage):
+        yield
+        return
+
+    profiler = cProfile.Profile()
+    started_tracing = not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+    tracemalloc.reset_peak()
+
+    started = time.perf_counter()
+    status = "SUCCESS"
+    profiler.enable()
+    try:
+        yield
+    except BaseException:
+        status = "FAILED"
+        raise
+    finally:
+        profiler.disable()
+        duration_ms = (time.perf_counter() - started) * 1000
+        _, traced_peak = tracemalloc.get_traced_memory()
+        snapshot = tracemalloc.take_snapshot()
+        if started_tracing:
+            tracemalloc.stop()
+
+        PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+        profile_path = PROFILE_DIR / f"{run_id}_{stage}.prof"
+        profiler.dump_stats(str(profile_path))
+
+        report = io.StringIO()
+        pstats.Stats(profiler, stream=report).sort_stats("cumulative").print_stats(
+            METRICS_PROFILE_TOP
+        )
+        allocations = "\n".join(
+            str(stat) for stat in snapshot.statistics("lineno")[:METRICS_PROFILE_TOP]
+        )
+        logger.info(
+            f"[PROFILE] {stage} ({run_id}) → {profile_path.name}\n"
+            f"{report.getvalue()}\nTop allocations:\n{allocations}"
+        )
+
+        _emit({
+            "run_id": run_id,
+            "stage": stage,
+            "step": "profile",
+            "entity": None,
+            "rows_in": None,
+            "rows_out": None,
+            "duration_ms": round(duration_ms, 3),
+            "cpu_ms": None,
+            "peak_rss_mb": round(_peak_rss_mb(), 1),
+            "traced_peak_mb": round(traced_peak / (1024 * 1024), 3),
+            "status": status,
+        })
+
+
+def instrument_stage(stage: str):
+    """
+    Decorator for stage entry points taking run_id as first argument:
+    creates the data directories, records a "total" metric for the call,
+    applies profile_stage() and flushes the stage's metrics before
+    returning.
+    """
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(run_id, *args, **kwargs):
+            init_directories()
+            try:
+                with profile_stage(run_id, stage), track(run_id, stage, "total"):
+                    return fn(run_id, *args, **kwargs)
+            finally:
+                flush_audit_records()
+        return wrapper
+    return decorator
@@ -0,0 +1,107 @@
+import os
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from pathlib import Path
+
+
+def _writer_field(field: pa.Field) -> pa.Field:
+    # Columns that are entirely null in the first batch have no physical
+    # type yet; store them as strings so later batches can be cast in.
+    if pa.types.is_null(field.type):
+        return pa.field(field.name, pa.string())
+    # Dictionary index width depends on each batch's category count; use
+    # one wide enough for every batch.
+    if pa.types.is_dictionary(field.type):
+        values = field.type.value_type
+        if pa.types.is_large_string(values) or pa.types.is_null(values):
+            values = pa.string()
+        return pa.field(field.name, pa.dictionary(pa.int32(), values))
+    return field
+
+
+def _writer_schema(table: pa.Table) -> pa.Schema:
+    return pa.schema([_writer_field(f) for f in table.schema])
+
+
+def conform_table(table: pa.Table, schema: pa.Schema) -> pa.Table:
+    """
+    Cast a batch to the writer schema (column order and types).
+    """
+    columns = []
+    for field in schema:
+        column = table.column(field.name)
+        if column.type != field.type:
+            column = column.cast(field.type)
+        columns.append(column)
+    return pa.Table.from_arrays(columns, schema=schema)
+
+
+class ParquetBatchWriter:
+    """
+    Incremental Parquet writer for DataFrame batches.
+
+    The schema is taken from the first batch and every batch is written
+    as its own row group. Data goes to a temporary file that replaces
+    `path` only when the writer is closed without error, so readers never
+    see a half-written file.
+    """
+
+    def __init__(self, path: Path, compression: str = "snappy"):
+        self.path = Path(path)
+        self.compression = compression
+        self.rows = 0
+        self._tmp_path = self.path.with_name(f".{self.path.name}.{os.getpid()}.tmp")
+        self._writer = None
+        self._schema = None
+        self._closed = False
+
+    def write(self, df: pd.DataFrame):
+        table = pa.Table.from_pandas(df, preserve_index=False)
+
+        if self._writer is None:
+            self._schema = _writer_schema(table).remove_metadata()
+            self._writer = pq.ParquetWriter(
+                self._tmp_path, self._schema, compression=self.compression
+            )
+
+        if table.num_rows == 0:
+            return
+
+        self._writer.write_table(conform_table(table, self._schema))
+        self.rows += table.num_rows
+
+    def close(self, empty_frame: pd.DataFrame | None = None):
+        """
+        Publish the file. If nothing was ever written, `empty_frame`
+        (when given) is written so the output still carries its columns.
+        """
+        if self._closed:
+            return
+        if self._writer is None:
+            if empty_frame is None:
+                return
+            self.write(empty_frame)
+
+        self._writer.close()
+        os.replace(self._tmp_path, self.path)
+        self._closed = True
+
+    def abort(self):
+        if self._closed:
+            return
+        self._closed = True
+        if self._writer is not None:
+            self._writer.close()
+        if self._tmp_path.exists():
+            self._tmp_path.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+        return False
@@ -0,0 +1,247 @@
+import json
+import os
+import shutil
+import threading
+import uuid
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from datetime import datetime
+from pathlib import Path
+
+from src.core.config import QUARANTINE_STORE_DIR, QUARANTINE_FLUSH_ROWS
+from src.core.duckdb_conn import duckdb_config
+from src.core.logging import get_logger
+
+logger = get_logger("QUARANTINE")
+
+# -----------------------------------------------------
+# Store layout
+#
+# QUARANTINE_STORE_DIR/stage=<stage>/dataset=<dataset>/month=<YYYY-MM>/*.parquet
+#
+# Every file has the same schema whatever the dataset: the failed row is
+# kept as a JSON document, so all quarantined rows can be scanned as one
+# table. stage, dataset and month come from the directory names.
+# -----------------------------------------------------
+STORE_SCHEMA = pa.schema(
+    [
+        ("run_id", pa.string()),
+        ("rule", pa.string()),
+        ("quarantined_at", pa.timestamp("us")),
+        ("record", pa.string()),
+    ]
+)
+
+# Separator between rule names when a row fails several rules
+RULE_SEPARATOR = "; "
+
+
+def _partition_dir(stage: str, dataset: str, month: str) -> Path:
+    return QUARANTINE_STORE_DIR / f"stage={stage}" / f"dataset={dataset}" / f"month={month}"
+
+
+def _write_part(directory: Path, table: pa.Table, prefix: str = "part") -> Path:
+    # Written under a dot-name and renamed, so readers never pick up a
+    # partial file.
+    directory.mkdir(parents=True, exist_ok=True)
+    name = f"{prefix}-{uuid.uuid4().hex}.parquet"
+    tmp_path = directory / f".{name}.tmp"
+    pq.write_table(table, tmp_path, compression="zstd")
+    os.replace(tmp_path, directory / name)
+    return directory / name
+
+
+def _records(df: pd.DataFrame) -> list:
+    if df.empty:
+        return []
+    return df.to_json(
+        orient="records", lines=True, date_format="iso", default_handler=str
+    ).splitlines()
+
+
+# -----------------------------------------------------
+# Buffered writer
+# -----------------------------------------------------
+class QuarantineSink:
+    """
+    Buffered writer into the quarantine store for one run and stage.
+
+    Failed rows are tagged with run_id, stage, dataset and rule, kept in
+    memory and written as one Parquet file per dataset partition when
+    QUARANTINE_FLUSH_ROWS rows are pending or the sink is closed. Each
+    worker (thread or process) may own its own sink; files never collide.
+    """
+
+    def __init__(self, run_id: str, stage: str, flush_rows: int = QUARANTINE_FLUSH_ROWS):
+        self.run_id = run_id
+        self.stage = stage
+        self.flush_rows = flush_rows
+        self.rows = 0
+        self._pending = {}
+        self._pending_rows = 0
+        self._lock = threading.Lock()
+
+    def add(self, dataset: str, df: pd.DataFrame, rule: str | pd.Series):
+        """
+        Queue failed rows. `rule` is one rule name for all rows or a
+        Series aligned with `df` naming the rule(s) each row broke.
+        """
+        if df.empty:
+            return
+
+        rules = rule.tolist() if isinstance(rule, pd.Series) else [rule] * len(df)
+        batch = pd.DataFrame(
+            {
+                "run_id": self.run_id,
+                "rule": rules,
+                "quarantined_at": datetime.utcnow(),
+                "record": _records(df),
+            }
+        )
+
+        with self._lock:
+            self._pending.setdefault(dataset, []).append(batch)
+            self._pending_rows += len(batch)
+            self.rows += len(batch)
+            if self._pending_rows >= self.flush_rows:
+                self._flush()
+
+    def flush(self):
+        with self._lock:
+            self._flush()
+
+    def _flush(self):
+        month = datetime.utcnow().strftime("%Y-%m")
+
+        for dataset, batches in self._pending.items():
+            frame = pd.concat(batches, ignore_index=True)
+            table = pa.Table.from_pandas(
+                frame, schema=STORE_SCHEMA, preserve_index=False
+            )
+            path = _write_part(_partition_dir(self.stage, dataset, month), table)
+            logger.info(
+                f"Quarantined {len(frame)} {dataset} rows "
+                f"(run {self.run_id}, {self.stage}) → {path.name}"
+            )
+
+        self._pending = {}
+        self._pending_rows = 0
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+
+# -----------------------------------------------------
+# Compaction
+# -----------------------------------------------------
+def compact_quarantine(include_current_month: bool = False) -> int:
+    """
+    Merge every month partition holding more than one file into a single
+    file. The current month is still being appended to and is left alone
+    unless `include_current_month`. Returns the number of files removed.
+
+    The merged file is published before the originals are deleted, so a
+    concurrent reader may briefly see rows twice but never loses any.
+    """
+    current = f"month={datetime.utcnow().strftime('%Y-%m')}"
+    removed = 0
+
+    for directory in sorted(QUARANTINE_STORE_DIR.glob("stage=*/dataset=*/month=*")):
+        if directory.name == current and not include_current_month:
+            continue
+
+        files = sorted(directory.glob("*.parquet"))
+        if len(files) <= 1:
+            continue
+
+        table = pa.concat_tables(
+            pq.read_table(f, schema=STORE_SCHEMA) for f in files
+        )
+        table = table.sort_by([("run_id", "ascending"), ("quarantined_at", "ascending")])
+        _write_part(directory, table, prefix="compacted")
+
+        for f in files:
+            f.unlink()
+        removed += len(files) - 1
+
+        logger.info(f"Compacted {len(files)} files in {directory.relative_to(QUARANTINE_STORE_DIR)}")
+
+    return removed
+
+
+def purge_quarantine(before_month: str) -> int:
+    """
+    Delete month partitions older than `before_month` (YYYY-MM).
+    Returns the number of partitions removed.
+    """
+    removed = 0
+    for directory in QUARANTINE_STORE_DIR.glob("stage=*/dataset=*/month=*"):
+        if directory.name.split("=", 1)[1] < before_month:
+            shutil.rmtree(directory)
+            removed += 1
+    return removed
+
+
+# -----------------------------------------------------
+# Query API
+# -----------------------------------------------------
+def query_quarantine(
+    run_id: str | None = None,
+    stage: str | None = None,
+    dataset: str | None = None,
+    rule: str | None = None,
+    expand: bool = False,
+) -> pd.DataFrame:
+    """
+    Quarantined rows matching every given filter.
+
+    stage and dataset prune partition directories; run_id uses Parquet
+    statistics; rule matches rows tagged with exactly that rule. With
+    `expand`, the JSON record is unpacked into columns (only sensible
+    when filtering on a single dataset).
+    """
+    if not any(QUARANTINE_STORE_DIR.glob("stage=*/dataset=*/month=*/*.parquet")):
+        return pd.DataFrame(
+            columns=["stage", "dataset", "month", *STORE_SCHEMA.names]
+        )
+
+    clauses, params = [], []
+    for col, value in (("run_id", run_id), ("stage", stage), ("dataset", dataset)):
+        if value is not None:
+            clauses.append(f"{col} = ?")
+            params.append(value)
+    if rule is not None:
+        clauses.append("list_contains(string_split(rule, ?), ?)")
+        params.extend([RULE_SEPARATOR, rule])
+
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    source = (
+        f"read_parquet('{QUARANTINE_STORE_DIR.as_posix()}/*/*/*/*.parquet', "
+        "hive_partitioning = true)"
+    )
+
+    import duckdb
+
+    con = duckdb.connect(config=duckdb_config())
+    try:
+        df = con.execute(
+            f"SELECT stage, dataset, month, run_id, rule, quarantined_at, record "
+            f"FROM {source} {where} ORDER BY quarantined_at",
+            params,
+        ).df()
+    finally:
+        con.close()
+
+    if expand and not df.empty:
+        records = pd.json_normalize(df["record"].map(json.loads).tolist())
+        df = pd.concat([df.drop(columns="record"), records], axis=1)
+
+    return df
@@ -1,162 +1,586 @@
+import threading
+import numpy as np
 import pandas as pd
-import great_expectations as ge
-from datetime import datetime
-from pathlib import Path
+import pyarrow.parquet as pq
 
-from src.core.config import SILVER_DIR, GOLD_DIR, QUARANTINE_DIR
+from src.core.audit import (
+    deferred_audit,
+    drain_audit_records,
+    flush_audit_records,
+    replay_audit_records,
+    write_audit_record,
+    write_dq_result,
+    write_dq_violation,
+)
+from src.core.config import (
+    DQ_FACT_PARTITIONS,
+    DQ_EXECUTOR,
+    DQ_MAX_WORKERS,
+    DQ_GE_ENABLED,
+    DQ_GE_SAMPLE_ROWS,
+    DQ_PROFILE_MODE,
+    DQ_SKETCH_BATCH_ROWS,
+)
+from src.core.quarantine import QuarantineSink, RULE_SEPARATOR
+from src.core.dataset_registry import fused_active, get_table
+from src.core.executor import run_tasks
 from src.core.logging import get_logger
+from src.core.metrics import instrument_stage, track
+from src.data_quality.profiling import (
+    detect_drift,
+    flagged_partitions,
+    sketched_partitions,
+    key_partitions,
+    load_previous_profile,
+    profile_batches,
+    save_profile,
+)
+from src.data_quality.rules import (
+    DQ_RULES,
+    KEY_RULES,
+    applicable_rules,
+    evaluate_rules,
+    failed_rule_tags,
+    rule_keys,
+    rule_name,
+    score_bands,
+)
+from src.pipeline.catalog import DQ_DATASETS, DQ_FACT_DATASET
 
 logger = get_logger("DATA_QUALITY")
 
-# -----------------------------------------------------
-# Completeness & Uniqueness Rules
-# -----------------------------------------------------
-CRITICAL_COLUMNS = {
-    "schools": ["school_id"],
-    "students": ["student_id"],
-    "grading_groups": ["assessment_level_id"],
-    "test_details": ["assessment_type"],
-}
-
-# Composite key rule
-COMPOSITE_KEYS = {
-    "teachers": ["teacher_id", "school_id", "school_year", "course_name", "course_no"],
-}
+STAGE = "data_quality"
+
+DATASETS = DQ_DATASETS
 
 # -----------------------------------------------------
-# Airflow entry point
+# Per-run table cache
 # -----------------------------------------------------
-def run_ge_checks(run_id: str):
+_tables = {}
+_tables_lock = threading.Lock()
+
+
+def _dataset_files(dataset: str, run_id: str | None = None) -> list:
+    if dataset == DQ_FACT_DATASET:
+        # The Gold fact as staged by this run, else as last published
+        from src.pipeline import gold_versions
+
+        return gold_versions.table_files("fact_tests", run_id=run_id)
+    path = DATASETS[dataset]
+    return [path] if path.exists() else []
+
+
+def _cache_key(dataset: str, files: list) -> tuple:
+    stats = tuple((str(f), f.stat().st_mtime_ns, f.stat().st_size) for f in files)
+    return dataset, stats
+
+
+def _load_table(dataset: str, run_id: str | None = None) -> pd.DataFrame:
     """
-    Non-blocking Data Engineering + Data Quality checks.
-    Failed rows are quarantined per dataset.
+    Load a DQ dataset at most once per run and process. Entries are keyed
+    by file mtime/size, so a rewritten file is never served stale.
+    Cached frames are shared: callers must not modify them in place.
+
+    In a fused run, tables published by the Silver stage are taken from
+    the in-memory registry instead of their (possibly unwritten) files.
     """
+    table = get_table(dataset)
+    if table is not None:
+        key = (dataset, "registry", id(table))
+        with _tables_lock:
+            if key in _tables:
+                return _tables[key]
+        df = table.to_pandas()
+        with _tables_lock:
+            return _tables.setdefault(key, df)
 
-    context = ge.get_context()
-    QUARANTINE_DIR.mkdir(parents=True, exist_ok=True)
+    key = _cache_key(dataset, _dataset_files(dataset, run_id))
 
-    datasets = {
-        "schools": SILVER_DIR / "schools.parquet",
-        "teachers": SILVER_DIR / "teachers.parquet",
-        "students": SILVER_DIR / "students.parquet",
-        "grading_groups": SILVER_DIR / "grading_groups.parquet",
-        "test_details": SILVER_DIR / "test_details.parquet",
-        "tests": SILVER_DIR / "tests.parquet",
-        "fact_test_results": GOLD_DIR / "fact_test_results.parquet",
-    }
+    with _tables_lock:
+        if key in _tables:
+            return _tables[key]
 
-    grading_groups = None
-    if (SILVER_DIR / "grading_groups.parquet").exists():
-        grading_groups = pd.read_parquet(
-            SILVER_DIR / "grading_groups.parquet"
-        )
+    if dataset == DQ_FACT_DATASET:
+        # Partitioned Gold dataset: scan only DQ_FACT_PARTITIONS
+        from src.pipeline.gold_reader import read_gold
 
-    for dataset, path in datasets.items():
-        if not path.exists():
-            logger.warning(f"[DQ] Skipping missing dataset: {dataset}")
-            continue
+        df = read_gold("fact_tests", filters=DQ_FACT_PARTITIONS, run_id=run_id)
+    else:
+        df = pd.read_parquet(DATASETS[dataset])
 
-        logger.info(f"[DQ] Processing {dataset}")
-        df = pd.read_parquet(path)
-        failed_mask = pd.Series(False, index=df.index)
+    with _tables_lock:
+        return _tables.setdefault(key, df)
 
-        validator = context.sources.pandas_default.read_dataframe(
-            df, asset_name=dataset
+
+def _iter_batches(
+    dataset: str,
+    batch_rows: int = DQ_SKETCH_BATCH_ROWS,
+    run_id: str | None = None,
+):
+    """
+    A DQ dataset as DataFrames of at most `batch_rows` rows, read without
+    loading (or caching) the whole table.
+    """
+    table = get_table(dataset)
+    if table is not None:
+        batches = table.to_batches(max_chunksize=batch_rows)
+    elif dataset == DQ_FACT_DATASET:
+        from src.pipeline.gold_reader import iter_gold_batches
+
+        batches = iter_gold_batches(
+            "fact_tests", filters=DQ_FACT_PARTITIONS, batch_rows=batch_rows, run_id=run_id
         )
+    else:
+        batches = pq.ParquetFile(DATASETS[dataset]).iter_batches(batch_size=batch_rows)
+
+    for batch in batches:
+        yield batch.to_pandas()
+
+
+def _dataset_available(dataset: str, run_id: str | None = None) -> bool:
+    return get_table(dataset) is not None or bool(_dataset_files(dataset, run_id))
+
+
+def _clear_tables():
+    with _tables_lock:
+        _tables.clear()
+
+
+# -----------------------------------------------------
+# Optional Great Expectations reporting
+# -----------------------------------------------------
+_ge_context = None
+_ge_lock = threading.Lock()
+
+
+def _get_ge_context():
+    # great_expectations is imported and its context built once per
+    # process, and only when GE reporting is enabled.
+    global _ge_context
 
-        # -------------------------------------------------
-        # 1. Completeness & Uniqueness (Single Column)
-        # -------------------------------------------------
-        for col in CRITICAL_COLUMNS.get(dataset, []):
-            if col not in df.columns:
-                continue
+    with _ge_lock:
+        if _ge_context is None:
+            import great_expectations as ge
 
+            _ge_context = ge.get_context()
+        return _ge_context
+
+
+def _expect(validator, rule: dict, lookups: dict):
+    columns = rule["columns"]
+
+    if rule["rule"] == "not_null":
+        for col in columns:
             validator.expect_column_values_to_not_be_null(col)
+    elif rule["rule"] == "unique":
+        for col in columns:
             validator.expect_column_values_to_be_unique(col)
+    elif rule["rule"] == "composite_unique":
+        validator.expect_compound_columns_to_be_unique(columns)
+    elif rule["rule"] == "valid_date":
+        for col in columns:
+            validator.expect_column_values_to_not_be_null(col)
+    elif rule["rule"] == "range_by_lookup":
+        bands = lookups.get(rule["lookup"])
+        if bands is None:
+            return
+        finite = bands.replace([float("inf"), float("-inf")], pd.NA)
+        for col in columns:
+            validator.expect_column_values_to_be_between(
+                col,
+                min_value=finite["score_min"].min(),
+                max_value=finite["score_max"].max(),
+            )
 
-            failed_mask |= df[col].isnull()
-            failed_mask |= df[col].duplicated(keep=False)
 
-        # -------------------------------------------------
-        # 2. Teachers Composite Key Rule
-        # -------------------------------------------------
-        if dataset == "teachers":
-            keys = COMPOSITE_KEYS["teachers"]
+def _ge_report(dataset: str, df: pd.DataFrame, lookups: dict):
+    """
+    Validate a sample of `df` with Great Expectations for reporting.
+    Never affects the failed-row mask.
+    """
+    try:
+        sample = df
+        if len(df) > DQ_GE_SAMPLE_ROWS:
+            sample = df.sample(n=DQ_GE_SAMPLE_ROWS, random_state=0)
 
-            validator.expect_compound_columns_to_be_unique(keys)
+        validator = _get_ge_context().sources.pandas_default.read_dataframe(
+            sample, asset_name=dataset
+        )
+        for rule in DQ_RULES.get(dataset, []):
+            _expect(validator, rule, lookups)
 
-            failed_mask |= df[keys].isnull().any(axis=1)
-            failed_mask |= df.duplicated(subset=keys, keep=False)
+        result = validator.validate()
+        logger.info(
+            f"[DQ] GE report for {dataset} "
+            f"({len(sample)} sampled rows): success={result.success}"
+        )
+    except Exception as e:
+        logger.warning(f"[DQ] GE report skipped for {dataset}: {e}")
 
-        # -------------------------------------------------
-        # 3. Assessment Date Validity (tests only)
-        # -------------------------------------------------
-        if dataset == "tests" and "assessment_date" in df.columns:
-            today = datetime.today().date()
 
-            parsed = pd.to_datetime(
-                df["assessment_date"],
-                format="%d/%m/%Y",
-                errors="coerce"
-            )
+# -----------------------------------------------------
+# Per-dataset check (runs on a DQ worker)
+# -----------------------------------------------------
+def _check_dataset(run_id: str, dataset: str, lookups: dict) -> dict | None:
+    """
+    Evaluate one dataset's rules. Returns the violations and the failed
+    rows with the rules each broke; audit and quarantine writes happen in
+    the calling process.
+    """
+    if not _dataset_available(dataset, run_id):
+        logger.warning(f"[DQ] Skipping missing dataset: {dataset}")
+        return None
+
+    logger.info(f"[DQ] Processing {dataset}")
+    if DQ_PROFILE_MODE == "sketch":
+        return _check_dataset_sketched(run_id, dataset, lookups)
+
+    with track(run_id, STAGE, "load", entity=dataset) as step:
+        df = _load_table(dataset, run_id)
+        step["rows_out"] = len(df)
+
+    with track(run_id, STAGE, "evaluate", entity=dataset, rows_in=len(df)) as step:
+        failed_mask, violations = evaluate_rules(dataset, df, lookups)
+        step["rows_out"] = int((~failed_mask).sum())
+
+    if DQ_GE_ENABLED:
+        with track(run_id, STAGE, "ge_report", entity=dataset, rows_in=len(df)):
+            _ge_report(dataset, df, lookups)
+
+    failed = failed_rules = None
+    if failed_mask.any():
+        failed = df.loc[failed_mask]
+        failed_rules = failed_rule_tags(violations, failed_mask, RULE_SEPARATOR)
+
+    # Per-row masks stay in the worker
+    for violation in violations:
+        del violation["mask"]
+
+    return {
+        "dataset": dataset,
+        "rows": len(df),
+        "violations": violations,
+        "failed": failed,
+        "failed_rules": failed_rules,
+    }
+
+
+# -----------------------------------------------------
+# Sketch mode (DQ_PROFILE_MODE=sketch)
+#
+#   1. profile:  one streaming pass → per-column null counts, HyperLogLog
+#                and t-digest sketches, per-partition key sketches;
+#                persisted, compared with the previous run (drift)
+#   2. approximate checks: not_null passes outright when the profile
+#                counted no nulls, uniqueness when no key partition is
+#                flagged (WARN, not PASSED, when some partitions were
+#                only estimated and not re-checked)
+#   3. evaluate: only if something is left, a second streaming pass runs
+#                the row-level rules batch by batch and keeps the rows of
+#                flagged key partitions, whose duplicates are then
+#                extracted exactly
+# -----------------------------------------------------
+def _key_candidates(df: pd.DataFrame, rule: dict, flagged: dict, partitions: int) -> np.ndarray:
+    # Rows of `df` in a flagged partition of any of the rule's keys
+    keep = np.zeros(len(df), dtype=bool)
+    for key in rule_keys(rule):
+        if flagged[key]:
+            _, partition = key_partitions(df, key, partitions)
+            keep |= np.isin(partition, flagged[key])
+    return keep
+
+
+def _check_dataset_sketched(run_id: str, dataset: str, lookups: dict) -> dict:
+    """
+    _check_dataset() without holding the dataset in memory; same result
+    shape, plus the drift alerts against the previous run's profile.
+    """
+    keys = [
+        key
+        for rule in DQ_RULES.get(dataset, [])
+        if rule["rule"] in KEY_RULES
+        for key in rule_keys(rule)
+    ]
+
+    with track(run_id, STAGE, "profile", entity=dataset) as step:
+        profile = profile_batches(_iter_batches(dataset, run_id=run_id), keys)
+        step["rows_out"] = profile["rows"]
+
+    previous = load_previous_profile(dataset, run_id)
+    save_profile(run_id, dataset, profile)
+    drift = detect_drift(profile, previous) if previous else []
+
+    rules = applicable_rules(dataset, profile["columns"])
+    counts = {rule_name(rule): 0 for rule in rules}
+    row_rules, key_rules = [], []
+    for rule in rules:
+        if rule["rule"] in KEY_RULES:
+            key_rules.append(rule)
+        elif rule["rule"] != "not_null" or any(
+            profile["columns"][col]["nulls"] for col in rule["columns"]
+        ):
+            row_rules.append(rule)
+
+    partitions = next(
+        (len(stats["rows"]) for stats in profile["keys"].values()), 0
+    )
+    flagged = {key: flagged_partitions(profile, key) for key in profile["keys"]}
+    unverified = {
+        key: set(sketched_partitions(profile, key)) - set(flagged[key])
+        for key in profile["keys"]
+    }
+    key_rules = [
+        rule for rule in key_rules if any(flagged[key] for key in rule_keys(rule))
+    ]
+
+    failed_parts, tag_parts = [], []
+    if row_rules or key_rules:
+        candidates = {rule_name(rule): [] for rule in key_rules}
+
+        with track(run_id, STAGE, "evaluate", entity=dataset, rows_in=profile["rows"]) as step:
+            offset = 0
+            for df in _iter_batches(dataset, run_id=run_id):
+                # Positions in the whole dataset, so failures of both
+                # passes below line up
+                df.index = pd.RangeIndex(offset, offset + len(df))
+                offset += len(df)
 
-            invalid_dates = parsed.isna() | (parsed.dt.date > today)
-            failed_mask |= invalid_dates
-
-            validator.expect_column_values_to_not_be_null("assessment_date")
-
-        # -------------------------------------------------
-        # 4. DE Rule – Valid Score Ranges
-        # -------------------------------------------------
-        if dataset == "fact_test_results" and grading_groups is not None:
-            if {"standard_score", "assessment_level_id"}.issubset(df.columns):
-                merged = df.merge(
-                    grading_groups[
-                        ["assessment_level_id", "score_min", "score_max"]
-                    ],
-                    on="assessment_level_id",
-                    how="left"
-                )
-
-                invalid_scores = (
-                    merged["standard_score"].isnull() |
-                    (merged["standard_score"] < merged["score_min"]) |
-                    (merged["standard_score"] > merged["score_max"])
-                )
-
-                failed_mask |= invalid_scores
-
-                validator.expect_column_values_to_be_between(
-                    "standard_score",
-                    min_value=merged["score_min"].min(),
-                    max_value=merged["score_max"].max(),
-                )
-
-                logger.info(
-                    f"[DQ] Invalid score rows: {invalid_scores.sum()}"
-                )
-
-        # -------------------------------------------------
-        # GE validation (reporting only)
-        # -------------------------------------------------
-        validator.validate()
-
-        # -------------------------------------------------
-        # Quarantine
-        # -------------------------------------------------
-        if failed_mask.any():
-            out = (
-                QUARANTINE_DIR /
-                f"{dataset}_dq_failed_{run_id}.parquet"
+                if row_rules:
+                    mask, violations = evaluate_rules(dataset, df, lookups, rules=row_rules)
+                    for violation in violations:
+                        counts[violation["rule"]] += violation["count"]
+                    if mask.any():
+                        failed_parts.append(df.loc[mask])
+                        tag_parts.append(failed_rule_tags(violations, mask, RULE_SEPARATOR))
+
+                for rule in key_rules:
+                    keep = _key_candidates(df, rule, flagged, partitions)
+                    if keep.any():
+                        candidates[rule_name(rule)].append(df.loc[keep])
+
+            for rule in key_rules:
+                parts = candidates[rule_name(rule)]
+                if not parts:
+                    continue
+                subset = pd.concat(parts)
+                mask, violations = evaluate_rules(dataset, subset, lookups, rules=[rule])
+                counts[rule_name(rule)] = violations[0]["count"]
+                if mask.any():
+                    failed_parts.append(subset.loc[mask])
+                    tag_parts.append(failed_rule_tags(violations, mask, RULE_SEPARATOR))
+
+            step["rows_out"] = profile["rows"] - len(
+                set().union(*(part.index for part in failed_parts))
             )
 
-            df.loc[failed_mask].to_parquet(out, index=False)
+    failed = failed_rules = None
+    if failed_parts:
+        failed = pd.concat(failed_parts)
+        failed = failed[~failed.index.duplicated()].sort_index()
+        failed_rules = (
+            pd.concat(tag_parts)
+            .groupby(level=0, sort=True)
+            .agg(RULE_SEPARATOR.join)
+            .reindex(failed.index)
+        )
+
+    return {
+        "dataset": dataset,
+        "rows": profile["rows"],
+        "violations": [
+            {
+                "rule": rule_name(rule),
+                "rule_type": rule["rule"],
+                "columns": rule["columns"],
+                "count": counts[rule_name(rule)],
+                "approximate": rule["rule"] in KEY_RULES
+                and any(unverified[key] for key in rule_keys(rule)),
+            }
+            for rule in rules
+        ],
+        "failed": failed,
+        "failed_rules": failed_rules,
+        "drift": drift,
+    }
+
 
-            logger.error(
-                f"[DQ FAILED] {dataset}: "
-                f"{failed_mask.sum()} rows → {out.name}"
+def _build_lookups() -> dict:
+    # Shared read-only lookups, built once per run
+    lookups = {}
+    if _dataset_available("grading_groups"):
+        lookups["score_bands"] = score_bands(_load_table("grading_groups"))
+    return lookups
+
+
+def _record_result(run_id: str, result: dict, quarantine: QuarantineSink) -> int:
+    """
+    Audit rows and quarantine for one dataset's result. Returns the
+    number of failed rows.
+    """
+    dataset = result["dataset"]
+
+    for violation in result["violations"]:
+        if violation["count"]:
+            status = "FAILED"
+        elif violation.get("approximate"):
+            # Sketch mode: no duplicates found, but not proven either
+            status = "WARN"
+            logger.warning(
+                f"[DQ APPROXIMATE] {dataset} {violation['rule']}: no duplicates "
+                f"flagged, checked by sketch estimates only"
             )
         else:
-            logger.info(f"[DQ PASSED] {dataset}")
+            status = "PASSED"
+        write_dq_result(run_id, dataset, violation["rule"], status, violation["count"])
+        if violation["count"]:
+            write_dq_violation(
+                run_id,
+                STAGE,
+                dataset,
+                violation["rule_type"],
+                ",".join(violation["columns"]),
+                violation["count"],
+            )
+            logger.info(
+                f"[DQ] {dataset} {violation['rule']}: "
+                f"{violation['count']} rows"
+            )
+
+    for alert in result.get("drift", []):
+        write_dq_result(
+            run_id, dataset, f"drift:{alert['metric']}:{alert['column']}", "WARN", 0
+        )
+        logger.warning(
+            f"[DQ DRIFT] {dataset}.{alert['column']} {alert['metric']}: "
+            f"{alert['previous']:.4g} → {alert['current']:.4g}"
+        )
+
+    # -------------------------------------------------
+    # Quarantine
+    # -------------------------------------------------
+    failed = result["failed"]
+
+    if failed is None:
+        logger.info(f"[DQ PASSED] {dataset}")
+        return 0
+
+    quarantine.add(dataset, failed, result["failed_rules"])
+    logger.error(
+        f"[DQ FAILED] {dataset}: "
+        f"{len(failed)} rows quarantined"
+    )
+    return len(failed)
+
+
+# -----------------------------------------------------
+# Airflow entry point
+# -----------------------------------------------------
+@instrument_stage(STAGE)
+def run_ge_checks(
+    run_id: str,
+    executor: str = DQ_EXECUTOR,
+    max_workers: int | None = DQ_MAX_WORKERS,
+):
+    """
+    Non-blocking Data Engineering + Data Quality checks.
+    Each dataset's rules (src/data_quality/rules.py) run in one
+    vectorized pass, datasets run concurrently on `executor`; failed
+    rows go to the quarantine store tagged with the rules they broke.
+
+    In a fused run, datasets come from the in-memory registry and process
+    workers are replaced by threads so they can see it.
+    """
+    if fused_active() and executor == "process":
+        executor = "thread"
+
+    _clear_tables()
+    quarantine = QuarantineSink(run_id, STAGE)
+    total_rows = total_failed = 0
+
+    try:
+        lookups = _build_lookups()
+        results = run_tasks(
+            _check_dataset,
+            [(run_id, dataset, lookups) for dataset in DATASETS],
+            mode=executor,
+            max_workers=max_workers,
+        )
+
+        for result in filter(None, results):
+            total_rows += result["rows"]
+            total_failed += _record_result(run_id, result, quarantine)
+
+        with track(run_id, STAGE, "quarantine", rows_in=quarantine.rows):
+            quarantine.close()
+
+        write_audit_record(
+            run_id,
+            STAGE,
+            "SUCCESS",
+            row_count=total_rows,
+            valid_count=total_rows - total_failed,
+            invalid_count=total_failed,
+        )
+        logger.info("[DQ] All Data Quality checks completed (non-blocking)")
+
+    except Exception as e:
+        write_audit_record(run_id, STAGE, "FAILED", error_message=str(e))
+        raise
+
+    finally:
+        _clear_tables()
+        flush_audit_records()
+
+
+# -----------------------------------------------------
+# Per-dataset entry points (Airflow task mapping)
+#
+#   check_dataset (mapped over DATASETS) → commit_ge_checks
+#
+# Mapped tasks never open DuckDB; their audit/metric rows are written by
+# commit_ge_checks.
+# -----------------------------------------------------
+def check_dataset(run_id: str, dataset: str) -> dict:
+    """
+    Check one dataset and quarantine its failed rows. Returns row counts
+    and the buffered audit rows for commit_ge_checks().
+    """
+    summary = {"dataset": dataset, "rows": 0, "failed": 0}
+
+    with deferred_audit():
+        try:
+            with QuarantineSink(run_id, STAGE) as quarantine:
+                result = _check_dataset(run_id, dataset, _build_lookups())
+                if result is not None:
+                    summary["rows"] = result["rows"]
+                    summary["failed"] = _record_result(run_id, result, quarantine)
+        finally:
+            _clear_tables()
+
+        summary["audit"] = drain_audit_records()
+    return summary
+
+
+@instrument_stage(STAGE)
+def commit_ge_checks(run_id: str, summaries: list, fact_summary: dict | None = None):
+    """
+    Write the audit rows and the stage audit record for the
+    check_dataset() results of one run (`fact_summary`: the Gold fact,
+    checked separately once it is built).
+    """
+    summaries = list(summaries) + ([fact_summary] if fact_summary else [])
+    for summary in summaries:
+        replay_audit_records(summary.pop("audit", {}))
+
+    total_rows = sum(s["rows"] for s in summaries)
+    total_failed = sum(s["failed"] for s in summaries)
 
+    write_audit_record(
+        run_id,
+        STAGE,
+        "SUCCESS",
+        row_count=total_rows,
+        valid_count=total_rows - total_failed,
+        invalid_count=total_failed,
+    )
     logger.info("[DQ] All Data Quality checks completed (non-blocking)")
@@ -0,0 +1,342 @@
+import json
+import os
+import numpy as np
+import pandas as pd
+from pathlib import Path
+
+from src.core.config import (
+    DQ_PROFILE_DIR,
+    DQ_PROFILE_KEEP,
+    DQ_SKETCH_PARTITIONS,
+    DQ_SKETCH_SPARSE_LIMIT,
+    DQ_SKETCH_DUP_TOLERANCE,
+    DQ_DRIFT_NULL_RATE,
+    DQ_DRIFT_DISTINCT_RATIO,
+    DQ_DRIFT_QUANTILE_SHIFT,
+)
+from src.core.logging import get_logger
+from src.data_quality.sketches import HyperLogLog, TDigest, hash_values
+
+logger = get_logger("DATA_QUALITY")
+
+# -----------------------------------------------------
+# Dataset profiles
+#
+# A profile is built in one streaming pass over a dataset's batches:
+#
+#   {
+#     "rows": int,
+#     "columns": {column: {"nulls": int,
+#                          "distinct": HyperLogLog,
+#                          "digest": TDigest (numeric columns) | None}},
+#     "keys": {(column, ...): {"rows": rows per hash partition,
+#                              "distinct": [HyperLogLog per partition]}},
+#   }
+#
+# Rows are assigned to a key's partition by the hash of the key, so all
+# copies of a key value land in the same partition: a partition whose
+# distinct count equals its row count holds no duplicates.
+# -----------------------------------------------------
+SUMMARY_QUANTILES = (0.01, 0.1, 0.5, 0.9, 0.99)
+DRIFT_QUANTILES = (0.1, 0.5, 0.9)
+
+# Register precision: 2**14 registers (~0.8% error) per column, 2**16
+# (~0.4%) per key partition, where the estimate decides what is
+# re-checked exactly
+COLUMN_PRECISION = 14
+KEY_PRECISION = 16
+
+
+def key_partitions(
+    df: pd.DataFrame,
+    key: tuple,
+    partitions: int,
+    hashes: np.ndarray | None = None,
+) -> tuple:
+    """
+    (hashes, partition) per row of `df` for a key column tuple.
+    """
+    if hashes is None:
+        hashes = hash_values(df[key[0]] if len(key) == 1 else df[list(key)])
+    return hashes, (hashes % np.uint64(partitions)).astype(np.int64)
+
+
+def _is_numeric(values: pd.Series) -> bool:
+    return pd.api.types.is_numeric_dtype(values) and not pd.api.types.is_bool_dtype(values)
+
+
+def new_profile(keys: list, partitions: int = DQ_SKETCH_PARTITIONS) -> dict:
+    return {
+        "rows": 0,
+        "columns": {},
+        "keys": {
+            tuple(key): {
+                "rows": np.zeros(partitions, dtype=np.int64),
+                "distinct": [
+                    HyperLogLog(KEY_PRECISION, DQ_SKETCH_SPARSE_LIMIT)
+                    for _ in range(partitions)
+                ],
+            }
+            for key in keys
+        },
+    }
+
+
+def update_profile(profile: dict, df: pd.DataFrame) -> dict:
+    """
+    Fold one batch into `profile` (in place).
+    """
+    profile["rows"] += len(df)
+    column_hashes = {}
+
+    for column in df.columns:
+        values = df[column]
+        stats = profile["columns"].setdefault(
+            column,
+            {
+                "nulls": 0,
+                "distinct": HyperLogLog(COLUMN_PRECISION, DQ_SKETCH_SPARSE_LIMIT),
+                "digest": TDigest() if _is_numeric(values) else None,
+            },
+        )
+        column_hashes[column] = hash_values(values)
+        stats["nulls"] += int(values.isna().sum())
+        stats["distinct"].add(column_hashes[column])
+        if stats["digest"] is not None:
+            stats["digest"].add(values.to_numpy(dtype=np.float64, na_value=np.nan))
+
+    for key, stats in profile["keys"].items():
+        if not all(col in df.columns for col in key):
+            continue
+        partitions = len(stats["distinct"])
+        hashes, partition = key_partitions(
+            df, key, partitions, column_hashes.get(key[0]) if len(key) == 1 else None
+        )
+        counts = np.bincount(partition, minlength=partitions)
+        stats["rows"] += counts
+        grouped = hashes[np.argsort(partition, kind="stable")]
+        for p, part in enumerate(np.split(grouped, np.cumsum(counts)[:-1])):
+            if len(part):
+                stats["distinct"][p].add(part)
+
+    return profile
+
+
+def profile_batches(batches, keys: list, partitions: int = DQ_SKETCH_PARTITIONS) -> dict:
+    """
+    Profile a stream of DataFrames in a single pass; memory is bounded
+    by the sketches, not by the number of rows.
+    """
+    profile = new_profile(keys, partitions)
+    for df in batches:
+        update_profile(profile, df)
+    return profile
+
+
+def flagged_partitions(
+    profile: dict,
+    key: tuple,
+    tolerance: float = DQ_SKETCH_DUP_TOLERANCE,
+) -> list:
+    """
+    Partitions of `key` that may contain duplicate values. Exact while a
+    partition's sketch is sparse; past that, partitions whose distinct
+    estimate is below rows × (1 − tolerance).
+    """
+    stats = profile["keys"][tuple(key)]
+    flagged = []
+    approximate = 0
+    for partition, (rows, sketch) in enumerate(zip(stats["rows"], stats["distinct"])):
+        limit = rows if sketch.is_sparse else rows * (1 - tolerance)
+        approximate += not sketch.is_sparse
+        if sketch.estimate() < limit:
+            flagged.append(partition)
+
+    if approximate:
+        logger.info(
+            f"[DQ] Uniqueness of {','.join(key)} is approximate in {approximate} of "
+            f"{len(stats['distinct'])} partitions (more than DQ_SKETCH_SPARSE_LIMIT "
+            f"distinct values each)"
+        )
+    return flagged
+
+
+def sketched_partitions(profile: dict, key: tuple) -> list:
+    """
+    Partitions of `key` whose uniqueness is only estimated (registers,
+    not exact hashes): a duplicate rate within the tolerance or the
+    sketch error goes unflagged there.
+    """
+    stats = profile["keys"][tuple(key)]
+    return [p for p, sketch in enumerate(stats["distinct"]) if not sketch.is_sparse]
+
+
+def summarize(profile: dict) -> dict:
+    """
+    Plain per-column statistics of a profile.
+    """
+    rows = profile["rows"]
+    summary = {}
+    for column, stats in profile["columns"].items():
+        distinct = stats["distinct"].estimate()
+        summary[column] = {
+            "rows": rows,
+            "nulls": stats["nulls"],
+            "null_rate": stats["nulls"] / rows if rows else 0.0,
+            "distinct": round(distinct),
+            "distinct_ratio": distinct / rows if rows else 0.0,
+        }
+        if stats["digest"] is not None:
+            summary[column]["quantiles"] = {
+                q: stats["digest"].quantile(q) for q in SUMMARY_QUANTILES
+            }
+    return summary
+
+
+# -----------------------------------------------------
+# Drift
+# -----------------------------------------------------
+def detect_drift(current: dict, previous: dict) -> list:
+    """
+    Compare two profiles of the same dataset column by column. Alerts on
+    null-rate and distinct-ratio changes and on quantile shifts relative
+    to the previous p10–p90 spread.
+
+    Returns [{"column", "metric", "previous", "current"}].
+    """
+    now, before = summarize(current), summarize(previous)
+    alerts = []
+
+    def alert(column, metric, old, new):
+        alerts.append(
+            {"column": column, "metric": metric, "previous": old, "current": new}
+        )
+
+    for column, stats in now.items():
+        old = before.get(column)
+        if old is None:
+            continue
+
+        if abs(stats["null_rate"] - old["null_rate"]) > DQ_DRIFT_NULL_RATE:
+            alert(column, "null_rate", old["null_rate"], stats["null_rate"])
+        if abs(stats["distinct_ratio"] - old["distinct_ratio"]) > DQ_DRIFT_DISTINCT_RATIO:
+            alert(column, "distinct_ratio", old["distinct_ratio"], stats["distinct_ratio"])
+
+        if "quantiles" not in stats or "quantiles" not in old:
+            continue
+        spread = old["quantiles"][0.9] - old["quantiles"][0.1]
+        scale = spread if spread > 0 else max(abs(old["quantiles"][0.5]), 1.0)
+        for q in DRIFT_QUANTILES:
+            new_value, old_value = stats["quantiles"][q], old["quantiles"][q]
+            if np.isnan(new_value) or np.isnan(old_value):
+                continue
+            if abs(new_value - old_value) / scale > DQ_DRIFT_QUANTILE_SHIFT:
+                alert(column, f"p{round(q * 100)}", old_value, new_value)
+
+    return alerts
+
+
+# -----------------------------------------------------
+# Persistence: DQ_PROFILE_DIR/<dataset>/<run_id>.npz
+# -----------------------------------------------------
+def _profile_path(dataset: str, run_id: str) -> Path:
+    return DQ_PROFILE_DIR / dataset / f"{run_id}.npz"
+
+
+def _put(arrays: dict, prefix: str, state: dict):
+    for name, value in state.items():
+        arrays[f"{prefix}.{name}"] = value
+
+
+def _get(arrays, prefix: str) -> dict:
+    return {
+        name[len(prefix) + 1:]: arrays[name]
+        for name in arrays.files
+        if name.startswith(f"{prefix}.")
+    }
+
+
+def save_profile(run_id: str, dataset: str, profile: dict) -> Path:
+    """
+    Persist a profile with its sketches (mergeable with later profiles)
+    and drop all but the newest DQ_PROFILE_KEEP profiles of the dataset.
+    """
+    meta = {"rows": profile["rows"], "columns": [], "keys": []}
+    arrays = {}
+
+    for i, (column, stats) in enumerate(profile["columns"].items()):
+        meta["columns"].append(
+            {"name": column, "nulls": stats["nulls"], "digest": stats["digest"] is not None}
+        )
+        _put(arrays, f"c{i}.distinct", stats["distinct"].state())
+        if stats["digest"] is not None:
+            _put(arrays, f"c{i}.digest", stats["digest"].state())
+
+    for j, (key, stats) in enumerate(profile["keys"].items()):
+        meta["keys"].append(list(key))
+        arrays[f"k{j}.rows"] = stats["rows"]
+        for p, sketch in enumerate(stats["distinct"]):
+            _put(arrays, f"k{j}.p{p}", sketch.state())
+
+    arrays["meta"] = np.array(json.dumps(meta))
+
+    path = _profile_path(dataset, run_id)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    with open(tmp_path, "wb") as f:
+        np.savez_compressed(f, **arrays)
+    os.replace(tmp_path, path)
+
+    for old in _saved_profiles(dataset)[:-max(DQ_PROFILE_KEEP, 1)]:
+        old.unlink(missing_ok=True)
+
+    return path
+
+
+def load_profile(path: Path) -> dict:
+    with np.load(path) as arrays:
+        meta = json.loads(str(arrays["meta"]))
+        profile = {"rows": meta["rows"], "columns": {}, "keys": {}}
+
+        for i, column in enumerate(meta["columns"]):
+            profile["columns"][column["name"]] = {
+                "nulls": column["nulls"],
+                "distinct": HyperLogLog.from_state(_get(arrays, f"c{i}.distinct")),
+                "digest": (
+                    TDigest.from_state(_get(arrays, f"c{i}.digest"))
+                    if column["digest"] else None
+                ),
+            }
+
+        for j, key in enumerate(meta["keys"]):
+            rows = arrays[f"k{j}.rows"]
+            profile["keys"][tuple(key)] = {
+                "rows": rows,
+                "distinct": [
+                    HyperLogLog.from_state(_get(arrays, f"k{j}.p{p}"))
+                    for p in range(len(rows))
+                ],
+            }
+
+    return profile
+
+
+def _saved_profiles(dataset: str) -> list:
+    directory = DQ_PROFILE_DIR / dataset
+    if not directory.is_dir():
+        return []
+    return sorted(directory.glob("*.npz"), key=lambda p: p.stat().st_mtime_ns)
+
+
+def load_previous_profile(dataset: str, run_id: str) -> dict | None:
+    """
+    The newest persisted profile of `dataset` from another run.
+    """
+    current = _profile_path(dataset, run_id)
+    for path in reversed(_saved_profiles(dataset)):
+        if path != current:
+            try:
+                return load_profile(path)
+            except Exception as e:
+                logger.warning(f"[DQ] Ignoring unreadable profile {path.name}: {e}")
+    return None
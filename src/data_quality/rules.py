@@ -0,0 +1,241 @@
+import re
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+from datetime import datetime
+
+from src.core.logging import get_logger
+
+logger = get_logger("DATA_QUALITY")
+
+# -----------------------------------------------------
+# Rule registry
+#
+# Each dataset lists declarative rules; each rule type is a vectorized
+# function returning a boolean "row fails" mask. All of a dataset's rules
+# are evaluated in one pass over the frame.
+# -----------------------------------------------------
+TEACHER_KEY = ["teacher_id", "school_id", "school_year", "course_name", "course_no"]
+
+DQ_RULES = {
+    "schools": [
+        {"rule": "not_null", "columns": ["school_id"]},
+        {"rule": "unique", "columns": ["school_id"]},
+    ],
+    "students": [
+        {"rule": "not_null", "columns": ["student_id"]},
+        {"rule": "unique", "columns": ["student_id"]},
+    ],
+    "grading_groups": [
+        {"rule": "not_null", "columns": ["assessement_level_id"]},
+        {"rule": "unique", "columns": ["assessement_level_id"]},
+    ],
+    "test_details": [
+        {"rule": "not_null", "columns": ["assessment_type"]},
+        {"rule": "unique", "columns": ["assessment_type"]},
+    ],
+    "teachers": [
+        {"rule": "not_null", "columns": TEACHER_KEY},
+        {"rule": "composite_unique", "columns": TEACHER_KEY},
+    ],
+    "tests": [
+        {"rule": "valid_date", "columns": ["assessment_date"], "format": "%d/%m/%Y"},
+    ],
+    "fact_test_results": [
+        {
+            "rule": "range_by_lookup",
+            "columns": ["standard_score"],
+            "lookup": "score_bands",
+            "key": "assessement_level_id",
+        },
+    ],
+}
+
+
+def _not_null(df: pd.DataFrame, columns: list, **_) -> pd.Series:
+    return df[columns].isnull().any(axis=1)
+
+
+def _unique(df: pd.DataFrame, columns: list, **_) -> pd.Series:
+    mask = pd.Series(False, index=df.index)
+    for col in columns:
+        mask |= df[col].duplicated(keep=False)
+    return mask
+
+
+def _composite_unique(df: pd.DataFrame, columns: list, **_) -> pd.Series:
+    return df.duplicated(subset=columns, keep=False)
+
+
+def _valid_date(df: pd.DataFrame, columns: list, format: str = None, **_) -> pd.Series:
+    # Missing, unparseable or future dates fail. Columns already typed as
+    # dates (datetime64 or Arrow date32) are converted as-is; text is
+    # parsed with `format`.
+    today = pd.Timestamp(datetime.today().date())
+    mask = pd.Series(False, index=df.index)
+    for col in columns:
+        values = df[col]
+        if isinstance(values.dtype, pd.ArrowDtype) and pa.types.is_date(
+            values.dtype.pyarrow_dtype
+        ):
+            values = pd.to_datetime(values, errors="coerce")
+        elif not pd.api.types.is_datetime64_any_dtype(values):
+            values = pd.to_datetime(values, format=format, errors="coerce")
+        mask |= values.isna() | (values.dt.normalize() > today)
+    return mask
+
+
+def _range_by_lookup(
+    df: pd.DataFrame,
+    columns: list,
+    lookups: dict,
+    lookup: str,
+    key: str,
+    **_,
+) -> pd.Series:
+    # Value must fall inside the [score_min, score_max] band of its key.
+    bands = lookups.get(lookup)
+    if bands is None or key not in df.columns:
+        return pd.Series(False, index=df.index)
+
+    indexed = bands.set_index(key)
+    lower = df[key].map(indexed["score_min"]).astype("float64")
+    upper = df[key].map(indexed["score_max"]).astype("float64")
+
+    mask = pd.Series(False, index=df.index)
+    for col in columns:
+        values = df[col]
+        mask |= values.isnull() | (values < lower) | (values > upper)
+    return mask.fillna(True).astype(bool)
+
+
+RULE_TYPES = {
+    "not_null": _not_null,
+    "unique": _unique,
+    "composite_unique": _composite_unique,
+    "valid_date": _valid_date,
+    "range_by_lookup": _range_by_lookup,
+}
+
+# Rule types that compare rows with each other; every other type looks
+# at one row at a time and can be evaluated batch by batch
+KEY_RULES = {"unique", "composite_unique"}
+
+
+def rule_name(rule: dict) -> str:
+    return f"{rule['rule']}:{','.join(rule['columns'])}"
+
+
+def rule_keys(rule: dict) -> list:
+    """
+    Column tuples whose values must not repeat under a KEY_RULES rule:
+    one per column for "unique", all columns together for
+    "composite_unique".
+    """
+    if rule["rule"] == "unique":
+        return [(col,) for col in rule["columns"]]
+    return [tuple(rule["columns"])]
+
+
+def applicable_rules(dataset: str, columns, rules: list | None = None) -> list:
+    """
+    The rules of `dataset` (or `rules`) whose columns are all present.
+    """
+    applicable = []
+    for rule in DQ_RULES.get(dataset, []) if rules is None else rules:
+        missing = [c for c in rule["columns"] if c not in columns]
+        if missing:
+            logger.warning(
+                f"[DQ] {dataset}: skipping {rule_name(rule)}, missing columns {missing}"
+            )
+            continue
+        applicable.append(rule)
+    return applicable
+
+
+# -----------------------------------------------------
+# Lookups
+# -----------------------------------------------------
+_RANGE = re.compile(r"^\s*(\d+(?:\.\d+)?)\s*-\s*(\d+(?:\.\d+)?)\s*$")
+_BELOW = re.compile(r"^\s*<\s*(\d+(?:\.\d+)?)\s*$")
+_ABOVE = re.compile(r"^\s*(\d+(?:\.\d+)?)\s*\+\s*$")
+
+
+def _parse_score_range(text) -> tuple:
+    """
+    "80 - 89" → (80, 89), "< 70" → (-inf, <70), "129 +" → (129, inf)
+    """
+    text = "" if text is None else str(text)
+
+    if match := _RANGE.match(text):
+        return float(match.group(1)), float(match.group(2))
+    if match := _BELOW.match(text):
+        bound = float(match.group(1))
+        return -np.inf, np.nextafter(bound, -np.inf)
+    if match := _ABOVE.match(text):
+        return float(match.group(1)), np.inf
+    return np.nan, np.nan
+
+
+def score_bands(grading_groups: pd.DataFrame) -> pd.DataFrame:
+    """
+    Score band per assessment level from grading_groups.score_range.
+    """
+    bands = grading_groups[["assessement_level_id"]].copy()
+    parsed = grading_groups["score_range"].astype(object).map(_parse_score_range)
+    bands["score_min"] = [lo for lo, _ in parsed]
+    bands["score_max"] = [hi for _, hi in parsed]
+    return bands.drop_duplicates("assessement_level_id")
+
+
+# -----------------------------------------------------
+# Evaluation
+# -----------------------------------------------------
+def evaluate_rules(
+    dataset: str,
+    df: pd.DataFrame,
+    lookups: dict | None = None,
+    rules: list | None = None,
+) -> tuple:
+    """
+    Run every rule registered for `dataset` (or only `rules`).
+
+    Returns (failed_mask, violations) where failed_mask flags rows that
+    break at least one rule and violations lists
+    {"rule", "rule_type", "columns", "count", "mask"} per evaluated rule.
+    """
+    failed_mask = pd.Series(False, index=df.index)
+    violations = []
+
+    for rule in applicable_rules(dataset, df.columns, rules):
+        params = {k: v for k, v in rule.items() if k not in ("rule", "columns")}
+        mask = RULE_TYPES[rule["rule"]](
+            df, rule["columns"], lookups=lookups or {}, **params
+        )
+
+        failed_mask |= mask
+        violations.append(
+            {
+                "rule": rule_name(rule),
+                "rule_type": rule["rule"],
+                "columns": rule["columns"],
+                "count": int(mask.sum()),
+                "mask": mask,
+            }
+        )
+
+    return failed_mask, violations
+
+
+def failed_rule_tags(violations: list, failed_mask: pd.Series, separator: str = "; ") -> pd.Series:
+    """
+    For each failed row, the names of the rules it broke joined by
+    `separator`.
+    """
+    tags = pd.Series("", index=failed_mask.index[failed_mask], dtype=object)
+    for violation in violations:
+        hit = violation["mask"][failed_mask]
+        if not hit.any():
+            continue
+        tags[hit] = tags[hit].where(tags[hit] == "", tags[hit] + separator) + violation["rule"]
+    return tags
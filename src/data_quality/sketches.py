@@ -0,0 +1,241 @@
+import numpy as np
+import pandas as pd
+
+# -----------------------------------------------------
+# Mergeable column sketches
+#
+# Both sketches are built from numpy arrays a batch at a time, merge
+# with another sketch of the same kind (union of the two inputs) and
+# round-trip through a dict of arrays (state / from_state) so profiles
+# can be persisted with np.savez.
+# -----------------------------------------------------
+
+
+def hash_values(values: pd.Series | pd.DataFrame) -> np.ndarray:
+    """
+    64-bit hash per row. Equal values (NaN/None included) hash equally
+    whatever the batch or dtype they come from; a DataFrame hashes the
+    combination of its columns.
+    """
+    return pd.util.hash_pandas_object(values, index=False).to_numpy(np.uint64)
+
+
+# Register ranks are taken from 32 hash bits (1..33)
+_RANK_BITS = 32
+
+
+def _sigma(x: float) -> float:
+    if x == 1:
+        return np.inf
+    y, z = 1.0, x
+    while True:
+        x *= x
+        previous, z = z, z + x * y
+        y += y
+        if z == previous:
+            return z
+
+
+def _tau(x: float) -> float:
+    if x == 0 or x == 1:
+        return 0.0
+    y, z = 1.0, 1 - x
+    while True:
+        x = np.sqrt(x)
+        y *= 0.5
+        previous, z = z, z - (1 - x) ** 2 * y
+        if z == previous:
+            return z / 3
+
+
+class HyperLogLog:
+    """
+    Distinct-count sketch over 64-bit hashes (HLL++ layout).
+
+    Up to `sparse_limit` distinct hashes are kept as a sorted array and
+    counted exactly; past that they are folded into 2**precision
+    registers (relative standard error 1.04 / sqrt(2**precision)).
+    """
+
+    def __init__(self, precision: int = 14, sparse_limit: int = 1 << 16):
+        self.precision = precision
+        self.sparse_limit = sparse_limit
+        self._hashes = np.empty(0, dtype=np.uint64)
+        self._pending = []
+        self._pending_size = 0
+        self.registers = None
+
+    @property
+    def is_sparse(self) -> bool:
+        self._consolidate()
+        return self.registers is None
+
+    @property
+    def hashes(self) -> np.ndarray:
+        self._consolidate()
+        return self._hashes
+
+    def add(self, hashes: np.ndarray):
+        hashes = np.asarray(hashes, dtype=np.uint64)
+        if self.registers is not None:
+            self._update_registers(hashes)
+            return
+
+        # Sorting is deferred until the pending hashes outnumber the
+        # kept ones, so adding n hashes costs O(n log n) overall
+        self._pending.append(hashes)
+        self._pending_size += len(hashes)
+        if self._pending_size >= max(len(self._hashes), 1 << 12):
+            self._consolidate()
+
+    def _consolidate(self):
+        if not self._pending:
+            return
+        self._hashes = np.unique(np.concatenate([self._hashes, *self._pending]))
+        self._pending = []
+        self._pending_size = 0
+        if len(self._hashes) > self.sparse_limit:
+            self._densify()
+
+    def merge(self, other: "HyperLogLog") -> "HyperLogLog":
+        if other.precision != self.precision:
+            raise ValueError("Cannot merge HyperLogLog sketches of different precision")
+        if other.is_sparse:
+            self.add(other.hashes)
+            return self
+        if self.is_sparse:
+            self._densify()
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    def estimate(self) -> float:
+        if self.is_sparse:
+            return float(len(self.hashes))
+
+        # Ertl's improved estimator (arXiv:1702.01284): unbiased over the
+        # whole range, where the raw estimate with linear counting is off
+        # by ~1% around 2.5 × 2**precision distinct values
+        m = 1 << self.precision
+        counts = np.bincount(self.registers, minlength=_RANK_BITS + 2)
+        z = m * _tau(1 - counts[_RANK_BITS + 1] / m)
+        for k in range(_RANK_BITS, 0, -1):
+            z = 0.5 * (z + counts[k])
+        z += m * _sigma(counts[0] / m)
+        return float(m * m / (2 * np.log(2)) / z)
+
+    def _densify(self):
+        self.registers = np.zeros(1 << self.precision, dtype=np.uint8)
+        self._update_registers(self._hashes)
+        self._hashes = np.empty(0, dtype=np.uint64)
+
+    def _update_registers(self, hashes: np.ndarray):
+        if not len(hashes):
+            return
+        p = np.uint64(self.precision)
+        index = (hashes >> (np.uint64(64) - p)).astype(np.int64)
+        # Rank = leading zeros + 1 of the remaining bits; the top
+        # _RANK_BITS of them are enough (frexp is exact on 32-bit integers)
+        rest = ((hashes << p) >> np.uint64(32)).astype(np.float64)
+        rank = (33 - np.frexp(rest)[1]).astype(np.uint8)
+        np.maximum.at(self.registers, index, rank)
+
+    def state(self) -> dict:
+        return {
+            "precision": np.array(self.precision),
+            "sparse_limit": np.array(self.sparse_limit),
+            "hashes": self.hashes,
+            "registers": np.empty(0, np.uint8) if self.is_sparse else self.registers,
+        }
+
+    @classmethod
+    def from_state(cls, state: dict) -> "HyperLogLog":
+        sketch = cls(int(state["precision"]), int(state["sparse_limit"]))
+        sketch._hashes = np.asarray(state["hashes"], dtype=np.uint64)
+        registers = np.asarray(state["registers"], dtype=np.uint8)
+        sketch.registers = registers if len(registers) else None
+        return sketch
+
+
+class TDigest:
+    """
+    Quantile sketch: weighted centroids whose size is bounded by the k1
+    scale function, so they are small near the tails and accurate there.
+    Adding a batch or merging a digest re-clusters all centroids in one
+    vectorized pass.
+    """
+
+    def __init__(self, compression: float = 200.0):
+        self.compression = compression
+        self.means = np.empty(0)
+        self.weights = np.empty(0)
+        self.min = np.inf
+        self.max = -np.inf
+
+    @property
+    def count(self) -> float:
+        return float(self.weights.sum())
+
+    def add(self, values: np.ndarray):
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        if not len(values):
+            return
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+        self._compress(
+            np.concatenate([self.means, values]),
+            np.concatenate([self.weights, np.ones(len(values))]),
+        )
+
+    def merge(self, other: "TDigest") -> "TDigest":
+        if not len(other.means):
+            return self
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._compress(
+            np.concatenate([self.means, other.means]),
+            np.concatenate([self.weights, other.weights]),
+        )
+        return self
+
+    def _compress(self, means: np.ndarray, weights: np.ndarray):
+        order = np.argsort(means, kind="stable")
+        means, weights = means[order], weights[order]
+
+        # Centroids whose left edge falls in the same unit of
+        # k(q) = compression / (2π) · asin(2q − 1) are merged
+        cumulative = np.cumsum(weights)
+        q_left = (cumulative - weights) / cumulative[-1]
+        k = np.floor(self.compression / (2 * np.pi) * np.arcsin(2 * q_left - 1))
+        starts = np.concatenate([[0], np.flatnonzero(np.diff(k)) + 1])
+
+        self.weights = np.add.reduceat(weights, starts)
+        self.means = np.add.reduceat(means * weights, starts) / self.weights
+
+    def quantile(self, q: float) -> float:
+        if not len(self.means):
+            return float("nan")
+        centers = np.cumsum(self.weights) - self.weights / 2
+        return float(
+            np.interp(
+                q * self.count,
+                np.concatenate([[0.0], centers, [self.count]]),
+                np.concatenate([[self.min], self.means, [self.max]]),
+            )
+        )
+
+    def state(self) -> dict:
+        return {
+            "compression": np.array(self.compression),
+            "means": self.means,
+            "weights": self.weights,
+            "bounds": np.array([self.min, self.max]),
+        }
+
+    @classmethod
+    def from_state(cls, state: dict) -> "TDigest":
+        digest = cls(float(state["compression"]))
+        digest.means = np.asarray(state["means"], dtype=np.float64)
+        digest.weights = np.asarray(state["weights"], dtype=np.float64)
+        digest.min, digest.max = (float(v) for v in state["bounds"])
+        return digest
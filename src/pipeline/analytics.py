@@ -1,134 +1,701 @@
-import pandas as pd
 from pathlib import Path
+from urllib.parse import unquote
 
-from src.core.config import SILVER_DIR, GOLD_DIR
+import pyarrow as pa
+
+from src.core.config import (
+    SILVER_DIR,
+    GOLD_DIR,
+    GOLD_LOAD_MODE,
+    GOLD_SCD_TYPE,
+    GOLD_FACT_PARTITION_BY,
+    GOLD_PARQUET_COMPRESSION,
+    GOLD_ROW_GROUP_SIZE,
+)
 from src.core.logging import get_logger
-from src.core.audit import write_audit_record
-from src.core.duckdb_conn import get_duckdb_connection
+from src.core.audit import write_audit_record, write_dq_violation, flush_audit_records
+from src.core.dataset_registry import get_table, wait_persisted
+from src.core.duckdb_conn import duckdb_connection
+from src.core.idempotency import file_fingerprint
+from src.core.manifest import get_last_entry, is_up_to_date, record_entry
+from src.core.metrics import instrument_stage, track
+from src.core.quarantine import QuarantineSink
+from src.pipeline import gold_versions
+from src.pipeline.catalog import DIMENSIONS, GOLD_DEPENDENCIES
+from src.pipeline.marts import refresh_marts
+from src.pipeline.query_service import invalidate_query_cache
 
 logger = get_logger("GOLD_ANALYTICS")
 
+STAGE = "gold_materialization"
+
+LOAD_MODES = ("full", "incremental")
+
+# Natural / business keys the surrogate keys are mapped from
+NATURAL_KEYS = {
+    "dim_student": ["student_id"],
+    "dim_teacher": [
+        "teacher_id", "school_id", "school_year", "course_name", "course_no"
+    ],
+    "dim_school": ["school_id"],
+    "dim_grading_group": ["assessement_level_id"],
+    "fact_tests": ["student_assessment_id"],
+}
+
+FACT_KEY = "fact_test_key"
+
+# Source lineage carried by every Silver entity (src/pipeline/ingest.py)
+LINEAGE_COLUMNS = ["source_file", "source_hash"]
+
+# Version columns on SCD type 2 dimensions
+SCD2_COLUMNS = ["valid_from", "valid_to", "is_current"]
+
+
+def _registered_source(con, entity: str, table: pa.Table, row_number: bool) -> str:
+    # Dictionary columns would surface as ENUM; decode them so the Gold
+    # schema is the same as when reading the Silver Parquet files.
+    columns = [
+        column.cast(column.type.value_type)
+        if pa.types.is_dictionary(column.type) else column
+        for column in table.columns
+    ]
+    table = pa.Table.from_arrays(columns, names=table.column_names)
+    if row_number:
+        table = table.append_column(
+            "file_row_number", pa.array(range(table.num_rows), pa.int64())
+        )
+
+    view = f"_silver_{entity}{'_rn' if row_number else ''}"
+    con.register(view, table)
+    return view
+
 
-def build_gold_layer(run_id: str):
+def _silver_source(con, entity: str, row_number: bool = False) -> str:
     """
-    Build analytics-ready Gold layer.
-    Produces:
-      - Dimensions: student, teacher, school, grading_group
-      - Fact table: fact_tests
+    Relation over a Silver entity: the Arrow table from the dataset
+    registry in a fused run, its Parquet file otherwise.
     """
+    table = get_table(entity)
+    if table is not None:
+        return _registered_source(con, entity, table, row_number)
 
-    try:
-        logger.info("Starting Gold layer materialization")
+    path = (SILVER_DIR / f"{entity}.parquet").as_posix()
+    if row_number:
+        return f"read_parquet('{path}', file_row_number = true)"
+    return f"read_parquet('{path}')"
 
-        # ------------------------------------------------------------------
-        # Load Silver datasets
-        # ------------------------------------------------------------------
-        students = pd.read_parquet(SILVER_DIR / "students.parquet")
-        teachers = pd.read_parquet(SILVER_DIR / "teachers.parquet")
-        schools = pd.read_parquet(SILVER_DIR / "schools.parquet")
-        grading_groups = pd.read_parquet(SILVER_DIR / "grading_groups.parquet")
-        tests = pd.read_parquet(SILVER_DIR / "tests.parquet")
-        test_details = pd.read_parquet(SILVER_DIR / "test_details.parquet")
 
-        # ------------------------------------------------------------------
-        # Dimensions (surrogate keys, no column loss)
-        # ------------------------------------------------------------------
-        dim_student = students.copy()
-        dim_student["student_key"] = dim_student.index + 1
+def _columns(con, relation: str) -> list:
+    return [
+        row[0]
+        for row in con.execute(f"DESCRIBE SELECT * FROM {relation}").fetchall()
+    ]
 
-        dim_teacher = teachers.copy()
-        dim_teacher["teacher_key"] = dim_teacher.index + 1
 
-        dim_school = schools.copy()
-        dim_school["school_key"] = dim_school.index + 1
+def _natural_key_expr(cols: list, alias: str) -> str:
+    if len(cols) == 1:
+        return f"CAST({alias}.{cols[0]} AS VARCHAR)"
+    items = ", ".join(f"CAST({alias}.{c} AS VARCHAR)" for c in cols)
+    return f"CAST(to_json([{items}]) AS VARCHAR)"
 
-        dim_grading_group = grading_groups.copy()
-        dim_grading_group["grading_group_key"] = dim_grading_group.index + 1
 
-        # ------------------------------------------------------------------
-        # Fact table (ONLY required fact)
-        # ---------------------------------------------------------------------
-        
-        required_col = "assessement_level_id"
-        if required_col not in dim_grading_group.columns:
-            raise ValueError(
-                f"{required_col} not found in grading_groups.parquet. "
-                f"Available columns: {list(dim_grading_group.columns)}"
-            )
+def _row_hash_expr(cols: list, alias: str) -> str:
+    fields = ", ".join(f'"{c}" := {alias}."{c}"' for c in cols)
+    return f"md5(CAST(to_json(struct_pack({fields})) AS VARCHAR))"
 
-        fact_tests = (
-            tests
-            .merge(
-                test_details,
-                on="assessment_type",
-                how="left"
-            )
-            .merge(
-                # dim_grading_group,
-                dim_grading_group[["assessement_level_id", "grading_group_key"]],
-                on="assessement_level_id",
-                how="left"
-            )
+
+# ----------------------------------------------------------------------
+# Stable surrogate keys
+# ----------------------------------------------------------------------
+def _assign_keys(con, table: str, key_col: str, staged: str, run_id: str) -> int:
+    """
+    Persist natural key → surrogate key in gold.key_map_<table>.
+
+    Keys are only ever added, never renumbered, so they survive row
+    order changes in Silver. New keys follow first appearance in the
+    source, which reproduces the old positional keys on a first load.
+    """
+    key_map = f"gold.key_map_{table}"
+    con.execute(f"""
+        CREATE TABLE IF NOT EXISTS {key_map} (
+            natural_key VARCHAR PRIMARY KEY,
+            {key_col} BIGINT,
+            created_run_id VARCHAR
         )
+    """)
+    con.execute(
+        f"""
+        INSERT INTO {key_map}
+        SELECT
+            s.natural_key,
+            (SELECT COALESCE(MAX({key_col}), 0) FROM {key_map})
+                + row_number() OVER (ORDER BY s.first_pos),
+            ?
+        FROM (
+            SELECT natural_key, MIN(_pos) AS first_pos
+            FROM {staged}
+            GROUP BY natural_key
+        ) AS s
+        ANTI JOIN {key_map} AS k USING (natural_key)
+        """,
+        (run_id,),
+    )
+    return con.execute(
+        f"SELECT COUNT(*) FROM {key_map} WHERE created_run_id = ?", (run_id,)
+    ).fetchone()[0]
 
-        fact_tests["fact_test_key"] = fact_tests.index + 1
 
-        # ------------------------------------------------------------------
-        # DuckDB materialization
-        # ------------------------------------------------------------------
-        con = get_duckdb_connection()
-        con.execute("CREATE SCHEMA IF NOT EXISTS gold")
-
-        for table in [
-            "fact_tests",
-            "dim_student",
-            "dim_teacher",
-            "dim_school",
-            "dim_grading_group",
-        ]:
-            con.execute(f"DROP TABLE IF EXISTS gold.{table}")
-
-        con.register("fact_tests_df", fact_tests)
-        con.register("dim_student_df", dim_student)
-        con.register("dim_teacher_df", dim_teacher)
-        con.register("dim_school_df", dim_school)
-        con.register("dim_grading_group_df", dim_grading_group)
-
-        con.execute("CREATE TABLE gold.fact_tests AS SELECT * FROM fact_tests_df")
-        con.execute("CREATE TABLE gold.dim_student AS SELECT * FROM dim_student_df")
-        con.execute("CREATE TABLE gold.dim_teacher AS SELECT * FROM dim_teacher_df")
-        con.execute("CREATE TABLE gold.dim_school AS SELECT * FROM dim_school_df")
+def _drop_unkeyed_rows(con, table: str, run_id: str) -> int:
+    """
+    Remove the rows of _raw_<table> that cannot be keyed: a NULL natural
+    key (no surrogate key can be mapped from it) and every repeat of a
+    natural key after its first occurrence in Silver. They are recorded
+    as DQ violations and quarantined rather than dropped silently.
+    Returns the number of rows removed.
+    """
+    raw = f"_raw_{table}"
+    cols = ",".join(NATURAL_KEYS[table])
+    unkeyed = "natural_key IS NULL OR _occurrence > 1"
+    dropped = con.execute(f"""
+        SELECT
+            * EXCLUDE (natural_key, _pos, _occurrence),
+            CASE WHEN natural_key IS NULL THEN 'null_natural_key'
+                 ELSE 'duplicate_natural_key' END AS _rule
+        FROM {raw}
+        WHERE {unkeyed}
+        ORDER BY _pos
+    """).df()
+    if dropped.empty:
+        return 0
+
+    rules = dropped.pop("_rule")
+    for rule_type, count in rules.value_counts().items():
+        write_dq_violation(run_id, STAGE, table, rule_type, cols, int(count))
+        logger.warning(f"Gold {table}: {count} rows not loaded ({rule_type}: {cols})")
+    with QuarantineSink(run_id, STAGE) as quarantine:
+        quarantine.add(table, dropped, rules + ":" + cols)
+
+    con.execute(f"DELETE FROM {raw} WHERE {unkeyed}")
+    return len(dropped)
+
+
+def _stage_dimension(con, table: str, run_id: str) -> list:
+    """
+    Silver rows + surrogate key + row hash in a temp table
+    _stage_<table>, one row per natural key. Returns the Silver columns.
+    """
+    entity, key_col = DIMENSIONS[table]
+    source = _silver_source(con, entity, row_number=True)
+    cols = [c for c in _columns(con, source) if c != "file_row_number"]
+    select_cols = ", ".join(f's."{c}"' for c in cols)
+
+    con.execute(f"""
+        CREATE OR REPLACE TEMP TABLE _raw_{table} AS
+        SELECT
+            {select_cols},
+            {_natural_key_expr(NATURAL_KEYS[table], 's')} AS natural_key,
+            s.file_row_number AS _pos,
+            row_number() OVER (
+                PARTITION BY {_natural_key_expr(NATURAL_KEYS[table], 's')}
+                ORDER BY s.file_row_number
+            ) AS _occurrence
+        FROM {source} AS s
+    """)
+    _drop_unkeyed_rows(con, table, run_id)
+
+    _assign_keys(con, table, key_col, f"_raw_{table}", run_id)
+
+    con.execute(f"""
+        CREATE OR REPLACE TEMP TABLE _stage_{table} AS
+        SELECT
+            {select_cols},
+            k.{key_col},
+            {_row_hash_expr(cols, 's')} AS row_hash
+        FROM _raw_{table} AS s
+        JOIN gold.key_map_{table} AS k USING (natural_key)
+        ORDER BY s._pos
+    """)
+    return cols
+
+
+def _stage_fact(con, run_id: str) -> list:
+    """
+    Tests rows joined to their details, grading group and student in a
+    temp table _stage_fact_tests, one row per natural key. Returns the
+    fact columns.
+
+    school_id is the student's school: the last non-null one in Silver
+    row order, not the school at the time of the assessment, which the
+    workbooks do not record.
+    """
+    required_col = "assessement_level_id"
+    grading_cols = _columns(con, _silver_source(con, "grading_groups"))
+    if required_col not in grading_cols:
+        raise ValueError(
+            f"{required_col} not found in grading_groups.parquet. "
+            f"Available columns: {grading_cols}"
+        )
+
+    # Join columns and lineage come from tests only
+    details_excluded = ", ".join(
+        c for c in _columns(con, _silver_source(con, "test_details"))
+        if c in ("assessment_type", *LINEAGE_COLUMNS)
+    )
+
+    con.execute(f"""
+        CREATE OR REPLACE TEMP TABLE _raw_fact_tests AS
+        SELECT
+            t.* EXCLUDE (file_row_number),
+            d.* EXCLUDE ({details_excluded}),
+            g.grading_group_key,
+            st.student_key,
+            COALESCE(sd.school_id, 'unknown') AS school_id,
+            COALESCE(replace(t.school_year2, ' / ', '-'), 'unknown') AS school_year,
+            {_natural_key_expr(NATURAL_KEYS['fact_tests'], 't')} AS natural_key,
+            t.file_row_number AS _pos,
+            row_number() OVER (
+                PARTITION BY {_natural_key_expr(NATURAL_KEYS['fact_tests'], 't')}
+                ORDER BY t.file_row_number
+            ) AS _occurrence
+        FROM {_silver_source(con, 'tests', row_number=True)} AS t
+        LEFT JOIN {_silver_source(con, 'test_details')} AS d
+            USING (assessment_type)
+        LEFT JOIN gold.key_map_dim_grading_group AS g
+            ON g.natural_key = CAST(t.assessement_level_id AS VARCHAR)
+        LEFT JOIN gold.key_map_dim_student AS st
+            ON st.natural_key = CAST(t.student_id AS VARCHAR)
+        LEFT JOIN (
+            SELECT
+                student_id,
+                arg_max(school_id, file_row_number) FILTER (
+                    WHERE school_id IS NOT NULL
+                ) AS school_id
+            FROM {_silver_source(con, 'students', row_number=True)}
+            GROUP BY student_id
+        ) AS sd
+            ON sd.student_id = t.student_id
+    """)
+    _drop_unkeyed_rows(con, "fact_tests", run_id)
+
+    cols = [
+        c for c in _columns(con, "_raw_fact_tests")
+        if c not in ("natural_key", "_pos", "_occurrence")
+    ]
+    select_cols = ", ".join(f's."{c}"' for c in cols)
+
+    _assign_keys(con, "fact_tests", FACT_KEY, "_raw_fact_tests", run_id)
+
+    con.execute(f"""
+        CREATE OR REPLACE TEMP TABLE _stage_fact_tests AS
+        SELECT
+            {select_cols},
+            k.{FACT_KEY},
+            {_row_hash_expr(cols, 's')} AS row_hash
+        FROM _raw_fact_tests AS s
+        JOIN gold.key_map_fact_tests AS k USING (natural_key)
+        ORDER BY s._pos
+    """)
+    return cols
+
+
+# ----------------------------------------------------------------------
+# Materialization
+# ----------------------------------------------------------------------
+def _gold_table_exists(con, table: str) -> bool:
+    return con.execute(
+        """
+        SELECT COUNT(*) FROM information_schema.tables
+        WHERE table_schema = 'gold' AND table_name = ?
+        """,
+        (table,),
+    ).fetchone()[0] > 0
+
+
+def _rebuild(con, table: str, scd2: bool) -> int:
+    history = (
+        ", now()::TIMESTAMP AS valid_from, NULL::TIMESTAMP AS valid_to, "
+        "TRUE AS is_current"
+        if scd2 else ""
+    )
+    con.execute(f"""
+        CREATE OR REPLACE TABLE gold.{table} AS
+        SELECT *{history} FROM _stage_{table}
+    """)
+    return con.execute(f"SELECT COUNT(*) FROM gold.{table}").fetchone()[0]
+
+
+def _upsert(
+    con,
+    table: str,
+    key_col: str,
+    scd2: bool,
+    partition_by: list | None = None,
+) -> int:
+    """
+    Apply only new or changed staged rows (by row hash).
+
+    SCD type 1 replaces the row for the key in place; SCD type 2 closes
+    the current version (valid_to, is_current = FALSE) and appends a new
+    one. Rows of retired sources (keys missing from the stage whose
+    source_hash no staged row has: the workbook was removed or replaced
+    at ingest) are deleted, or closed under SCD type 2. Other rows no
+    longer present in Silver are left untouched.
+
+    The versions being replaced or retired are kept in the temp table
+    _previous_<table>. With `partition_by`, the partitions touched by the
+    change (old and new values) are collected in _affected_<table>.
+    """
+    current = "AND g.is_current" if scd2 else ""
+    con.execute(f"""
+        CREATE OR REPLACE TEMP TABLE _changed_{table} AS
+        SELECT s.*
+        FROM _stage_{table} AS s
+        LEFT JOIN gold.{table} AS g
+            ON g.{key_col} = s.{key_col} {current}
+        WHERE g.{key_col} IS NULL OR g.row_hash <> s.row_hash
+    """)
+    con.execute(f"""
+        CREATE OR REPLACE TEMP TABLE _retired_{table} AS
+        SELECT g.{key_col}
+        FROM gold.{table} AS g
+        WHERE g.source_hash NOT IN (
+                SELECT source_hash FROM _stage_{table} WHERE source_hash IS NOT NULL
+            )
+          AND g.{key_col} NOT IN (SELECT {key_col} FROM _stage_{table})
+          {current}
+    """)
+    # Keys whose current row is replaced or removed
+    replaced = (
+        f"(SELECT {key_col} FROM _changed_{table} "
+        f"UNION ALL SELECT {key_col} FROM _retired_{table})"
+    )
+    con.execute(f"""
+        CREATE OR REPLACE TEMP TABLE _previous_{table} AS
+        SELECT g.* FROM gold.{table} AS g
+        WHERE g.{key_col} IN {replaced}
+          {current}
+    """)
+
+    if partition_by:
+        cols = ", ".join(partition_by)
+        con.execute(f"""
+            CREATE OR REPLACE TEMP TABLE _affected_{table} AS
+            SELECT DISTINCT {cols} FROM _changed_{table}
+            UNION
+            SELECT DISTINCT {cols} FROM _previous_{table}
+        """)
+
+    if scd2:
+        con.execute(f"""
+            UPDATE gold.{table}
+            SET valid_to = now()::TIMESTAMP, is_current = FALSE
+            WHERE is_current
+              AND {key_col} IN {replaced}
+        """)
+        con.execute(f"""
+            INSERT INTO gold.{table}
+            SELECT *, now()::TIMESTAMP, NULL::TIMESTAMP, TRUE
+            FROM _changed_{table}
+        """)
+    else:
+        con.execute(f"""
+            DELETE FROM gold.{table}
+            WHERE {key_col} IN {replaced}
+        """)
+        con.execute(f"INSERT INTO gold.{table} SELECT * FROM _changed_{table}")
+
+    retired = con.execute(f"SELECT COUNT(*) FROM _retired_{table}").fetchone()[0]
+    if retired:
+        logger.info(f"Gold rows of retired sources removed: {table} ({retired})")
+    return con.execute(f"SELECT COUNT(*) FROM _changed_{table}").fetchone()[0]
+
+
+def _materialize(con, table: str, run_id: str, mode: str, scd_type: int) -> tuple:
+    """
+    Returns (rows written, rebuilt, affected partitions). Affected
+    partitions is None when the whole table was rebuilt.
+    """
+    partition_by = GOLD_FACT_PARTITION_BY if table == "fact_tests" else None
+
+    if table == "fact_tests":
+        _stage_fact(con, run_id)
+        key_col, scd2 = FACT_KEY, False
+    else:
+        _stage_dimension(con, table, run_id)
+        key_col, scd2 = DIMENSIONS[table][1], scd_type == 2
+
+    expected = _columns(con, f"_stage_{table}") + (SCD2_COLUMNS if scd2 else [])
+
+    # Incremental upserts need an existing table with the same layout;
+    # anything else (first load, schema change, SCD switch) is rebuilt.
+    if (
+        mode == "full"
+        or not _gold_table_exists(con, table)
+        or _columns(con, f"gold.{table}") != expected
+    ):
+        rows = _rebuild(con, table, scd2)
+        logger.info(f"Gold rebuilt: {table} ({rows} rows)")
+        return rows, True, None
+
+    rows = _upsert(con, table, key_col, scd2, partition_by)
+    logger.info(f"Gold upserted: {table} ({rows} new or changed rows)")
+
+    if not partition_by:
+        return rows, False, None
+
+    affected = con.execute(f"SELECT * FROM _affected_{table}").fetchall()
+    return rows, False, affected
+
+
+# ----------------------------------------------------------------------
+# Parquet export
+# ----------------------------------------------------------------------
+def _copy_options(partition_by: list | None = None) -> str:
+    options = [
+        "FORMAT PARQUET",
+        f"COMPRESSION {GOLD_PARQUET_COMPRESSION}",
+        f"ROW_GROUP_SIZE {GOLD_ROW_GROUP_SIZE}",
+    ]
+    if partition_by:
+        options.append(f"PARTITION_BY ({', '.join(partition_by)})")
+    return ", ".join(options)
+
+
+# Directory value DuckDB writes for a NULL partition value (older
+# releases wrote "NULL")
+_HIVE_NULLS = ("__HIVE_DEFAULT_PARTITION__", "NULL")
+
+
+def _partition_key(values) -> tuple:
+    return tuple(None if v is None else str(v) for v in values)
+
+
+def _partition_values(path: str, partition_by: list) -> tuple:
+    # DuckDB percent-encodes partition values in directory names
+    # ("2021/2022" → school_year=2021%2F2022): decode before comparing
+    segments = dict(part.split("=", 1) for part in Path(path).parts if "=" in part)
+    return tuple(
+        None if segments.get(col) in _HIVE_NULLS else unquote(segments.get(col, ""))
+        for col in partition_by
+    )
+
+
+def _unaffected_files(files: list, partition_by: list, affected: list) -> list:
+    """
+    The files of a hive-partitioned dataset outside the `affected`
+    partitions (tuples of partition values, in partition_by order).
+    """
+    rewritten = {_partition_key(values) for values in affected}
+    return [f for f in files if _partition_values(f, partition_by) not in rewritten]
+
+
+def _export_select(table: str) -> str:
+    # row_hash is internal change detection for _upsert, not Gold data
+    return f"SELECT * EXCLUDE (row_hash) FROM gold.{table}"
+
+
+def _export_table(con, table: str, run_id: str, affected: list | None) -> Path | None:
+    """
+    Write a Gold table as a new immutable file set and stage it for the
+    run's Gold version (src/pipeline/gold_versions.py).
+
+    Dimensions are single zstd Parquet files. fact_tests is a
+    hive-partitioned dataset (GOLD_FACT_PARTITION_BY); when `affected`
+    lists partitions, only those are written and the version keeps
+    reading every other partition from the file sets it already had.
+    Returns the file set written (None when nothing changed).
+    """
+    output_path = gold_versions.new_file_set(table, run_id)
+
+    if table != "fact_tests" or not GOLD_FACT_PARTITION_BY:
+        output_path.mkdir()
+        target = output_path / f"{table}.parquet"
+        con.execute(f"COPY ({_export_select(table)}) TO '{target.as_posix()}' ({_copy_options()})")
+        gold_versions.stage_table(run_id, table, [target])
+        return output_path
+
+    partition_by = GOLD_FACT_PARTITION_BY
+    base = gold_versions.table_entry(table, run_id=run_id)
+
+    if affected is None or base is None or base["partition_by"] != partition_by:
         con.execute(
-            "CREATE TABLE gold.dim_grading_group AS SELECT * FROM dim_grading_group_df"
+            f"COPY ({_export_select(table)}) TO '{output_path.as_posix()}' "
+            f"({_copy_options(partition_by)})"
         )
+        gold_versions.stage_table(
+            run_id, table, gold_versions.dataset_files(output_path), partition_by
+        )
+        logger.info(f"Gold dataset written: {table}")
+        return output_path
 
-        # ------------------------------------------------------------------
-        # Parquet outputs
-        # ------------------------------------------------------------------
-        GOLD_DIR.mkdir(parents=True, exist_ok=True)
+    if not affected:
+        return None
+
+    # NULL partition values are partitions too (__HIVE_DEFAULT_PARTITION__)
+    match = " AND ".join(f"f.{c} IS NOT DISTINCT FROM a.{c}" for c in partition_by)
+    con.execute(
+        f"""
+        COPY (
+            SELECT f.* EXCLUDE (row_hash) FROM gold.{table} AS f
+            SEMI JOIN _affected_{table} AS a ON {match}
+        ) TO '{output_path.as_posix()}' ({_copy_options(partition_by)})
+        """
+    )
+
+    # Unchanged partitions: the previous files; affected ones: the new
+    # file set (removed partitions simply drop out)
+    kept = [GOLD_DIR / f for f in _unaffected_files(base["files"], partition_by, affected)]
+    gold_versions.stage_table(
+        run_id,
+        table,
+        kept + gold_versions.dataset_files(output_path),
+        partition_by,
+    )
+    logger.info(f"Gold partitions rewritten: {table} ({len(affected)})")
+    # Every affected partition may have been emptied
+    return output_path if output_path.exists() else None
 
-        fact_tests.to_parquet(GOLD_DIR / "fact_tests.parquet", index=False)
-        dim_student.to_parquet(GOLD_DIR / "dim_student.parquet", index=False)
-        dim_teacher.to_parquet(GOLD_DIR / "dim_teacher.parquet", index=False)
-        dim_school.to_parquet(GOLD_DIR / "dim_school.parquet", index=False)
-        dim_grading_group.to_parquet(
-            GOLD_DIR / "dim_grading_group.parquet", index=False
+
+def _export_visible(table: str, run_id: str, outputs: dict) -> bool:
+    # The last export must be in the current Gold version (or staged by
+    # this run): a run that failed before publishing leaves DuckDB ahead
+    # of the published files
+    entry = gold_versions.table_entry(table, run_id=run_id)
+    return entry is not None and all(
+        gold_versions.contains(entry, Path(fp["path"])) for fp in outputs.values()
+    )
+
+
+def _build_table(con, table: str, run_id: str, mode: str, scd_type: int) -> tuple:
+    """
+    Materialize one Gold table and its Parquet output.
+    Returns (rows written, change) where change is "rebuilt", "upserted"
+    or None when the table was up to date.
+    """
+    # ----------------------------------------------------------
+    # Incremental: skip tables whose Silver inputs are unchanged
+    # ----------------------------------------------------------
+    last_entry = get_last_entry(STAGE, table)
+    previous = last_entry["inputs"] if last_entry else {}
+    # Fused run: fingerprints need the Silver files written in the background
+    wait_persisted(
+        [SILVER_DIR / f"{entity}.parquet" for entity in GOLD_DEPENDENCIES[table]]
+    )
+    inputs = {
+        entity: file_fingerprint(
+            SILVER_DIR / f"{entity}.parquet",
+            previous=previous.get(entity),
         )
+        for entity in GOLD_DEPENDENCIES[table]
+    }
+
+    if (
+        is_up_to_date(last_entry, inputs)
+        and _gold_table_exists(con, table)
+        and _export_visible(table, run_id, last_entry["outputs"])
+    ):
+        logger.info(f"Gold unchanged, skipping: {table}")
+        return 0, None
+
+    # ----------------------------------------------------------
+    # DuckDB materialization (joins and keys run in DuckDB,
+    # straight off the Silver Parquet files)
+    # ----------------------------------------------------------
+    with track(run_id, STAGE, "materialize", entity=table) as step:
+        con.execute("BEGIN TRANSACTION")
+        try:
+            rows, rebuilt, affected = _materialize(con, table, run_id, mode, scd_type)
+            con.execute("COMMIT")
+        except Exception:
+            con.execute("ROLLBACK")
+            raise
+        step["rows_out"] = rows
+
+    # ----------------------------------------------------------
+    # Parquet output
+    # ----------------------------------------------------------
+    with track(run_id, STAGE, "export", entity=table):
+        output_path = _export_table(con, table, run_id, affected)
+
+    record_entry(
+        run_id,
+        STAGE,
+        table,
+        inputs,
+        {"gold": file_fingerprint(output_path)} if output_path else {},
+    )
+    return rows, "rebuilt" if rebuilt else "upserted"
+
+
+def _refresh_marts(con, run_id: str, changes: dict):
+    # Marts follow the fact table: rebuilt after a full load,
+    # patched per affected group after an upsert
+    with track(run_id, STAGE, "marts") as step:
+        con.execute("BEGIN TRANSACTION")
+        try:
+            step["rows_out"] = refresh_marts(con, run_id, changes)
+            con.execute("COMMIT")
+        except Exception:
+            con.execute("ROLLBACK")
+            raise
+
+
+@instrument_stage(STAGE)
+def build_gold_layer(
+    run_id: str,
+    mode: str = GOLD_LOAD_MODE,
+    scd_type: int = GOLD_SCD_TYPE,
+):
+    """
+    Build analytics-ready Gold layer.
+    Produces:
+      - Dimensions: student, teacher, school, grading_group
+      - Fact table: fact_tests
+      - Aggregate marts over fact_tests (src/pipeline/marts.py)
+
+    Joins, surrogate keys and Parquet export all run inside DuckDB over
+    read_parquet() on SILVER_DIR; no frames are materialized in Python.
+    Only tables whose Silver inputs changed since their last
+    materialization (per the run manifest) are rebuilt.
+
+    Surrogate keys come from persistent natural-key maps and never change
+    between runs. mode="incremental" upserts only new or changed rows
+    (dimensions as SCD type 1, or type 2 with scd_type=2; facts by
+    student_assessment_id); mode="full" rebuilds each table.
+    """
+    if mode not in LOAD_MODES:
+        raise ValueError(f"Unknown Gold load mode: {mode!r}. Expected one of {LOAD_MODES}")
+
+    try:
+        logger.info(f"Starting Gold layer materialization ({mode})")
+
+        GOLD_DIR.mkdir(parents=True, exist_ok=True)
+
+        total_rows = 0
+
+        with duckdb_connection() as con:
+            con.execute("CREATE SCHEMA IF NOT EXISTS gold")
+
+            changes = {}
+            for table in GOLD_DEPENDENCIES:
+                rows, change = _build_table(con, table, run_id, mode, scd_type)
+                total_rows += rows
+                if change:
+                    changes[table] = change
+
+            _refresh_marts(con, run_id, changes)
+
+        # Readers switch to the new tables all at once
+        gold_versions.publish(run_id)
 
         # ------------------------------------------------------------------
         # Audit
         # ------------------------------------------------------------------
         write_audit_record(
             run_id=run_id,
-            stage="gold_materialization",
+            stage=STAGE,
             status="SUCCESS",
-            row_count=(
-                len(fact_tests)
-                + len(dim_student)
-                + len(dim_teacher)
-                + len(dim_school)
-                + len(dim_grading_group)
-            ),
+            row_count=total_rows,
         )
 
         logger.info("Gold layer successfully materialized")
@@ -138,10 +705,106 @@ def build_gold_layer(run_id: str):
 
         write_audit_record(
             run_id=run_id,
-            stage="gold_materialization",
+            stage=STAGE,
             status="FAILED",
             error_message=str(exc),
         )
         raise
 
+    finally:
+        flush_audit_records()
+        # Cached analytics results are keyed by the Gold version just
+        # written to the audit table
+        invalidate_query_cache()
+
+
+# ----------------------------------------------------------------------
+# Per-table entry points (Airflow)
+#
+#   build_gold_table per dimension (in parallel) → build_gold_table
+#   ("fact_tests", after dim_student and dim_grading_group) →
+#   build_gold_marts
+#
+# Every one of them writes to DuckDB, so the DAG runs them in the
+# duckdb_writer pool.
+# ----------------------------------------------------------------------
+@instrument_stage(STAGE)
+def build_gold_table(
+    run_id: str,
+    table: str,
+    mode: str = GOLD_LOAD_MODE,
+    scd_type: int = GOLD_SCD_TYPE,
+) -> dict:
+    """
+    Materialize one Gold table. Returns {"table", "rows", "change"} for
+    build_gold_marts().
+    """
+    if table not in GOLD_DEPENDENCIES:
+        raise ValueError(f"Unknown Gold table: {table!r}")
+    if mode not in LOAD_MODES:
+        raise ValueError(f"Unknown Gold load mode: {mode!r}. Expected one of {LOAD_MODES}")
+
+    try:
+        GOLD_DIR.mkdir(parents=True, exist_ok=True)
+
+        with duckdb_connection() as con:
+            con.execute("CREATE SCHEMA IF NOT EXISTS gold")
+            rows, change = _build_table(con, table, run_id, mode, scd_type)
+
+    except Exception as exc:
+        logger.exception(f"Gold table {table} failed")
+
+        write_audit_record(
+            run_id=run_id,
+            stage=STAGE,
+            status="FAILED",
+            error_message=f"{table}: {exc}",
+        )
+        raise
+
+    return {"table": table, "rows": rows, "change": change}
+
+
+@instrument_stage(STAGE)
+def build_gold_marts(run_id: str, results: list):
+    """
+    Refresh the marts for the tables changed by the build_gold_table()
+    results of one run and write the stage audit record.
+    """
+    results = list(results)
+    changes = {r["table"]: r["change"] for r in results if r["change"]}
+
+    # The fact upsert's change set lives in temp tables of the task that
+    # wrote it, so marts over an upserted fact are rebuilt here.
+    if changes.get("fact_tests") == "upserted":
+        changes["fact_tests"] = "rebuilt"
+
+    try:
+        with duckdb_connection() as con:
+            con.execute("CREATE SCHEMA IF NOT EXISTS gold")
+            _refresh_marts(con, run_id, changes)
+
+        gold_versions.publish(run_id)
+
+        write_audit_record(
+            run_id=run_id,
+            stage=STAGE,
+            status="SUCCESS",
+            row_count=sum(r["rows"] for r in results),
+        )
+        logger.info("Gold layer successfully materialized")
+
+    except Exception as exc:
+        logger.exception("Gold marts refresh failed")
+
+        write_audit_record(
+            run_id=run_id,
+            stage=STAGE,
+            status="FAILED",
+            error_message=str(exc),
+        )
+        raise
 
+    finally:
+        flush_audit_records()
+        invalidate_query_cache()
@@ -0,0 +1,39 @@
+from src.core.config import SILVER_DIR
+
+# ----------------------------------------------------------------------
+# Dataset catalog shared by the stage modules and the Airflow DAG.
+# Plain data only: the DAG file imports it while being parsed, so nothing
+# here may pull in pandas, pyarrow or duckdb.
+# ----------------------------------------------------------------------
+
+# Gold table → upstream Silver entities
+GOLD_DEPENDENCIES = {
+    "dim_student": ["students"],
+    "dim_teacher": ["teachers"],
+    "dim_school": ["schools"],
+    "dim_grading_group": ["grading_groups"],
+    "fact_tests": ["tests", "test_details", "grading_groups", "students"],
+}
+
+# Dimension table → (Silver entity, surrogate key column)
+DIMENSIONS = {
+    "dim_student": ("students", "student_key"),
+    "dim_teacher": ("teachers", "teacher_key"),
+    "dim_school": ("schools", "school_key"),
+    "dim_grading_group": ("grading_groups", "grading_group_key"),
+}
+
+# Data quality datasets → Silver Parquet file (None: the Gold fact, read
+# from the Gold version the run sees, see src/pipeline/gold_versions.py)
+DQ_DATASETS = {
+    "schools": SILVER_DIR / "schools.parquet",
+    "teachers": SILVER_DIR / "teachers.parquet",
+    "students": SILVER_DIR / "students.parquet",
+    "grading_groups": SILVER_DIR / "grading_groups.parquet",
+    "test_details": SILVER_DIR / "test_details.parquet",
+    "tests": SILVER_DIR / "tests.parquet",
+    "fact_test_results": None,
+}
+
+# DQ dataset checked against the Gold fact rather than a Silver file
+DQ_FACT_DATASET = "fact_test_results"
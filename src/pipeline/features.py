@@ -0,0 +1,370 @@
+import datetime
+
+import pandas as pd
+
+from src.core.config import (
+    GOLD_PARQUET_COMPRESSION,
+    ANALYTICS_PASS_SCORE,
+    FEATURE_WINDOWS_DAYS,
+    FEATURE_ROW_GROUP_SIZE,
+)
+from src.core.audit import write_audit_record, flush_audit_records
+from src.core.duckdb_conn import duckdb_config, duckdb_connection
+from src.core.logging import get_logger
+from src.core.metrics import instrument_stage, track
+from src.pipeline import gold_versions
+
+logger = get_logger("FEATURES")
+
+STAGE = "feature_materialization"
+
+# ----------------------------------------------------------------------
+# Point-in-time feature tables over gold.fact_tests
+#
+# One row per entity and assessment date (as_of_date): the features use
+# every assessment of the entity up to and including that date, and the
+# row is valid until the entity's next assessment date (valid_to,
+# exclusive; NULL for the latest row). A lookup "as of" day D therefore
+# reads the row with as_of_date <= D < valid_to and never sees facts
+# from after D.
+#
+# Per window of N days (FEATURE_WINDOWS_DAYS):
+#   assessments_Nd, score_mean_Nd, score_std_Nd, pass_rate_Nd,
+#   pass_rate_trend_Nd (pass rate minus that of the N days before)
+# plus assessments_total, pass_rate_total and days_since_previous.
+# ----------------------------------------------------------------------
+FEATURE_SETS = {
+    "features_student": "student_key",
+    "features_school": "school_id",
+}
+
+# Fact rows (and their hashes) the feature tables were last built from
+SNAPSHOT_TABLE = "feature_fact_snapshot"
+
+
+def _ratio(numerator: str, denominator: str) -> str:
+    return f"CAST({numerator} AS DOUBLE) / NULLIF({denominator}, 0)"
+
+
+def _window_columns(days: int) -> str:
+    n = f"SUM(n) OVER w{days}"
+    scored = f"SUM(scored) OVER w{days}"
+    total = f"SUM(score_sum) OVER w{days}"
+    sumsq = f"SUM(score_sumsq) OVER w{days}"
+    pass_rate = _ratio(f"SUM(passes) OVER w{days}", scored)
+    prior_rate = _ratio(f"SUM(passes) OVER p{days}", f"SUM(scored) OVER p{days}")
+    return f"""
+        {n} AS assessments_{days}d,
+        {_ratio(total, scored)} AS score_mean_{days}d,
+        CASE WHEN {scored} > 1 THEN
+            sqrt(greatest(({sumsq} - {total} * {total} / {scored}) / ({scored} - 1), 0))
+        END AS score_std_{days}d,
+        {pass_rate} AS pass_rate_{days}d,
+        {pass_rate} - {prior_rate} AS pass_rate_trend_{days}d"""
+
+
+def _window_clauses(key: str, days: int) -> str:
+    order = f"PARTITION BY {key} ORDER BY as_of_date"
+    return f"""
+        w{days} AS ({order} RANGE BETWEEN INTERVAL {days - 1} DAYS PRECEDING AND CURRENT ROW),
+        p{days} AS ({order} RANGE BETWEEN INTERVAL {2 * days - 1} DAYS PRECEDING
+                                     AND INTERVAL {days} DAYS PRECEDING)"""
+
+
+def _features_sql(key: str, where: str = "") -> str:
+    """
+    Feature rows for every `key` value of gold.fact_tests (or those
+    matching `where`). Windows run over per-day aggregates (count, sum,
+    sum of squares, passes), so each day is one row whatever the number
+    of assessments taken on it.
+    """
+    windows = FEATURE_WINDOWS_DAYS
+    return f"""
+        WITH daily AS (
+            SELECT
+                {key},
+                assessment_date AS as_of_date,
+                COUNT(*) AS n,
+                COUNT(standard_score) AS scored,
+                SUM(standard_score) AS score_sum,
+                SUM(CAST(standard_score AS DOUBLE) * standard_score) AS score_sumsq,
+                COUNT(*) FILTER (WHERE standard_score >= {ANALYTICS_PASS_SCORE}) AS passes
+            FROM gold.fact_tests
+            WHERE {key} IS NOT NULL AND assessment_date IS NOT NULL {where}
+            GROUP BY {key}, assessment_date
+        )
+        SELECT
+            {key},
+            as_of_date,
+            LEAD(as_of_date) OVER history AS valid_to,
+            as_of_date - LAG(as_of_date) OVER history AS days_since_previous,
+            SUM(n) OVER history AS assessments_total,
+            {_ratio('SUM(passes) OVER history', 'SUM(scored) OVER history')} AS pass_rate_total,
+            {','.join(_window_columns(days) for days in windows)}
+        FROM daily
+        WINDOW
+            history AS (PARTITION BY {key} ORDER BY as_of_date
+                        ROWS BETWEEN UNBOUNDED PRECEDING AND CURRENT ROW),
+            {','.join(_window_clauses(key, days) for days in windows)}
+    """
+
+
+# ----------------------------------------------------------------------
+# Incremental maintenance
+# ----------------------------------------------------------------------
+def _table_exists(con, table: str) -> bool:
+    return con.execute(
+        """
+        SELECT COUNT(*) FROM information_schema.tables
+        WHERE table_schema = 'gold' AND table_name = ?
+        """,
+        (table,),
+    ).fetchone()[0] > 0
+
+
+def _columns(con, relation: str) -> list:
+    return [row[0] for row in con.execute(f"DESCRIBE {relation}").fetchall()]
+
+
+def _stage_delta(con) -> int:
+    """
+    _feature_delta: the student_key / school_id of every fact row added,
+    changed or removed since the feature tables were last built (both
+    the old and the new version of a changed row). Returns its size.
+    """
+    con.execute(f"""
+        CREATE OR REPLACE TEMP TABLE _feature_delta AS
+        SELECT f.student_key, f.school_id
+        FROM gold.fact_tests AS f
+        ANTI JOIN gold.{SNAPSHOT_TABLE} AS s
+            ON s.fact_test_key = f.fact_test_key AND s.row_hash = f.row_hash
+        UNION ALL
+        SELECT s.student_key, s.school_id
+        FROM gold.{SNAPSHOT_TABLE} AS s
+        ANTI JOIN gold.fact_tests AS f
+            ON f.fact_test_key = s.fact_test_key AND f.row_hash = s.row_hash
+    """)
+    return con.execute("SELECT COUNT(*) FROM _feature_delta").fetchone()[0]
+
+
+def _rebuild_features(con, table: str) -> int:
+    key = FEATURE_SETS[table]
+    con.execute(f"CREATE OR REPLACE TABLE gold.{table} AS {_features_sql(key)}")
+    return con.execute(f"SELECT COUNT(*) FROM gold.{table}").fetchone()[0]
+
+
+def _update_features(con, table: str) -> int:
+    """
+    Recompute the full history of the keys in _feature_delta only;
+    rolling windows never cross keys, so other rows stay valid.
+    Returns the number of keys recomputed.
+    """
+    key = FEATURE_SETS[table]
+    con.execute(f"""
+        CREATE OR REPLACE TEMP TABLE _affected_{table} AS
+        SELECT DISTINCT {key} FROM _feature_delta WHERE {key} IS NOT NULL
+    """)
+    affected = con.execute(f"SELECT COUNT(*) FROM _affected_{table}").fetchone()[0]
+    if not affected:
+        return 0
+
+    con.execute(f"""
+        DELETE FROM gold.{table}
+        WHERE {key} IN (SELECT {key} FROM _affected_{table})
+    """)
+    con.execute(f"""
+        INSERT INTO gold.{table}
+        {_features_sql(key, f"AND {key} IN (SELECT {key} FROM _affected_{table})")}
+    """)
+    return affected
+
+
+def _snapshot_facts(con):
+    con.execute(f"""
+        CREATE OR REPLACE TABLE gold.{SNAPSHOT_TABLE} AS
+        SELECT fact_test_key, row_hash, student_key, school_id
+        FROM gold.fact_tests
+    """)
+
+
+def _export_features(con, table: str, run_id: str):
+    # Sorted by key so lookups by key prune row groups on their min/max
+    key = FEATURE_SETS[table]
+    output_path = gold_versions.new_file_set(table, run_id)
+    output_path.mkdir()
+    target = output_path / f"{table}.parquet"
+    con.execute(f"""
+        COPY (SELECT * FROM gold.{table} ORDER BY {key}, as_of_date)
+        TO '{target.as_posix()}'
+        (FORMAT PARQUET, COMPRESSION {GOLD_PARQUET_COMPRESSION},
+         ROW_GROUP_SIZE {FEATURE_ROW_GROUP_SIZE})
+    """)
+    gold_versions.stage_table(run_id, table, [target])
+
+
+def _refresh_features(con, run_id: str) -> int:
+    """
+    Bring every feature table in line with gold.fact_tests. A table is
+    rebuilt when it (or the fact snapshot) is missing or its columns
+    changed (e.g. new windows) or it is missing from the current Gold
+    version; otherwise only the keys touched by new, changed or removed
+    facts are recomputed. Returns the number of rows (rebuilds) and keys
+    (updates) written.
+    """
+    changed = _stage_delta(con) if _table_exists(con, SNAPSHOT_TABLE) else None
+
+    total = 0
+    refreshed = False
+    for table, key in FEATURE_SETS.items():
+        expected = _columns(con, f"SELECT * FROM ({_features_sql(key)}) LIMIT 0")
+        rebuild = (
+            changed is None
+            or not _table_exists(con, table)
+            or _columns(con, f"gold.{table}") != expected
+            or gold_versions.table_entry(table, run_id=run_id) is None
+        )
+        if not rebuild and not changed:
+            logger.info(f"Features unchanged, skipping: {table}")
+            continue
+
+        with track(run_id, STAGE, "materialize", entity=table) as step:
+            if rebuild:
+                rows = _rebuild_features(con, table)
+                logger.info(f"Features rebuilt: {table} ({rows} rows)")
+            else:
+                rows = _update_features(con, table)
+                logger.info(f"Features updated: {table} ({rows} {key} values recomputed)")
+            step["rows_out"] = rows
+
+        with track(run_id, STAGE, "export", entity=table):
+            _export_features(con, table, run_id)
+        total += rows
+        refreshed = True
+
+    if refreshed:
+        _snapshot_facts(con)
+    return total
+
+
+@instrument_stage(STAGE)
+def build_features(run_id: str):
+    """
+    Feature materialization after Gold: per-student and per-school
+    point-in-time feature tables (gold.features_*, published as a new
+    Gold version, see gold_versions), updated only for the students and
+    schools whose facts changed since the last build.
+    """
+    try:
+        with duckdb_connection() as con:
+            if not _table_exists(con, "fact_tests"):
+                raise FileNotFoundError("gold.fact_tests has not been built yet")
+
+            con.execute("BEGIN TRANSACTION")
+            try:
+                rows = _refresh_features(con, run_id)
+                # Published before the commit: should the commit fail, the
+                # next build recomputes the same keys and publishes again
+                gold_versions.publish(run_id)
+                con.execute("COMMIT")
+            except Exception:
+                con.execute("ROLLBACK")
+                raise
+
+        write_audit_record(run_id, STAGE, "SUCCESS", row_count=rows)
+        logger.info("Feature materialization completed")
+
+    except Exception as e:
+        logger.exception("Feature materialization failed")
+        write_audit_record(run_id, STAGE, "FAILED", error_message=str(e))
+        raise
+
+    finally:
+        flush_audit_records()
+
+
+# ----------------------------------------------------------------------
+# Lookups (read the published Parquet; never touch the DuckDB file)
+# ----------------------------------------------------------------------
+def _feature_relation(table: str, version: str | None) -> str:
+    entry = gold_versions.table_entry(table, version)
+    if entry is None:
+        raise FileNotFoundError(f"{table} has not been published yet")
+    return gold_versions.relation(entry)
+
+
+def _read_features(query: str, params: list, frames: dict | None = None) -> pd.DataFrame:
+    import duckdb
+
+    con = duckdb.connect(config=duckdb_config())
+    try:
+        for name, frame in (frames or {}).items():
+            con.register(name, frame)
+        return con.execute(query, params).df()
+    finally:
+        con.close()
+
+
+def get_features(
+    keys: list,
+    table: str = "features_student",
+    as_of: datetime.date | None = None,
+    version: str | None = None,
+) -> pd.DataFrame:
+    """
+    One feature row per key as of `as_of` (default: today), with
+    days_since_last_assessment measured at `as_of`. Keys with no
+    assessment on or before `as_of` are absent. `version` reads an
+    earlier Gold version (name or run id) instead of the current one.
+    """
+    key = FEATURE_SETS[table]
+    as_of = as_of or datetime.date.today()
+    if not keys:
+        return pd.DataFrame()
+
+    placeholders = ", ".join("?" for _ in keys)
+    return _read_features(
+        f"""
+        SELECT
+            *,
+            CAST(? AS DATE) - as_of_date AS days_since_last_assessment
+        FROM {_feature_relation(table, version)}
+        WHERE {key} IN ({placeholders})
+          AND as_of_date <= CAST(? AS DATE)
+          AND (valid_to IS NULL OR valid_to > CAST(? AS DATE))
+        ORDER BY {key}
+        """,
+        [as_of, *keys, as_of, as_of],
+    )
+
+
+def point_in_time_features(
+    requests: pd.DataFrame,
+    table: str = "features_student",
+    as_of_column: str = "as_of",
+    version: str | None = None,
+    inclusive: bool = False,
+) -> pd.DataFrame:
+    """
+    Join features onto `requests` (one row per key and date, e.g. the
+    label rows of a training set): each row gets the features of the
+    entity's last assessment date strictly before its own `as_of_column`
+    date, so a label never sees the assessment it was taken from or any
+    later one. inclusive=True also uses assessments on that same date.
+    `version` as in get_features().
+    """
+    key = FEATURE_SETS[table]
+    comparison = ">=" if inclusive else ">"
+    return _read_features(
+        f"""
+        SELECT
+            r.*,
+            f.* EXCLUDE ({key}),
+            CAST(r."{as_of_column}" AS DATE) - f.as_of_date AS days_since_last_assessment
+        FROM _requests AS r
+        ASOF LEFT JOIN {_feature_relation(table, version)} AS f
+            ON r.{key} = f.{key}
+           AND CAST(r."{as_of_column}" AS DATE) {comparison} f.as_of_date
+        """,
+        [],
+        frames={"_requests": requests},
+    )
@@ -0,0 +1,90 @@
+import pandas as pd
+
+from src.core.duckdb_conn import duckdb_config
+from src.pipeline import gold_versions
+
+
+def gold_relation(table: str, version: str | None = None, run_id: str | None = None) -> str:
+    """
+    DuckDB table expression over a Gold table of the current version (or
+    `version`, a version name or run id; `run_id` prefers what that run
+    has staged but not published yet). Partitioned datasets expose their
+    partition columns via hive_partitioning, so filters on those columns
+    skip whole files.
+    """
+    entry = gold_versions.table_entry(table, version, run_id)
+    if entry is None:
+        raise FileNotFoundError(f"Gold table {table} has not been published yet")
+    return gold_versions.relation(entry)
+
+
+def _gold_query(
+    table: str,
+    filters: dict | None,
+    columns: list | None,
+    version: str | None,
+    run_id: str | None,
+) -> tuple:
+    select = ", ".join(f'"{c}"' for c in columns) if columns else "*"
+
+    clauses, params = [], []
+    for col, value in (filters or {}).items():
+        values = value if isinstance(value, (list, tuple, set)) else [value]
+        values = list(values)
+        placeholders = ", ".join("?" for _ in values)
+        clauses.append(f'"{col}" IN ({placeholders})')
+        params.extend(values)
+
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    return f"SELECT {select} FROM {gold_relation(table, version, run_id)} {where}", params
+
+
+def read_gold(
+    table: str,
+    filters: dict | None = None,
+    columns: list | None = None,
+    version: str | None = None,
+    run_id: str | None = None,
+) -> pd.DataFrame:
+    """
+    Load a Gold table, scanning only what is needed.
+
+    filters: {column: value or list of values}; on partition columns
+             only the matching partition files are read, on other
+             columns Parquet row-group statistics are used.
+    columns: projection (default: all columns)
+    version / run_id: see gold_relation()
+    """
+    query, params = _gold_query(table, filters, columns, version, run_id)
+
+    # In-memory connection: reading Parquet never touches the DuckDB file
+    import duckdb
+
+    con = duckdb.connect(config=duckdb_config())
+    try:
+        return con.execute(query, params).df()
+    finally:
+        con.close()
+
+
+def iter_gold_batches(
+    table: str,
+    filters: dict | None = None,
+    columns: list | None = None,
+    batch_rows: int = 100_000,
+    version: str | None = None,
+    run_id: str | None = None,
+):
+    """
+    read_gold() as a stream of Arrow record batches of at most
+    `batch_rows` rows.
+    """
+    query, params = _gold_query(table, filters, columns, version, run_id)
+
+    import duckdb
+
+    con = duckdb.connect(config=duckdb_config())
+    try:
+        yield from con.execute(query, params).fetch_record_batch(batch_rows)
+    finally:
+        con.close()
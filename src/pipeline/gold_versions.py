@@ -0,0 +1,393 @@
+import json
+import os
+import re
+import shutil
+import time
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+
+from src.core.config import GOLD_DIR, GOLD_VERSIONS_KEEP, GOLD_VERSIONS_GRACE_HOURS
+from src.core.logging import get_logger
+
+logger = get_logger("GOLD_VERSIONS")
+
+# ----------------------------------------------------------------------
+# Versioned Gold outputs
+#
+#   GOLD_DIR/tables/<table>/<run_id>-<id>/...   immutable file sets
+#   GOLD_DIR/versions/<seq>_<run_id>.json       one manifest per version
+#   GOLD_DIR/versions/staging/<run_id>/         file sets a run has written
+#                                               but not published yet
+#   GOLD_DIR/versions/sequence/<seq>.json       the same manifests by sequence
+#                                               number, claimed exclusively
+#   GOLD_DIR/CURRENT                            name of the current version
+#
+# A manifest maps every Gold table to the Parquet files it is made of
+# ({"files": [...], "partition_by": [...], "run_id", "written_at"}).
+# Publishing a run writes a new manifest (the newest version's tables
+# plus the run's staged ones) and swaps CURRENT with os.replace, so
+# readers see either the previous version or the new one as a whole. Tables a run
+# did not rewrite, and fact partitions an upsert did not touch, keep
+# pointing at the file sets of earlier versions: nothing is copied.
+# ----------------------------------------------------------------------
+TABLES_DIR = GOLD_DIR / "tables"
+VERSIONS_DIR = GOLD_DIR / "versions"
+STAGING_DIR = VERSIONS_DIR / "staging"
+SEQUENCE_DIR = VERSIONS_DIR / "sequence"
+CURRENT_PATH = GOLD_DIR / "CURRENT"
+
+_VERSION_NAME = re.compile(r"^(\d{6,})_(.+)\.json$")
+
+
+def _safe_name(run_id: str) -> str:
+    # Airflow run ids carry ":" and "+"; "=" would be read as a hive
+    # partition by the readers
+    return re.sub(r"[^0-9A-Za-z_.-]+", "_", run_id)
+
+
+def _write_json(path: Path, data: dict):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f".{path.name}.{uuid.uuid4().hex}.tmp")
+    tmp_path.write_text(json.dumps(data, indent=2))
+    os.replace(tmp_path, path)
+
+
+def _relative(path: Path) -> str:
+    return Path(path).relative_to(GOLD_DIR).as_posix()
+
+
+def _file_sets(entry: dict) -> set:
+    # tables/<table>/<file set>/... → tables/<table>/<file set>
+    return {"/".join(Path(f).parts[:3]) for f in entry["files"]}
+
+
+# ----------------------------------------------------------------------
+# Writers
+# ----------------------------------------------------------------------
+def new_file_set(table: str, run_id: str) -> Path:
+    """
+    Path of a fresh, not yet existing file set directory for `table`.
+    """
+    TABLES_DIR.joinpath(table).mkdir(parents=True, exist_ok=True)
+    return TABLES_DIR / table / f"{_safe_name(run_id)}-{uuid.uuid4().hex[:8]}"
+
+
+def dataset_files(path: Path) -> list:
+    if path.is_dir():
+        return sorted(path.rglob("*.parquet"))
+    return [path] if path.exists() else []
+
+
+def stage_table(run_id: str, table: str, files: list, partition_by: list | None = None):
+    """
+    Record the files of a table written by `run_id`; they become visible
+    to readers when the run is published.
+    """
+    _write_json(
+        STAGING_DIR / _safe_name(run_id) / f"{table}.json",
+        {
+            "files": [_relative(f) for f in files],
+            "partition_by": list(partition_by or []),
+            "run_id": run_id,
+            "written_at": datetime.now(timezone.utc).isoformat(),
+        },
+    )
+
+
+def stage_drop(run_id: str, table: str):
+    """
+    Remove `table` from the Gold version `run_id` publishes (earlier
+    versions keep it).
+    """
+    _write_json(
+        STAGING_DIR / _safe_name(run_id) / f"{table}.json",
+        {
+            "files": [],
+            "partition_by": [],
+            "dropped": True,
+            "run_id": run_id,
+            "written_at": datetime.now(timezone.utc).isoformat(),
+        },
+    )
+
+
+def staged_tables(run_id: str) -> dict:
+    directory = STAGING_DIR / _safe_name(run_id)
+    if not directory.is_dir():
+        return {}
+    return {
+        path.stem: json.loads(path.read_text())
+        for path in sorted(directory.glob("*.json"))
+    }
+
+
+def _seq(name: str) -> int:
+    return int(name.split("_", 1)[0])
+
+
+def _newest_manifest() -> dict | None:
+    """
+    Manifest of the highest claimed sequence number, or of the newest
+    version file in trees published before sequence claims existed.
+    """
+    claims = sorted(SEQUENCE_DIR.glob("*.json")) if SEQUENCE_DIR.is_dir() else []
+    if claims:
+        return json.loads(claims[-1].read_text())
+    versions = list_versions()
+    return load_manifest(versions[-1]) if versions else None
+
+
+def _link_version(manifest: dict):
+    # Expose a claimed manifest under its version name (idempotent, so an
+    # interrupted publish is completed by the next one). Versions
+    # published before sequence claims have no claim and are left as is.
+    claim = SEQUENCE_DIR / f"{_seq(manifest['version']):06d}.json"
+    try:
+        os.link(claim, VERSIONS_DIR / f"{manifest['version']}.json")
+    except (FileExistsError, FileNotFoundError):
+        pass
+
+
+def _advance_current(name: str):
+    """
+    Point CURRENT at `name`, or at a newer version published meanwhile:
+    a slower concurrent publisher must not move CURRENT backwards. The
+    last writer re-checks the newest version after its write, so CURRENT
+    ends on the newest one.
+    """
+    while True:
+        tmp_path = CURRENT_PATH.with_name(f".CURRENT.{uuid.uuid4().hex}.tmp")
+        tmp_path.write_text(name)
+        os.replace(tmp_path, CURRENT_PATH)
+
+        newest = list_versions()[-1]
+        if newest == name:
+            return
+        name = newest
+
+
+def publish(run_id: str) -> str | None:
+    """
+    Publish the tables staged by `run_id` as a new Gold version on top of
+    the current one and make it current. Returns the version name (the
+    current one when nothing was staged).
+    """
+    staged = staged_tables(run_id)
+    if not staged:
+        return current_version()
+
+    # Claim the next sequence number: os.link fails if another publisher
+    # (of any run) took it first, and the manifest is then rebuilt on top
+    # of that publisher's version
+    SEQUENCE_DIR.mkdir(parents=True, exist_ok=True)
+    while True:
+        parent = _newest_manifest()
+        if parent:
+            _link_version(parent)
+        tables = dict(parent["tables"]) if parent else {}
+        tables.update(staged)
+        tables = {t: entry for t, entry in tables.items() if not entry.get("dropped")}
+
+        seq = _seq(parent["version"]) + 1 if parent else 1
+        name = f"{seq:06d}_{_safe_name(run_id)}"
+        manifest = {
+            "version": name,
+            "run_id": run_id,
+            "parent": parent["version"] if parent else None,
+            "published_at": datetime.now(timezone.utc).isoformat(),
+            "tables": tables,
+        }
+        tmp_path = VERSIONS_DIR / f".{name}.{uuid.uuid4().hex}.tmp"
+        tmp_path.write_text(json.dumps(manifest, indent=2))
+        try:
+            os.link(tmp_path, SEQUENCE_DIR / f"{seq:06d}.json")
+            break
+        except FileExistsError:
+            continue
+        finally:
+            tmp_path.unlink()
+
+    _link_version(manifest)
+    _advance_current(name)
+    shutil.rmtree(STAGING_DIR / _safe_name(run_id), ignore_errors=True)
+
+    logger.info(f"Gold version published: {name} ({', '.join(sorted(staged))})")
+    collect_garbage()
+    return name
+
+
+# ----------------------------------------------------------------------
+# Readers
+# ----------------------------------------------------------------------
+def current_version() -> str | None:
+    try:
+        return CURRENT_PATH.read_text().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def list_versions() -> list:
+    """
+    Names of the retained versions, oldest first.
+    """
+    if not VERSIONS_DIR.is_dir():
+        return []
+    names = [
+        match.group(0)[:-len(".json")]
+        for path in VERSIONS_DIR.iterdir()
+        if (match := _VERSION_NAME.match(path.name))
+    ]
+    return sorted(names)
+
+
+def resolve_version(version: str | None = None) -> str | None:
+    """
+    Version name for a version name, a run id (its latest version) or
+    None (the current version).
+    """
+    if version is None:
+        return current_version()
+    versions = list_versions()
+    if version in versions:
+        return version
+    matches = [v for v in versions if v.split("_", 1)[1] == _safe_name(version)]
+    if not matches:
+        raise KeyError(f"Unknown Gold version: {version!r}")
+    return matches[-1]
+
+
+def load_manifest(version: str | None = None) -> dict | None:
+    name = resolve_version(version)
+    if name is None:
+        return None
+    return json.loads((VERSIONS_DIR / f"{name}.json").read_text())
+
+
+def table_entry(table: str, version: str | None = None, run_id: str | None = None) -> dict | None:
+    """
+    Manifest entry of `table`: the one staged by `run_id` if any, else
+    the one of `version` (default: current).
+    """
+    if run_id is not None:
+        staged = STAGING_DIR / _safe_name(run_id) / f"{table}.json"
+        if staged.exists():
+            entry = json.loads(staged.read_text())
+            return None if entry.get("dropped") else entry
+    manifest = load_manifest(version)
+    return manifest["tables"].get(table) if manifest else None
+
+
+def table_files(table: str, version: str | None = None, run_id: str | None = None) -> list:
+    entry = table_entry(table, version, run_id)
+    return [GOLD_DIR / f for f in entry["files"]] if entry else []
+
+
+def contains(entry: dict | None, path: Path) -> bool:
+    """
+    True when a manifest entry reads (part of) the file set at `path`.
+    """
+    if entry is None:
+        return False
+    try:
+        return _relative(path) in _file_sets(entry)
+    except ValueError:
+        # Outside GOLD_DIR (e.g. recorded before PIPELINE_DATA_DIR moved)
+        return False
+
+
+def relation(entry: dict) -> str:
+    """
+    DuckDB table expression over the files of a manifest entry.
+    Partitioned tables expose their partition columns (hive_partitioning),
+    so filters on those columns skip whole files.
+    """
+    files = ", ".join(
+        "'" + (GOLD_DIR / f).as_posix().replace("'", "''") + "'" for f in entry["files"]
+    )
+    options = ", hive_partitioning = true, union_by_name = true" if entry["partition_by"] else ""
+    return f"read_parquet([{files}]{options})"
+
+
+def create_views(con, version: str | None = None, schema: str = "gold", run_id: str | None = None) -> str:
+    """
+    Create one view per Gold table of `version` (name, run id or None for
+    current; plus the tables staged by `run_id`) in `schema` of `con`.
+    Returns the version name.
+    """
+    manifest = load_manifest(version)
+    if manifest is None and not run_id:
+        raise FileNotFoundError("No Gold version has been published yet")
+
+    tables = dict(manifest["tables"]) if manifest else {}
+    if run_id is not None:
+        tables.update(staged_tables(run_id))
+
+    con.execute(f"CREATE SCHEMA IF NOT EXISTS {schema}")
+    for table, entry in tables.items():
+        if entry["files"]:
+            con.execute(
+                f"CREATE OR REPLACE VIEW {schema}.{table} AS SELECT * FROM {relation(entry)}"
+            )
+    return manifest["version"] if manifest else None
+
+
+# ----------------------------------------------------------------------
+# Retention
+# ----------------------------------------------------------------------
+def _age_hours(path: Path, now: float) -> float:
+    return (now - path.stat().st_mtime) / 3600
+
+
+def collect_garbage(keep: int = GOLD_VERSIONS_KEEP) -> int:
+    """
+    Drop all but the newest `keep` versions (the current one is always
+    kept), then every file set no retained or staged manifest reads.
+    Staging directories of runs that never published and unreferenced
+    file sets are left alone for GOLD_VERSIONS_GRACE_HOURS, so in-flight
+    and retried runs keep theirs. Returns the number of file sets removed.
+    """
+    now = time.time()
+    current = current_version()
+    versions = list_versions()
+    retained = set(versions[-max(keep, 1):]) | ({current} if current else set())
+
+    for name in versions:
+        if name not in retained:
+            (VERSIONS_DIR / f"{name}.json").unlink(missing_ok=True)
+            (SEQUENCE_DIR / f"{_seq(name):06d}.json").unlink(missing_ok=True)
+
+    referenced = set()
+    for name in retained:
+        for entry in load_manifest(name)["tables"].values():
+            referenced |= _file_sets(entry)
+
+    if STAGING_DIR.is_dir():
+        for run_dir in STAGING_DIR.iterdir():
+            if _age_hours(run_dir, now) > GOLD_VERSIONS_GRACE_HOURS:
+                shutil.rmtree(run_dir, ignore_errors=True)
+                continue
+            for path in run_dir.glob("*.json"):
+                referenced |= _file_sets(json.loads(path.read_text()))
+
+    removed = 0
+    for table_dir in TABLES_DIR.iterdir() if TABLES_DIR.is_dir() else []:
+        for file_set in table_dir.iterdir():
+            if _relative(file_set) in referenced:
+                continue
+            if _age_hours(file_set, now) <= GOLD_VERSIONS_GRACE_HOURS:
+                continue
+            shutil.rmtree(file_set, ignore_errors=True)
+            removed += 1
+
+        # Unversioned outputs of earlier releases
+        legacy = [GOLD_DIR / f"{table_dir.name}.parquet", GOLD_DIR / table_dir.name]
+        for path in legacy:
+            if path.is_dir():
+                shutil.rmtree(path, ignore_errors=True)
+            elif path.exists():
+                path.unlink()
+
+    if removed:
+        logger.info(f"Gold file sets removed: {removed}")
+    return removed
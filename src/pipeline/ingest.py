@@ -1,30 +1,261 @@
-import pandas as pd
-from src.core.config import BRONZE_DIR, SILVER_DIR
-from src.core.logging import get_logger
-from src.core.audit import write_audit_record
-from src.core.idempotency import already_exists
+import asyncio
+import os
+import pyarrow as pa
+import pyarrow.parquet as pq
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from src.core.config import (
+    BRONZE_DIR,
+    BRONZE_GLOB,
+    BRONZE_DATASET_DIR,
+    INGEST_MAX_WORKERS,
+    INGEST_CONCURRENCY,
+)
+from src.core.logging import get_logger, worker_log_queue
+from src.core.audit import write_audit_record, flush_audit_records
+from src.core.executor import init_worker
+from src.core.idempotency import file_fingerprint, outputs_intact
+from src.core.manifest import get_last_entries, record_entry
+from src.core.metrics import instrument_stage, track
+from src.pipeline.workbook import cache_workbook, sheet_entity
 
 logger = get_logger("INGEST")
 
-def ingest_excel(run_id: str):
-    source_path = BRONZE_DIR / "student_evaluation_raw.xlsx"
-    target_path = SILVER_DIR / "student_evaluation_cleaned.parquet"
+STAGE = "bronze_ingestion"
 
-    if already_exists(target_path):
-        logger.info("Bronze ingestion skipped (already exists)")
-        return
+# Lineage columns added to every ingested row
+SOURCE_FILE_COLUMN = "source_file"
+SOURCE_HASH_COLUMN = "source_hash"
+
+# Manifest entity per source workbook: "workbook:<file name>"
+ENTITY_PREFIX = "workbook:"
+
+
+# ----------------------------------------------------------------------
+# Worker process: one workbook → Bronze dataset files
+# ----------------------------------------------------------------------
+def _write_atomic(table: pa.Table, path: Path):
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    try:
+        pq.write_table(table, tmp_path)
+        os.replace(tmp_path, path)
+    finally:
+        if tmp_path.exists():
+            tmp_path.unlink()
+
+
+def _ingest_workbook(source_path: str, digest: str) -> dict:
+    """
+    Parse one workbook (through the per-hash workbook cache) and write
+    each mapped worksheet, tagged with its source file and content hash,
+    to BRONZE_DATASET_DIR/<entity>/<hash>-<sheet index>.parquet.
+
+    Returns {"outputs": {entity:index: fingerprint}, "rows": n}.
+    """
+    source_path = Path(source_path)
+    sheets = cache_workbook(source_path, digest=digest)
+
+    outputs = {}
+    rows = 0
+    for index, (sheet_name, sheet_path) in enumerate(sheets.items()):
+        entity = sheet_entity(sheet_name)
+        if entity is None:
+            logger.warning(
+                f"Skipping unmapped worksheet: {source_path.name}/{sheet_name}"
+            )
+            continue
+
+        table = pq.read_table(sheet_path)
+        table = table.append_column(
+            SOURCE_FILE_COLUMN, pa.array([source_path.name] * table.num_rows, pa.string())
+        ).append_column(
+            SOURCE_HASH_COLUMN, pa.array([digest[:16]] * table.num_rows, pa.string())
+        )
 
-    df = pd.read_excel(source_path)
+        target_dir = BRONZE_DATASET_DIR / entity
+        target_dir.mkdir(parents=True, exist_ok=True)
+        target_path = target_dir / f"{digest[:16]}-{index:03d}.parquet"
+        _write_atomic(table, target_path)
 
-    df.columns = [c.strip().lower() for c in df.columns]
+        outputs[f"{entity}:{index}"] = file_fingerprint(target_path)
+        rows += table.num_rows
 
-    df.to_parquet(target_path, index=False)
+    return {"outputs": outputs, "rows": rows}
 
-    write_audit_record(
-        run_id=run_id,
-        stage="bronze_ingestion",
-        status="SUCCESS",
-        row_count=len(df)
+
+# ----------------------------------------------------------------------
+# Event loop: discovery and bounded scheduling
+# ----------------------------------------------------------------------
+def _list_workbooks(pattern: str) -> list:
+    # Office lock files (~$name.xlsx) and hidden files are not workbooks
+    return sorted(
+        path for path in BRONZE_DIR.glob(pattern)
+        if path.is_file() and not path.name.startswith(("~$", "."))
     )
 
-    logger.info(f"Bronze ingestion completed: {len(df)} rows")
+
+async def _ingest_sources(
+    run_id: str,
+    pattern: str,
+    previous: dict,
+    max_workers: int | None,
+    concurrency: int,
+) -> list:
+    """
+    Discover workbooks, fingerprint them in threads and parse the ones
+    whose content hash has not been ingested yet on a process pool, with
+    at most `concurrency` workbooks in flight.
+
+    Returns one (path, fingerprint, result or None if skipped) per
+    discovered workbook.
+    """
+    paths = await asyncio.to_thread(_list_workbooks, pattern)
+    if not paths:
+        return []
+
+    # Content hashes whose Bronze files are still in place
+    ingested = {
+        entry["inputs"]["workbook"]["content_hash"]
+        for entry in previous.values()
+        if outputs_intact(entry["outputs"])
+    }
+    claimed = set()
+
+    loop = asyncio.get_running_loop()
+    semaphore = asyncio.Semaphore(concurrency)
+    workers = min(max_workers or os.cpu_count() or 1, len(paths))
+
+    with ProcessPoolExecutor(
+        max_workers=workers, initializer=init_worker, initargs=(worker_log_queue(),)
+    ) as pool:
+
+        async def ingest(path: Path):
+            async with semaphore:
+                last = previous.get(f"{ENTITY_PREFIX}{path.name}")
+                fingerprint = await asyncio.to_thread(
+                    file_fingerprint,
+                    path,
+                    last["inputs"]["workbook"] if last else None,
+                )
+                digest = fingerprint["content_hash"]
+
+                if digest in ingested or digest in claimed:
+                    logger.info(f"Bronze ingestion skipped (already ingested): {path.name}")
+                    return path, fingerprint, None
+                claimed.add(digest)
+
+                with track(run_id, STAGE, "parse", entity=path.name) as step:
+                    result = await loop.run_in_executor(
+                        pool, _ingest_workbook, str(path), digest
+                    )
+                    step["rows_out"] = result["rows"]
+                return path, fingerprint, result
+
+        return await asyncio.gather(*(ingest(path) for path in paths))
+
+
+def _retire_outputs(entry: dict | None, current_hashes: set):
+    """
+    Delete the Bronze files of a workbook's previous version, unless
+    another current workbook has the same contents.
+    """
+    if entry is None:
+        return
+    if entry["inputs"]["workbook"]["content_hash"] in current_hashes:
+        return
+    for fingerprint in entry["outputs"].values():
+        Path(fingerprint["path"]).unlink(missing_ok=True)
+
+
+def _retire_deleted(run_id: str, previous: dict, current_hashes: set) -> int:
+    """
+    Retire the Bronze files of workbooks no longer in BRONZE_DIR and
+    record an empty entry for each, so a workbook put back later is
+    ingested again. Returns the number of workbooks retired.
+    """
+    retired = 0
+    for entity, entry in previous.items():
+        if (BRONZE_DIR / entity[len(ENTITY_PREFIX):]).exists():
+            continue
+        _retire_outputs(entry, current_hashes)
+        record_entry(run_id, STAGE, entity, {}, {})
+        logger.info(f"Bronze outputs retired (workbook removed): {entity[len(ENTITY_PREFIX):]}")
+        retired += 1
+    return retired
+
+
+@instrument_stage(STAGE)
+def ingest_excel(
+    run_id: str,
+    pattern: str = BRONZE_GLOB,
+    max_workers: int | None = INGEST_MAX_WORKERS,
+    concurrency: int = INGEST_CONCURRENCY,
+):
+    """
+    Ingest every workbook in BRONZE_DIR matching `pattern` into the
+    Bronze dataset (one directory per entity, one file per source
+    worksheet, tagged with source_file / source_hash).
+
+    Workbooks whose content hash was already ingested are skipped; a
+    workbook whose contents changed replaces its previous files, and the
+    files of a workbook removed from BRONZE_DIR are deleted.
+    """
+    try:
+        # Workbooks retired by an earlier run have an empty entry
+        previous = {
+            entity: entry
+            for entity, entry in get_last_entries(STAGE, ENTITY_PREFIX).items()
+            if entry["inputs"]
+        }
+        sources = asyncio.run(
+            _ingest_sources(run_id, pattern, previous, max_workers, concurrency)
+        )
+
+        if not sources:
+            raise FileNotFoundError(f"No workbooks matching {pattern!r} in {BRONZE_DIR}")
+
+        current_hashes = {fp["content_hash"] for _, fp, _ in sources}
+        total_rows = 0
+        ingested = 0
+
+        for path, fingerprint, result in sources:
+            if result is None:
+                continue
+
+            entity = f"{ENTITY_PREFIX}{path.name}"
+            _retire_outputs(previous.get(entity), current_hashes)
+            record_entry(
+                run_id, STAGE, entity, {"workbook": fingerprint}, result["outputs"]
+            )
+            total_rows += result["rows"]
+            ingested += 1
+
+        retired = _retire_deleted(run_id, previous, current_hashes)
+
+        write_audit_record(
+            run_id=run_id,
+            stage=STAGE,
+            status="SUCCESS",
+            row_count=total_rows,
+            record_count=ingested,
+        )
+
+        logger.info(
+            f"Bronze ingestion completed: {ingested} of {len(sources)} workbooks, "
+            f"{total_rows} rows, {retired} removed workbooks retired"
+        )
+
+    except Exception as e:
+        logger.exception("Bronze ingestion failed")
+
+        write_audit_record(
+            run_id=run_id,
+            stage=STAGE,
+            status="FAILED",
+            error_message=str(e),
+        )
+        raise
+
+    finally:
+        flush_audit_records()
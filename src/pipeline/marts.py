@@ -0,0 +1,167 @@
+from src.core.config import GOLD_PARQUET_COMPRESSION, ANALYTICS_PASS_SCORE
+from src.core.logging import get_logger
+from src.pipeline import gold_versions
+
+logger = get_logger("GOLD_MARTS")
+
+# ----------------------------------------------------------------------
+# Aggregate marts over gold.fact_tests
+#
+# Each mart keeps mergeable aggregates per group (count, sum, sum of
+# squares, pass count), so averages, pass rates and standard deviations
+# can be rolled up to any coarser grain at query time
+# (see sql/analytics/analytics_mart_queries.sql).
+# ----------------------------------------------------------------------
+MARTS = {
+    "mart_school_month": ["school_id", "exam_month"],
+    "mart_test_month": ["assessment_type", "exam_month"],
+    "mart_student": ["student_id"],
+    "mart_grading_group": ["grading_group_key"],
+}
+
+# Marts of earlier releases, dropped from DuckDB and the Gold version.
+# mart_teacher_test joined teachers to tests on school and school year
+# only (fact_tests has no teacher or class key), crediting every test of
+# a school year to every teacher there.
+RETIRED_MARTS = ["mart_teacher_test"]
+
+
+def _source(con, mart: str, fact: str) -> str:
+    """
+    Rows of `fact` projected to the mart's group columns plus the score.
+    """
+    return f"""
+        SELECT
+            f.school_id,
+            f.student_id,
+            f.grading_group_key,
+            f.assessment_type,
+            CAST(date_trunc('month', f.assessment_date) AS DATE) AS exam_month,
+            f.standard_score AS score
+        FROM {fact} AS f
+    """
+
+
+def _aggregate_sql(con, mart: str, fact: str, where: str = "") -> str:
+    cols = ", ".join(MARTS[mart])
+    return f"""
+        SELECT
+            {cols},
+            COUNT(score) AS score_count,
+            SUM(score) AS score_sum,
+            SUM(CAST(score AS DOUBLE) * score) AS score_sumsq,
+            COUNT(*) FILTER (WHERE score >= {ANALYTICS_PASS_SCORE}) AS pass_count
+        FROM ({_source(con, mart, fact)}) AS s
+        {where}
+        GROUP BY {cols}
+    """
+
+
+def _mart_exists(con, mart: str) -> bool:
+    return con.execute(
+        """
+        SELECT COUNT(*) FROM information_schema.tables
+        WHERE table_schema = 'gold' AND table_name = ?
+        """,
+        (mart,),
+    ).fetchone()[0] > 0
+
+
+def _rebuild_mart(con, mart: str) -> int:
+    con.execute(
+        f"CREATE OR REPLACE TABLE gold.{mart} AS "
+        f"{_aggregate_sql(con, mart, 'gold.fact_tests')}"
+    )
+    return con.execute(f"SELECT COUNT(*) FROM gold.{mart}").fetchone()[0]
+
+
+def _update_mart(con, mart: str) -> int:
+    """
+    Recompute only the groups touched by the last fact upsert: the
+    groups of the changed rows (_changed_fact_tests) and of the versions
+    they replaced (_previous_fact_tests).
+    """
+    cols = MARTS[mart]
+    col_list = ", ".join(cols)
+
+    con.execute(f"""
+        CREATE OR REPLACE TEMP TABLE _affected_{mart} AS
+        SELECT DISTINCT {col_list} FROM ({_source(con, mart, '_changed_fact_tests')})
+        UNION
+        SELECT DISTINCT {col_list} FROM ({_source(con, mart, '_previous_fact_tests')})
+    """)
+
+    affected = con.execute(f"SELECT COUNT(*) FROM _affected_{mart}").fetchone()[0]
+    if not affected:
+        return 0
+
+    def matches(alias: str) -> str:
+        return " AND ".join(
+            f"a.{c} IS NOT DISTINCT FROM {alias}.{c}" for c in cols
+        )
+
+    con.execute(f"""
+        DELETE FROM gold.{mart}
+        WHERE EXISTS (
+            SELECT 1 FROM _affected_{mart} AS a WHERE {matches(f'gold.{mart}')}
+        )
+    """)
+    con.execute(f"""
+        INSERT INTO gold.{mart}
+        {_aggregate_sql(
+            con, mart, 'gold.fact_tests',
+            f"WHERE EXISTS (SELECT 1 FROM _affected_{mart} AS a WHERE {matches('s')})",
+        )}
+    """)
+    return affected
+
+
+def _export_mart(con, mart: str, run_id: str):
+    output_path = gold_versions.new_file_set(mart, run_id)
+    output_path.mkdir()
+    target = output_path / f"{mart}.parquet"
+    con.execute(
+        f"COPY gold.{mart} TO '{target.as_posix()}' "
+        f"(FORMAT PARQUET, COMPRESSION {GOLD_PARQUET_COMPRESSION})"
+    )
+    gold_versions.stage_table(run_id, mart, [target])
+
+
+def refresh_marts(con, run_id: str, changes: dict) -> int:
+    """
+    Bring every mart in line with gold.fact_tests.
+
+    changes: {gold table: "rebuilt" | "upserted"} for the tables written
+    in this run. A mart is rebuilt when it is missing or the fact table
+    was rebuilt; after a fact upsert only the affected groups are
+    recomputed. Marts missing from the Gold version visible to `run_id`
+    are rebuilt too, and RETIRED_MARTS are dropped. Returns the number of
+    mart groups written.
+    """
+    fact_change = changes.get("fact_tests")
+    total = 0
+
+    for mart in RETIRED_MARTS:
+        con.execute(f"DROP TABLE IF EXISTS gold.{mart}")
+        if gold_versions.table_entry(mart, run_id=run_id) is not None:
+            gold_versions.stage_drop(run_id, mart)
+            logger.info(f"Mart retired: {mart}")
+
+    for mart in MARTS:
+        if (
+            not _mart_exists(con, mart)
+            or gold_versions.table_entry(mart, run_id=run_id) is None
+            or fact_change == "rebuilt"
+        ):
+            rows = _rebuild_mart(con, mart)
+            logger.info(f"Mart rebuilt: {mart} ({rows} groups)")
+        elif fact_change == "upserted":
+            rows = _update_mart(con, mart)
+            logger.info(f"Mart updated: {mart} ({rows} groups recomputed)")
+        else:
+            continue
+
+        _export_mart(con, mart, run_id)
+        total += rows
+
+    return total
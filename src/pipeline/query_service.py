@@ -0,0 +1,166 @@
+import re
+import threading
+import time
+from collections import OrderedDict
+
+import pandas as pd
+
+from src.core.config import (
+    PROJECT_ROOT,
+    QUERY_CACHE_SIZE,
+    QUERY_VERSION_TTL,
+)
+from src.core.duckdb_conn import duckdb_config
+from src.core.logging import get_logger
+from src.pipeline import gold_versions
+
+logger = get_logger("QUERY_SERVICE")
+
+QUERIES_PATH = PROJECT_ROOT / "sql" / "analytics" / "analytics_mart_queries.sql"
+
+# "-- 1. Average Score by School" → "average_score_by_school"
+_QUERY_HEADER = re.compile(r"^--\s*\d+\.\s*(.+?)\s*$", re.MULTILINE)
+
+_lock = threading.Lock()
+_results = OrderedDict()
+_queries = None
+_version = None
+_version_checked_at = 0.0
+
+
+# ----------------------------------------------------------------------
+# Named queries
+# ----------------------------------------------------------------------
+def _query_name(title: str) -> str:
+    title = re.sub(r"\(.*?\)", "", title)
+    return re.sub(r"[^0-9a-z]+", "_", title.lower()).strip("_")
+
+
+def load_queries(path=QUERIES_PATH) -> dict:
+    """
+    {name: sql} for every "-- N. Title" section of an analytics SQL file.
+    """
+    text = path.read_text()
+    headers = list(_QUERY_HEADER.finditer(text))
+
+    queries = {}
+    for header, following in zip(headers, headers[1:] + [None]):
+        end = following.start() if following else len(text)
+        sql = text[header.end():end].strip().rstrip(";").strip()
+        if sql:
+            queries[_query_name(header.group(1))] = sql
+    return queries
+
+
+def list_queries() -> list:
+    return list(_named_queries())
+
+
+def _named_queries() -> dict:
+    global _queries
+
+    with _lock:
+        if _queries is None:
+            _queries = load_queries()
+        return _queries
+
+
+# ----------------------------------------------------------------------
+# Gold data version
+# ----------------------------------------------------------------------
+def data_version():
+    """
+    Current Gold version (src/pipeline/gold_versions.py), re-read from
+    the CURRENT pointer at most once every QUERY_VERSION_TTL seconds.
+    """
+    global _version, _version_checked_at
+
+    now = time.monotonic()
+    with _lock:
+        if now - _version_checked_at < QUERY_VERSION_TTL:
+            return _version
+
+    version = gold_versions.current_version()
+
+    with _lock:
+        if version != _version:
+            _results.clear()
+        _version = version
+        _version_checked_at = now
+        return version
+
+
+def invalidate_query_cache():
+    """
+    Drop every cached result and force the next query to re-read the data
+    version. Called by build_gold_layer after a successful run.
+    """
+    global _version_checked_at
+
+    with _lock:
+        _results.clear()
+        _version_checked_at = 0.0
+
+
+# ----------------------------------------------------------------------
+# Execution
+# ----------------------------------------------------------------------
+def _execute(sql: str, params: tuple, version: str | None) -> pd.DataFrame:
+    # In-memory connection with a view per table of the Gold version:
+    # queries never touch the DuckDB file or see a half-published run
+    import duckdb
+
+    con = duckdb.connect(config=duckdb_config())
+    try:
+        gold_versions.create_views(con, version)
+        return con.execute(sql, list(params)).df()
+    finally:
+        con.close()
+
+
+def run_sql(
+    sql: str,
+    params: tuple | list | None = None,
+    version: str | None = None,
+) -> pd.DataFrame:
+    """
+    Run a read-only query through the result cache against the gold.*
+    views of the current Gold version, or of `version` (a version name
+    or run id) for reproducing earlier results.
+
+    Results are keyed by (sql, params, Gold version) and evicted
+    least-recently-used beyond QUERY_CACHE_SIZE entries. Cached frames
+    are shared between callers and must not be modified in place.
+    """
+    params = tuple(params or ())
+    version = data_version() if version is None else gold_versions.resolve_version(version)
+    key = (sql, params, version)
+
+    with _lock:
+        if key in _results:
+            _results.move_to_end(key)
+            return _results[key]
+
+    result = _execute(sql, params, version)
+
+    with _lock:
+        _results[key] = result
+        _results.move_to_end(key)
+        while len(_results) > QUERY_CACHE_SIZE:
+            _results.popitem(last=False)
+
+    return result
+
+
+def run_query(
+    name: str,
+    params: tuple | list | None = None,
+    version: str | None = None,
+) -> pd.DataFrame:
+    """
+    Run a named analytics query (see list_queries()).
+    """
+    queries = _named_queries()
+    if name not in queries:
+        raise KeyError(f"Unknown analytics query: {name!r}. Available: {list(queries)}")
+    return run_sql(queries[name], params, version)
@@ -0,0 +1,136 @@
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from src.core.logging import get_logger
+
+logger = get_logger("SILVER_SCHEMAS")
+
+# ----------------------------------------
+# Declared Silver dtypes per entity (standardized column names)
+#
+#   id        high-cardinality identifiers / free text → Arrow string
+#   category  repeated labels and low-cardinality keys → dictionary-encoded
+#   int8/16   nullable integers
+#   float     nullable float
+#   date      calendar dates → Arrow date32 (DuckDB DATE)
+#
+# Columns not listed keep their inferred dtype.
+# ----------------------------------------
+SILVER_SCHEMAS = {
+    "schools": {
+        "school_id": "id",
+        "school_name": "id",
+        "municipality": "category",
+    },
+    "students": {
+        "student_id": "id",
+        "date_of_birth": "date",
+        "gender": "category",
+        "student_name": "id",
+        "school_id": "category",
+    },
+    "teachers": {
+        "course_name": "category",
+        "course_no": "category",
+        "school_id": "category",
+        "school_year": "category",
+        "teacher_id": "category",
+    },
+    "grading_groups": {
+        "assessement_level_id": "id",
+        "assessement_level": "category",
+        "level_grouping": "category",
+        "score_range": "category",
+    },
+    "test_details": {
+        "assessment_group": "category",
+        "assessment_type": "category",
+        "description": "id",
+        "assesment_cost": "float",
+    },
+    "tests": {
+        "standard_score": "int16",
+        "assessement_level_id": "category",
+        "student_assessment_id": "id",
+        "student_id": "id",
+        "assessment_type": "category",
+        "assessment_date": "date",
+        "school_year_/_grade_/_class": "int8",
+        "semester": "category",
+        "school_year2": "category",
+        "toswrf_assessment_id": "id",
+        "towre_assessment_id": "id",
+        "grade_at_assessment": "category",
+    },
+}
+
+# Lineage columns added at Bronze ingestion, on every entity
+LINEAGE_SCHEMA = {
+    "source_file": "category",
+    "source_hash": "category",
+}
+
+DATE_DTYPE = pd.ArrowDtype(pa.date32())
+STRING_DTYPE = "string[pyarrow]"
+
+
+def _text(value):
+    if value is None or pd.isna(value):
+        return value
+    # Integral floats are integers read through a float column (a numeric
+    # column with blanks): 123.0 → "123", as typed in the workbook
+    if isinstance(value, (float, np.floating)) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def standard_name(name) -> str:
+    # Worksheet header → standardized column name ("Student ID" → "student_id")
+    return str(name).strip().lower().replace(" ", "_")
+
+
+def as_text(values: pd.Series) -> pd.Series:
+    if pd.api.types.infer_dtype(values, skipna=True) in ("string", "empty"):
+        return values.astype(STRING_DTYPE)
+    # Cells typed as numbers by the workbook reader are kept as their text
+    return values.map(_text).astype(STRING_DTYPE)
+
+
+def _cast(values: pd.Series, kind: str) -> pd.Series:
+    if kind == "id":
+        return as_text(values)
+    if kind == "category":
+        return as_text(values).astype("category")
+    if kind in ("int8", "int16"):
+        return pd.to_numeric(values, errors="coerce").round().astype(kind.capitalize())
+    if kind == "float":
+        return pd.to_numeric(values, errors="coerce").astype("Float64")
+    if kind == "date":
+        if not pd.api.types.is_datetime64_any_dtype(values):
+            values = pd.to_datetime(values, dayfirst=True, errors="coerce")
+        dates = pa.array(values.dt.normalize(), from_pandas=True).cast(pa.date32())
+        return pd.Series(pd.arrays.ArrowExtensionArray(dates), index=values.index)
+    raise ValueError(f"Unknown Silver column kind: {kind!r}")
+
+
+def apply_schema(entity: str, df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Cast a standardized frame to the declared Silver dtypes of `entity`.
+    Values that cannot be converted become null (and are logged), so DQ
+    reports them instead of the transform failing.
+    """
+    for col, kind in {**LINEAGE_SCHEMA, **SILVER_SCHEMAS.get(entity, {})}.items():
+        if col not in df.columns:
+            continue
+
+        cast = _cast(df[col], kind)
+
+        lost = int((cast.isna() & df[col].notna()).sum())
+        if lost:
+            logger.warning(
+                f"{entity}.{col}: {lost} values not convertible to {kind}, set to null"
+            )
+        df[col] = cast
+
+    return df
@@ -1,30 +1,40 @@
+import os
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
 from pathlib import Path
 
-from src.core.config import BRONZE_DIR, SILVER_DIR, QUARANTINE_DIR
+from src.core.config import (
+    BRONZE_DATASET_DIR,
+    SILVER_DIR,
+    SILVER_EXECUTOR,
+    SILVER_MAX_WORKERS,
+    SILVER_STREAMING,
+    SILVER_BATCH_ROWS,
+)
 from src.core.logging import get_logger
-from src.core.audit import write_audit_record
+from src.core.audit import (
+    deferred_audit,
+    drain_audit_records,
+    flush_audit_records,
+    replay_audit_records,
+    write_audit_record,
+)
+from src.core.dataset_registry import fused_active, publish
+from src.core.duckdb_conn import duckdb_config
+from src.core.executor import run_tasks
+from src.core.parquet_io import ParquetBatchWriter
+from src.core.quarantine import QuarantineSink
+from src.core.idempotency import file_fingerprint
+from src.core.manifest import get_last_entry, is_up_to_date, record_entry
+from src.core.metrics import instrument_stage, track
+from src.pipeline.schemas import LINEAGE_SCHEMA, apply_schema, standard_name
+from src.pipeline.workbook import SHEET_ENTITY_MAP
 
 logger = get_logger("SILVER_TRANSFORM")
 
-# ----------------------------------------
-# Worksheet → Silver entity mapping
-# ----------------------------------------
-SHEET_ENTITY_MAP = {
-    "student": "students",
-    "students": "students",
-    "teacher": "teachers",
-    "teachers": "teachers",
-    "school": "schools",
-    "schools": "schools",
-    "test": "tests",
-    "tests": "tests",
-    "test details": "test_details",
-    "test_details": "test_details",
-    "grading group": "grading_groups",
-    "grading groups": "grading_groups",
-    "grading_groups": "grading_groups",
-}
+STAGE = "silver_transform"
 
 # ----------------------------------------
 # Critical columns for DQ
@@ -35,15 +45,24 @@ CRITICAL_COLUMNS = {
     "schools": ["school_id"],
     "grading_groups": ["assessement_level_id"],
     "test_details": ["assessment_type"],
+    # Natural key of fact_tests (src/pipeline/analytics.py)
+    "tests": ["student_assessment_id"],
 }
 
 def _standardize_columns(df: pd.DataFrame) -> pd.DataFrame:
-    df.columns = (
-        df.columns.astype(str)
-        .str.strip()
-        .str.lower()
-        .str.replace(" ", "_")
-    )
+    df.columns = [standard_name(c) for c in df.columns]
+    if df.columns.has_duplicates:
+        # Headers differing only in case or spacing ("Student ID" and
+        # "student_id"): one column, first non-null value per row
+        duplicated = sorted(set(df.columns[df.columns.duplicated()]))
+        logger.warning(f"Merging columns with equivalent headers: {duplicated}")
+        df = pd.DataFrame(
+            {
+                col: df.loc[:, df.columns == col].bfill(axis=1).iloc[:, 0]
+                for col in dict.fromkeys(df.columns)
+            },
+            index=df.index,
+        )
     return df
 
 def _split_valid_invalid(df: pd.DataFrame, required_cols: list):
@@ -59,78 +78,434 @@ def _split_valid_invalid(df: pd.DataFrame, required_cols: list):
     valid = df.dropna(subset=required_cols)
     return valid, invalid
 
-def transform_silver(run_id: str):
-    source_file = BRONZE_DIR / "student_evaluation_raw.xlsx"
+def _content_columns(df: pd.DataFrame) -> list:
+    # Rows repeated across source workbooks are duplicates too; the first
+    # source's lineage is kept
+    return [c for c in df.columns if c not in LINEAGE_SCHEMA]
 
-    if not source_file.exists():
-        raise FileNotFoundError(f"Missing source file: {source_file}")
+def _duplicate_positions(path: Path, columns: list) -> np.ndarray:
+    """
+    Sorted positions of the rows of a Parquet file that repeat an earlier
+    row on `columns`. DuckDB compares the values themselves (no hash
+    collisions) and spills to disk past DUCKDB_MEMORY_LIMIT, so memory
+    does not grow with the number of distinct rows.
+    """
+    import duckdb
 
-    invalid_records = []
-    total_rows = 0
+    source = f"read_parquet('{path.as_posix()}', file_row_number = true)"
+    group = ", ".join('"' + c.replace('"', '""') + '"' for c in columns)
 
+    con = duckdb.connect(config=duckdb_config())
     try:
-        sheets = pd.read_excel(source_file, sheet_name=None)
+        positions = con.execute(f"""
+            SELECT file_row_number FROM {source}
+            ANTI JOIN (
+                SELECT MIN(file_row_number) AS file_row_number
+                FROM {source}
+                GROUP BY {group}
+            ) AS f USING (file_row_number)
+            ORDER BY file_row_number
+        """).fetchnumpy()["file_row_number"]
+    finally:
+        con.close()
+    return np.asarray(positions, dtype=np.int64)
 
-        for raw_sheet_name, df in sheets.items():
-            sheet_key = raw_sheet_name.strip().lower()
+def _dedupe_file(source: Path, target: Path, columns: list) -> int:
+    """
+    Streaming drop_duplicates: copy `source` to `target` without the
+    rows that repeat an earlier one on `columns`, row group by row
+    group. Returns the rows written.
+    """
+    tmp_path = target.with_name(f".{target.name}.{os.getpid()}.tmp")
+    try:
+        duplicates = _duplicate_positions(source, columns)
+        if not len(duplicates):
+            os.replace(source, target)
+            return pq.ParquetFile(target).metadata.num_rows
+
+        reader = pq.ParquetFile(source)
+        rows = offset = 0
+        with pq.ParquetWriter(tmp_path, reader.schema_arrow, compression="snappy") as writer:
+            for index in range(reader.num_row_groups):
+                table = reader.read_row_group(index)
+                positions = np.arange(offset, offset + table.num_rows)
+                offset += table.num_rows
+                table = table.filter(pa.array(~np.isin(positions, duplicates)))
+                writer.write_table(table)
+                rows += table.num_rows
+        os.replace(tmp_path, target)
+        return rows
+    finally:
+        tmp_path.unlink(missing_ok=True)
+        source.unlink(missing_ok=True)
+
+def _quarantine_rule(entity: str) -> str:
+    return f"not_null:{','.join(CRITICAL_COLUMNS[entity])}"
 
-            if sheet_key not in SHEET_ENTITY_MAP:
-                logger.warning(f"Skipping unmapped worksheet: {raw_sheet_name}")
-                continue
+def _source_files(source_dir: Path) -> list:
+    # One Bronze file per source worksheet (see src/pipeline/ingest.py)
+    return sorted(source_dir.glob("*.parquet"))
 
-            entity = SHEET_ENTITY_MAP[sheet_key]
+def _read_sources(source_dir: Path) -> pd.DataFrame:
+    # Headers are standardized per source: workbooks spelling a header
+    # differently must still line up in the concatenated frame
+    frames = [
+        _standardize_columns(pd.read_parquet(path)) for path in _source_files(source_dir)
+    ]
+    if len(frames) == 1:
+        return frames[0]
+    return pd.concat(frames, ignore_index=True)
 
-            df = _standardize_columns(df)
-            total_rows += len(df)
+def _iter_source_batches(source_dir: Path):
+    for path in _source_files(source_dir):
+        yield from pq.ParquetFile(path).iter_batches(batch_size=SILVER_BATCH_ROWS)
+
+def _stream_entity(entity: str, source_dir: Path, run_id: str) -> dict:
+    """
+    Streaming variant of the Silver transform for sheets larger than
+    memory: the entity's Bronze files are read in SILVER_BATCH_ROWS
+    batches; valid rows go to a ParquetWriter, one row group per batch,
+    and invalid rows to this worker's quarantine sink.
+    """
+    output_path = SILVER_DIR / f"{entity}.parquet"
+
+    schema = pq.read_schema(_source_files(source_dir)[0])
+    empty = apply_schema(
+        entity,
+        _standardize_columns(schema.empty_table().to_pandas()),
+    )
+
+    rows = 0
+    # Valid rows, duplicates included; deduplicated into output_path
+    staged_path = output_path.with_name(f".{output_path.name}.{os.getpid()}.staged")
+
+    with ParquetBatchWriter(staged_path) as writer, \
+            QuarantineSink(run_id, STAGE) as quarantine:
+        for batch in _iter_source_batches(source_dir):
+            df = apply_schema(entity, _standardize_columns(batch.to_pandas()))
+            rows += len(df)
 
             if entity in CRITICAL_COLUMNS:
                 valid, invalid = _split_valid_invalid(
                     df, CRITICAL_COLUMNS[entity]
                 )
 
-                if not invalid.empty:
-                    invalid["source_entity"] = entity
-                    invalid_records.append(invalid)
+                quarantine.add(entity, invalid, _quarantine_rule(entity))
 
                 df = valid
 
-            df = df.drop_duplicates()
+            writer.write(df)
+
+        writer.close(empty_frame=empty)
+
+    valid = _dedupe_file(staged_path, output_path, _content_columns(empty))
 
-            output_path = SILVER_DIR / f"{entity}.parquet"
-            df.to_parquet(output_path, index=False)
+    if quarantine.rows:
+        logger.warning(
+            f"Quarantined {quarantine.rows} invalid {entity} records"
+        )
+
+    logger.info(
+        f"Silver written: {output_path.name} ({valid} rows, streamed)"
+    )
+    return {
+        "rows": rows,
+        "valid": valid,
+        "invalid": quarantine.rows,
+        "output_path": output_path,
+    }
 
-            logger.info(
-                f"Silver written: {output_path.name} ({len(df)} rows)"
+def _transform_entity(
+    entity: str,
+    source_dir: Path,
+    last_entry: dict | None,
+    run_id: str,
+    streaming: bool = False,
+) -> dict:
+    """
+    Clean one entity's Bronze files (one per source worksheet) into its
+    Silver entity.
+
+    Runs in a worker thread or process, so it only touches files; manifest
+    and audit writes happen in the caller once all entities are done.
+    """
+    previous = last_entry["inputs"].get("bronze") if last_entry else None
+    inputs = {"bronze": file_fingerprint(source_dir, previous=previous)}
+
+    result = {
+        "entity": entity,
+        "inputs": inputs,
+        "outputs": None,
+        "rows": 0,
+        "valid": 0,
+        "invalid_count": 0,
+        "invalid": None,
+    }
+
+    # ----------------------------------------
+    # Incremental: skip entities whose Bronze files are unchanged
+    # ----------------------------------------
+    if is_up_to_date(last_entry, inputs):
+        logger.info(f"Silver unchanged, skipping: {entity}")
+        return result
+
+    if streaming:
+        with track(run_id, STAGE, "stream", entity=entity) as step:
+            streamed = _stream_entity(entity, source_dir, run_id)
+            step["rows_in"], step["rows_out"] = streamed["rows"], streamed["valid"]
+        result["rows"] = streamed["rows"]
+        result["valid"] = streamed["valid"]
+        result["invalid_count"] = streamed["invalid"]
+        result["outputs"] = {"silver": file_fingerprint(streamed["output_path"])}
+        return result
+
+    # Headers are standardized per source while reading
+    with track(run_id, STAGE, "read", entity=entity) as step:
+        df = _read_sources(source_dir)
+        step["rows_out"] = len(df)
+    result["rows"] = len(df)
+
+    with track(run_id, STAGE, "cast", entity=entity, rows_in=len(df)) as step:
+        df = apply_schema(entity, df)
+        step["rows_out"] = len(df)
+
+    if entity in CRITICAL_COLUMNS:
+        with track(run_id, STAGE, "validate", entity=entity, rows_in=len(df)) as step:
+            valid, invalid = _split_valid_invalid(
+                df, CRITICAL_COLUMNS[entity]
+            )
+            step["rows_out"] = len(valid)
+
+        if not invalid.empty:
+            result["invalid"] = invalid
+            result["invalid_count"] = len(invalid)
+
+        df = valid
+
+    with track(run_id, STAGE, "dedupe", entity=entity, rows_in=len(df)) as step:
+        df = df.drop_duplicates(subset=_content_columns(df))
+        step["rows_out"] = len(df)
+
+    output_path = SILVER_DIR / f"{entity}.parquet"
+    result["valid"] = len(df)
+
+    if fused_active():
+        # Fused run: downstream stages read the Arrow table from the
+        # registry; the file and its manifest entry follow in the background
+        with track(run_id, STAGE, "publish", entity=entity, rows_in=len(df)) as step:
+            publish(
+                entity,
+                pa.Table.from_pandas(df, preserve_index=False),
+                output_path,
+                on_persisted=lambda fingerprint: record_entry(
+                    run_id, STAGE, entity, inputs, {"silver": fingerprint}
+                ),
             )
+            step["rows_out"] = len(df)
+        return result
+
+    with track(run_id, STAGE, "write", entity=entity, rows_in=len(df)) as step:
+        df.to_parquet(output_path, index=False)
+        step["rows_out"] = len(df)
+
+    result["outputs"] = {"silver": file_fingerprint(output_path)}
+
+    logger.info(
+        f"Silver written: {output_path.name} ({len(df)} rows)"
+    )
+    return result
+
+def _plan_entities(run_id: str) -> list:
+    """
+    (entity, Bronze dataset directory, last manifest entry) for every
+    entity ingested into BRONZE_DATASET_DIR.
+    """
+    entities = set(SHEET_ENTITY_MAP.values())
+    planned = [
+        (path.name, path, get_last_entry(STAGE, path.name))
+        for path in sorted(BRONZE_DATASET_DIR.glob("*"))
+        if path.name in entities and _source_files(path)
+    ]
 
-        # ----------------------------------------
-        # Quarantine invalid records
-        # ----------------------------------------
-        if invalid_records:
-            quarantine_df = pd.concat(invalid_records, ignore_index=True)
-            quarantine_path = (
-                QUARANTINE_DIR / f"invalid_records_{run_id}.parquet"
+    if not planned:
+        raise FileNotFoundError(
+            f"No ingested Bronze data in {BRONZE_DATASET_DIR}; run ingest_excel first"
+        )
+    return planned
+
+def _record_results(run_id: str, results: list, quarantine: QuarantineSink) -> tuple:
+    """
+    Quarantine invalid rows returned by the workers and record manifest
+    entries. Returns (rows, valid, invalid) over all entities.
+    """
+    total_rows = valid_rows = invalid_rows = 0
+
+    for result in results:
+        total_rows += result["rows"]
+        valid_rows += result["valid"]
+        invalid_rows += result["invalid_count"]
+
+        if result["invalid"] is not None:
+            quarantine.add(
+                result["entity"],
+                result["invalid"],
+                _quarantine_rule(result["entity"]),
             )
-            quarantine_df.to_parquet(quarantine_path, index=False)
 
-            logger.warning(
-                f"Quarantined {len(quarantine_df)} invalid records"
+        if result["outputs"] is not None:
+            record_entry(
+                run_id,
+                STAGE,
+                result["entity"],
+                result["inputs"],
+                result["outputs"],
             )
 
+    return total_rows, valid_rows, invalid_rows
+
+def _finish_stage(run_id: str, results: list, quarantine: QuarantineSink):
+    total_rows, valid_rows, invalid_rows = _record_results(run_id, results, quarantine)
+
+    # ----------------------------------------
+    # Quarantine invalid records
+    # ----------------------------------------
+    with track(run_id, STAGE, "quarantine", rows_in=quarantine.rows):
+        quarantine.close()
+    if quarantine.rows:
+        logger.warning(
+            f"Quarantined {quarantine.rows} invalid records"
+        )
+
+    write_audit_record(
+        run_id=run_id,
+        stage=STAGE,
+        status="SUCCESS",
+        row_count=total_rows,
+        valid_count=valid_rows,
+        invalid_count=invalid_rows,
+    )
+
+@instrument_stage(STAGE)
+def transform_silver(
+    run_id: str,
+    executor: str = SILVER_EXECUTOR,
+    max_workers: int | None = SILVER_MAX_WORKERS,
+    streaming: bool = SILVER_STREAMING,
+):
+    """
+    Bronze dataset → one Silver Parquet file per entity, unioning every
+    ingested source workbook (rows keep their source_file / source_hash).
+
+    Entities are independent and are fanned out with `executor`
+    (serial | thread | process); invalid rows are written to the
+    quarantine store and row counts merged once every entity has finished.
+
+    With `streaming`, each entity is processed in bounded batches and
+    quarantined rows are written by the worker as they are found.
+
+    Inside fused_execution() (non-streaming) each entity is published to
+    the in-memory dataset registry and persisted in the background;
+    process workers are replaced by threads so the registry is shared.
+    """
+    if fused_active() and not streaming and executor == "process":
+        executor = "thread"
+
+    quarantine = QuarantineSink(run_id, STAGE)
+
+    try:
+        tasks = [
+            (entity, source_dir, last_entry, run_id, streaming)
+            for entity, source_dir, last_entry in _plan_entities(run_id)
+        ]
+
+        results = run_tasks(
+            _transform_entity, tasks, mode=executor, max_workers=max_workers
+        )
+
+        _finish_stage(run_id, results, quarantine)
+
+    except Exception as e:
+        logger.exception("Silver transform failed")
+
         write_audit_record(
             run_id=run_id,
-            stage="silver_transform",
-            status="SUCCESS",
-            row_count=total_rows,
+            stage=STAGE,
+            status="FAILED",
+            error_message=str(e),
         )
+        raise
+
+    finally:
+        flush_audit_records()
 
+# ----------------------------------------
+# Per-entity entry points (Airflow task mapping)
+#
+#   plan_silver_entities → transform_entity (mapped) → commit_silver
+#
+# Only the plan and commit steps open DuckDB; mapped tasks touch files
+# only and hand their audit/metric rows to commit_silver.
+# ----------------------------------------
+def plan_silver_entities(run_id: str) -> list:
+    """
+    Return one transform_entity kwargs dict per ingested Bronze entity.
+    """
+    return [
+        {
+            "run_id": run_id,
+            "entity": entity,
+            "source_dir": str(source_dir),
+            "last_entry": last_entry,
+        }
+        for entity, source_dir, last_entry in _plan_entities(run_id)
+    ]
+
+def transform_entity(
+    run_id: str,
+    entity: str,
+    source_dir: str,
+    last_entry: dict | None = None,
+    streaming: bool = SILVER_STREAMING,
+) -> dict:
+    """
+    Transform one Silver entity without writing to DuckDB. Invalid rows
+    go to the quarantine store; the returned summary carries the buffered
+    audit rows for commit_silver().
+    """
+    with deferred_audit():
+        with QuarantineSink(run_id, STAGE) as quarantine:
+            result = _transform_entity(
+                entity, Path(source_dir), last_entry, run_id, streaming
+            )
+            if result["invalid"] is not None:
+                quarantine.add(entity, result["invalid"], _quarantine_rule(entity))
+                result["invalid"] = None
+
+        result["audit"] = drain_audit_records()
+    return result
+
+@instrument_stage(STAGE)
+def commit_silver(run_id: str, results: list):
+    """
+    Record the manifest entries and stage audit row for the
+    transform_entity() results of one run.
+    """
+    results = list(results)
+    for result in results:
+        replay_audit_records(result.pop("audit", {}))
+
+    quarantine = QuarantineSink(run_id, STAGE)
+    try:
+        _finish_stage(run_id, results, quarantine)
     except Exception as e:
-        logger.exception("Silver transform failed")
+        logger.exception("Silver commit failed")
 
         write_audit_record(
             run_id=run_id,
-            stage="silver_transform",
+            stage=STAGE,
             status="FAILED",
             error_message=str(e),
         )
         raise
+    finally:
+        flush_audit_records()
@@ -0,0 +1,205 @@
+import json
+import re
+import shutil
+import uuid
+import pandas as pd
+from pathlib import Path
+from openpyxl import load_workbook
+
+from src.core.config import WORKBOOK_BATCH_ROWS, WORKBOOK_CACHE_DIR
+from src.core.idempotency import content_hash
+from src.core.logging import get_logger
+from src.core.parquet_io import ParquetBatchWriter
+from src.pipeline.schemas import SILVER_SCHEMAS, as_text, standard_name
+
+logger = get_logger("WORKBOOK")
+
+MANIFEST_NAME = "_sheets.json"
+
+# ----------------------------------------
+# Worksheet → Silver entity mapping
+# ----------------------------------------
+SHEET_ENTITY_MAP = {
+    "student": "students",
+    "students": "students",
+    "teacher": "teachers",
+    "teachers": "teachers",
+    "school": "schools",
+    "schools": "schools",
+    "test": "tests",
+    "tests": "tests",
+    "test details": "test_details",
+    "test_details": "test_details",
+    "grading group": "grading_groups",
+    "grading groups": "grading_groups",
+    "grading_groups": "grading_groups",
+}
+
+
+def sheet_entity(sheet_name: str) -> str | None:
+    return SHEET_ENTITY_MAP.get(sheet_name.strip().lower())
+
+
+def _sheet_filename(index: int, sheet_name: str) -> str:
+    slug = re.sub(r"[^0-9a-z]+", "_", sheet_name.strip().lower()).strip("_")
+    return f"{index:03d}_{slug or 'sheet'}.parquet"
+
+
+def _column_kinds(sheet_name: str, columns: list) -> dict:
+    """
+    Cache type of each worksheet column, fixed once per sheet from the
+    declared Silver schema of its entity rather than inferred per batch.
+    Numeric and date kinds keep their type; ids, categories and
+    undeclared columns are stored as text, which every value fits.
+    """
+    declared = SILVER_SCHEMAS.get(sheet_entity(sheet_name) or "", {})
+    kinds = {}
+    for col in columns:
+        kind = declared.get(standard_name(col))
+        kinds[col] = kind if kind in ("int8", "int16", "float", "date") else "text"
+    return kinds
+
+
+def _conform_batch(df: pd.DataFrame, kinds: dict, sheet_name: str) -> pd.DataFrame:
+    # Parquet needs one physical type per column: every batch is cast to
+    # the sheet's column kinds. Values that do not convert become null,
+    # as they would in the Silver cast (schemas.apply_schema).
+    for col, kind in kinds.items():
+        values = df[col]
+        if kind == "text":
+            df[col] = as_text(values)
+            continue
+
+        if kind == "date":
+            cast = pd.to_datetime(values, dayfirst=True, errors="coerce", format="mixed")
+        else:
+            cast = pd.to_numeric(values, errors="coerce").astype("float64")
+
+        lost = int((cast.isna() & values.notna()).sum())
+        if lost:
+            logger.warning(
+                f"{sheet_name}.{col}: {lost} values not convertible to {kind}, set to null"
+            )
+        df[col] = cast
+    return df
+
+
+def _sheet_header(worksheet) -> list:
+    header = next(worksheet.iter_rows(max_row=1, values_only=True), None)
+    if header is None:
+        return []
+
+    width = len(header)
+    while width and header[width - 1] is None:
+        width -= 1
+
+    return [
+        str(name) if name is not None else f"Unnamed: {i}"
+        for i, name in enumerate(header[:width])
+    ]
+
+
+def _iter_sheet_batches(worksheet, batch_rows: int):
+    """
+    Stream a worksheet as DataFrames of at most `batch_rows` rows, all
+    with the same column types (see _column_kinds).
+
+    The first row is the header; fully blank rows are dropped and cells
+    beyond the last header column are ignored, matching pd.read_excel on
+    well-formed sheets.
+    """
+    columns = _sheet_header(worksheet)
+    width = len(columns)
+    kinds = _column_kinds(worksheet.title, columns)
+
+    def frame(rows: list) -> pd.DataFrame:
+        return _conform_batch(pd.DataFrame(rows, columns=columns), kinds, worksheet.title)
+
+    batch = []
+    for row in worksheet.iter_rows(min_row=2, values_only=True):
+        row = tuple(row[:width]) + (None,) * (width - len(row))
+        if all(v is None for v in row):
+            continue
+        batch.append(row)
+
+        if len(batch) >= batch_rows:
+            yield frame(batch)
+            batch = []
+
+    yield frame(batch)
+
+
+def _write_sheet(worksheet, path: Path, batch_rows: int) -> int:
+    """
+    Write one worksheet to Parquet one row group per batch, so the XLSX
+    is never held in memory as a whole.
+    """
+    with ParquetBatchWriter(path) as writer:
+        for df in _iter_sheet_batches(worksheet, batch_rows):
+            writer.write(df)
+    return writer.rows
+
+
+def cache_workbook(source_path: Path, digest: str | None = None) -> dict:
+    """
+    Parse a workbook at most once per content hash.
+
+    Every worksheet is streamed with openpyxl in read-only mode and written
+    to WORKBOOK_CACHE_DIR/<sha256>/ as Parquet, in row groups of
+    WORKBOOK_BATCH_ROWS rows. Later calls for the same
+    workbook contents return the cached files without opening the XLSX.
+
+    Returns {sheet_name: parquet_path} in workbook order. Pass `digest`
+    when the content hash is already known.
+    """
+    digest = digest or content_hash(source_path)
+    cache_dir = WORKBOOK_CACHE_DIR / digest
+    manifest_path = cache_dir / MANIFEST_NAME
+
+    if not manifest_path.exists():
+        _build_cache(source_path, digest)
+    else:
+        logger.info(f"Workbook cache hit: {source_path.name} ({digest[:12]})")
+
+    manifest = json.loads(manifest_path.read_text())
+    return {
+        entry["sheet"]: cache_dir / entry["file"]
+        for entry in manifest["sheets"]
+    }
+
+
+def _build_cache(source_path: Path, digest: str):
+    cache_dir = WORKBOOK_CACHE_DIR / digest
+    tmp_dir = WORKBOOK_CACHE_DIR / f".{digest}.{uuid.uuid4().hex}.tmp"
+    tmp_dir.mkdir(parents=True)
+
+    logger.info(f"Parsing workbook: {source_path.name} ({digest[:12]})")
+
+    try:
+        sheets = []
+        workbook = load_workbook(source_path, read_only=True, data_only=True)
+        try:
+            for index, worksheet in enumerate(workbook.worksheets):
+                filename = _sheet_filename(index, worksheet.title)
+                rows = _write_sheet(
+                    worksheet, tmp_dir / filename, WORKBOOK_BATCH_ROWS
+                )
+                sheets.append(
+                    {"sheet": worksheet.title, "file": filename, "rows": rows}
+                )
+        finally:
+            workbook.close()
+
+        (tmp_dir / MANIFEST_NAME).write_text(
+            json.dumps({"source": source_path.name, "sheets": sheets}, indent=2)
+        )
+
+        # Publish atomically; a concurrent run may have beaten us to it.
+        try:
+            tmp_dir.rename(cache_dir)
+        except OSError:
+            if not (cache_dir / MANIFEST_NAME).exists():
+                raise
+    finally:
+        if tmp_dir.exists():
+            shutil.rmtree(tmp_dir, ignore_errors=True)
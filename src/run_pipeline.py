@@ -1,20 +1,39 @@
 import uuid
+from contextlib import nullcontext
+
+from src.core.config import PIPELINE_FUSED
+from src.core.dataset_registry import fused_execution
 from src.pipeline.ingest import ingest_excel
 from src.pipeline.transform import transform_silver
-from src.quality.ge_runner import run_quality_checks
-from src.pipeline.analytics import build_gold
+from src.data_quality.ge_check import run_ge_checks
+from src.pipeline.analytics import build_gold_layer
+from src.pipeline.features import build_features
 from src.core.logging import get_logger
 
 logger = get_logger("PIPELINE")
 
-def run():
-    run_id = str(uuid.uuid4())
+def run(run_id: str | None = None, fused: bool = PIPELINE_FUSED):
+    """
+    Run every stage in this process.
+
+    With `fused`, Silver → DQ → Gold hand Arrow tables to each other via
+    the in-memory dataset registry while the Silver Parquet files are
+    written in the background; the files on disk are the same as in a
+    split (Airflow) run once the call returns.
+    """
+    run_id = run_id or str(uuid.uuid4())
 
-    logger.info(f"Pipeline run started: {run_id}")
+    logger.info(f"Pipeline run started: {run_id}{' (fused)' if fused else ''}")
 
     ingest_excel(run_id)
-    transform_silver(run_id)
-    run_quality_checks(run_id)
-    build_gold(run_id)
+    with fused_execution() if fused else nullcontext():
+        transform_silver(run_id)
+        run_ge_checks(run_id)
+        build_gold_layer(run_id)
+    build_features(run_id)
 
     logger.info(f"Pipeline run completed: {run_id}")
+    return run_id
+
+if __name__ == "__main__":
+    run()
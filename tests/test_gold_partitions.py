@@ -0,0 +1,45 @@
+from pathlib import Path
+
+import duckdb
+
+from src.pipeline.analytics import _unaffected_files
+
+
+def _write_dataset(root: Path) -> list:
+    con = duckdb.connect()
+    con.execute(f"""
+        COPY (
+            SELECT * FROM (VALUES
+                ('2021/2022', 'a b', 1),
+                ('2021/2022', 'c', 2),
+                ('2022', 'x%y', 3),
+                (NULL, 'c', 4)
+            ) AS t(school_year, school_id, score)
+        ) TO '{root.as_posix()}' (FORMAT PARQUET, PARTITION_BY (school_year, school_id))
+    """)
+    con.close()
+    return sorted(p.relative_to(root).as_posix() for p in root.rglob("*.parquet"))
+
+
+def test_rewritten_partitions_match_encoded_paths(tmp_path):
+    files = _write_dataset(tmp_path / "fact_tests")
+    partition_by = ["school_year", "school_id"]
+
+    kept = _unaffected_files(
+        files, partition_by, [("2021/2022", "a b"), ("2022", "x%y"), (None, "c")]
+    )
+
+    assert len(files) == 4
+    assert len(kept) == 1
+    con = duckdb.connect()
+    rows = con.execute(
+        "SELECT school_year, school_id, score FROM read_parquet(?, hive_partitioning = true)",
+        [[(tmp_path / "fact_tests" / f).as_posix() for f in kept]],
+    ).fetchall()
+    assert rows == [("2021/2022", "c", 2)]
+
+
+def test_unaffected_partitions_are_all_kept(tmp_path):
+    files = _write_dataset(tmp_path / "fact_tests")
+
+    assert _unaffected_files(files, ["school_year", "school_id"], []) == files
@@ -0,0 +1,48 @@
+import datetime
+
+import pandas as pd
+
+from src.pipeline import features
+
+# Two assessment dates of student 1: the features of 2024-03-01 include
+# that day's assessment
+FEATURES = """(
+    SELECT * FROM (VALUES
+        (1, DATE '2024-01-10', DATE '2024-03-01', 40.0),
+        (1, DATE '2024-03-01', NULL, 90.0)
+    ) AS t(student_key, as_of_date, valid_to, score_mean_90d)
+)"""
+
+
+def _join(monkeypatch, requests, **kwargs):
+    monkeypatch.setattr(features, "_feature_relation", lambda table, version: FEATURES)
+    return features.point_in_time_features(requests, **kwargs).sort_values("as_of")
+
+
+def test_label_does_not_see_same_day_assessment(monkeypatch):
+    requests = pd.DataFrame(
+        {
+            "student_key": [1, 1, 1],
+            "as_of": [
+                datetime.date(2024, 1, 10),
+                datetime.date(2024, 3, 1),
+                datetime.date(2024, 3, 2),
+            ],
+        }
+    )
+
+    result = _join(monkeypatch, requests)
+
+    assert pd.isna(result["score_mean_90d"].iloc[0])
+    assert result["score_mean_90d"].iloc[1] == 40.0
+    assert result["days_since_last_assessment"].iloc[1] == 51
+    assert result["score_mean_90d"].iloc[2] == 90.0
+
+
+def test_inclusive_uses_same_day_assessment(monkeypatch):
+    requests = pd.DataFrame({"student_key": [1], "as_of": [datetime.date(2024, 3, 1)]})
+
+    result = _join(monkeypatch, requests, inclusive=True)
+
+    assert result["score_mean_90d"].iloc[0] == 90.0
+    assert result["days_since_last_assessment"].iloc[0] == 0